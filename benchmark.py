@@ -0,0 +1,431 @@
+import argparse, io, json, multiprocessing, os, platform, random, shutil, subprocess, sys, tempfile, threading, time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+try:
+    import plexapi
+    from modules.logs import MyLogger
+    from plexapi.server import PlexServer
+    from PIL import Image, ImageDraw
+except ModuleNotFoundError:
+    print("Requirements Error: Requirements are not installed")
+    sys.exit(0)
+
+parser = argparse.ArgumentParser(description="Benchmark Plex Meta Manager hot paths against a local stand-in Plex server")
+parser.add_argument("-m", "--movies", dest="movies", help="Number of synthetic movies (Default: 10000)", default=10000, type=int)
+parser.add_argument("-s", "--shows", dest="shows", help="Number of synthetic shows (Default: 1000)", default=1000, type=int)
+parser.add_argument("-e", "--episodes", dest="episodes", help="Number of episodes per show (Default: 20)", default=20, type=int)
+parser.add_argument("-f", "--filter-items", dest="filter_items", help="Number of movies run through collection filters (Default: 1000)", default=1000, type=int)
+parser.add_argument("-p", "--posters", dest="posters", help="Number of posters run through overlay compositing (Default: 100)", default=100, type=int)
+parser.add_argument("-t", "--templates", dest="templates", help="Number of template expansions (Default: 5000)", default=5000, type=int)
+parser.add_argument("-b", "--benchmarks", dest="benchmarks", help="Run only the specified benchmarks (comma-separated list)", type=str)
+parser.add_argument("-o", "--output", dest="output", help="Write the results as JSON to this file instead of stdout", type=str)
+parser.add_argument("--seed", dest="seed", help="Random seed used to build the synthetic libraries (Default: 12)", default=12, type=int)
+args = parser.parse_args()
+
+genres = ["Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary", "Drama", "Family", "Fantasy", "Horror", "Romance", "Thriller"]
+ratings = ["G", "PG", "PG-13", "R", "NR"]
+movie_section = 1
+show_section = 2
+overlay_section = 3
+show_offset = 1000000
+episode_offset = 2000000
+overlay_offset = 3000000
+token = "benchmark"
+
+def escape(text):
+    return str(text).replace("&", "&amp;").replace("\"", "&quot;").replace("<", "&lt;").replace(">", "&gt;")
+
+def movie_xml(rating_key, section_id, title, year, rating, audience_rating, added, updated, item_genres, thumb=1, labels=None):
+    return (
+        f'<Video ratingKey="{rating_key}" key="/library/metadata/{rating_key}" guid="plex://movie/{rating_key:024x}" type="movie" '
+        f'title="{escape(title)}" titleSort="{escape(title)}" year="{year}" librarySectionID="{section_id}" '
+        f'librarySectionKey="/library/sections/{section_id}" librarySectionTitle="{sections_titles[section_id]}" contentRating="{rating}" '
+        f'rating="{audience_rating}" audienceRating="{audience_rating}" originallyAvailableAt="{year}-01-01" '
+        f'addedAt="{added}" updatedAt="{updated}" thumb="/library/metadata/{rating_key}/thumb/{thumb}">'
+        + "".join([f'<Genre id="{genres.index(g) + 1}" tag="{escape(g)}"/>' for g in item_genres])
+        + "".join([f'<Label id="{label_id}" tag="{escape(label)}"/>' for label, label_id in (labels or {}).items()])
+        + f'<Guid id="imdb://tt{rating_key:07d}"/><Guid id="tmdb://{rating_key}"/></Video>'
+    )
+
+sections_titles = {movie_section: "Movies", show_section: "TV Shows", overlay_section: "Overlay Movies"}
+
+def build_libraries(movies, shows, episodes, posters, seed):
+    rand = random.Random(seed)
+    now = int(time.time())
+    items = {}
+    overlay_items = {}
+    sections = {movie_section: [], show_section: [], overlay_section: [], "episode": []}
+    for i in range(1, movies + 1):
+        year = rand.randint(1950, 2022)
+        items[i] = movie_xml(i, movie_section, f"Movie {i}", year, rand.choice(ratings), rand.randint(10, 100) / 10,
+                             now - rand.randint(0, 86400 * 3650), now - rand.randint(0, 86400 * 365), rand.sample(genres, 2))
+        sections[movie_section].append(i)
+    for s in range(1, shows + 1):
+        show_key = show_offset + s
+        year = rand.randint(1970, 2022)
+        items[show_key] = (
+            f'<Directory ratingKey="{show_key}" key="/library/metadata/{show_key}/children" guid="plex://show/{show_key:024x}" '
+            f'type="show" title="Show {s}" titleSort="Show {s}" year="{year}" librarySectionID="{show_section}" '
+            f'librarySectionKey="/library/sections/{show_section}" contentRating="TV-{rand.choice(["G", "PG", "14", "MA"])}" '
+            f'audienceRating="{rand.randint(10, 100) / 10}" leafCount="{episodes}" childCount="1" '
+            f'addedAt="{now - rand.randint(0, 86400 * 3650)}" updatedAt="{now - rand.randint(0, 86400 * 365)}">'
+            + "".join([f'<Genre tag="{escape(g)}"/>' for g in rand.sample(genres, 2)])
+            + f'<Guid id="imdb://tt{show_key:07d}"/><Guid id="tmdb://{show_key}"/><Guid id="tvdb://{show_key}"/></Directory>'
+        )
+        sections[show_section].append(show_key)
+        for e in range(1, episodes + 1):
+            episode_key = episode_offset + s * 1000 + e
+            items[episode_key] = (
+                f'<Video ratingKey="{episode_key}" key="/library/metadata/{episode_key}" guid="plex://episode/{episode_key:024x}" '
+                f'type="episode" title="Episode {e}" index="{e}" parentIndex="1" grandparentTitle="Show {s}" '
+                f'grandparentRatingKey="{show_key}" grandparentKey="/library/metadata/{show_key}" '
+                f'librarySectionID="{show_section}" audienceRating="{rand.randint(10, 100) / 10}" '
+                f'addedAt="{now - rand.randint(0, 86400 * 3650)}" updatedAt="{now - rand.randint(0, 86400 * 365)}"/>'
+            )
+            sections["episode"].append(episode_key)
+    for p in range(1, posters + 1):
+        overlay_key = overlay_offset + p
+        overlay_items[overlay_key] = {
+            "title": f"Poster {p}", "year": rand.randint(1950, 2022), "rating": rand.choice(ratings), "audience_rating": rand.randint(10, 100) / 10,
+            "added": now - rand.randint(0, 86400 * 3650), "updated": now - rand.randint(0, 86400 * 365), "genres": rand.sample(genres, 2), "thumb": 1, "labels": {}
+        }
+        sections[overlay_section].append(overlay_key)
+    return items, overlay_items, sections
+
+def filter_meta(section_id):
+    libtype, type_id = ("show", 2) if section_id == show_section else ("movie", 1)
+    return (
+        f'<Meta><Type key="/library/sections/{section_id}/all?type={type_id}" type="{libtype}" title="{libtype.capitalize()}s" active="1">'
+        f'<Filter filter="genre" filterType="string" key="/library/sections/{section_id}/genre" title="Genre" type="filter"/>'
+        f'<Filter filter="label" filterType="string" key="/library/sections/{section_id}/label" title="Labels" type="filter"/>'
+        '<Field key="title" title="Title" type="string"/><Field key="genre" title="Genre" type="tag"/><Field key="label" title="Label" type="tag"/></Type>'
+        f'<Type key="/library/sections/{section_id}/all?type=18" type="collection" title="Collections" active="0">'
+        '<Field key="title" title="Title" type="string"/><Field key="label" title="Label" type="tag"/></Type>'
+        '<FieldType type="tag"><Operator key="=" title="is"/><Operator key="!=" title="is not"/></FieldType>'
+        '<FieldType type="string"><Operator key="=" title="contains"/><Operator key="==" title="is"/></FieldType>'
+        '</Meta>'
+    )
+
+def choices_xml(choices):
+    directories = "".join([f'<Directory key="{k}" title="{escape(c)}"/>' for c, k in choices.items()])
+    return f'<MediaContainer size="{len(choices)}">{directories}</MediaContainer>'
+
+def run_server(movies, shows, episodes, posters, seed, port_queue):
+    from PIL import Image
+    items, overlay_items, sections = build_libraries(movies, shows, episodes, posters, seed)
+    poster_buffer = io.BytesIO()
+    Image.new("RGB", (1000, 1500), (40, 60, 90)).save(poster_buffer, "JPEG", quality=90)
+    poster_bytes = poster_buffer.getvalue()
+    labels = {}
+
+    def item_xml(rating_key):
+        if rating_key in overlay_items:
+            o = overlay_items[rating_key]
+            return movie_xml(rating_key, overlay_section, o["title"], o["year"], o["rating"], o["audience_rating"], o["added"], o["updated"], o["genres"], thumb=o["thumb"], labels=o["labels"])
+        return items.get(rating_key)
+
+    class StubPlex(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *_):
+            pass
+
+        def send_body(self, data, content_type, status=200):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def send_xml(self, body):
+            self.send_body(f'<?xml version="1.0" encoding="UTF-8"?>\n{body}'.encode("utf-8"), "text/xml;charset=utf-8")
+
+        def send_empty(self, status=200):
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def read_request(self):
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length) if length else b""
+            return url.path.rstrip("/"), {k: v[0] for k, v in parse_qs(url.query).items()}, body
+
+        def do_GET(self):
+            path, query, _ = self.read_request()
+            parts = path.split("/")
+            if path == "":
+                self.send_xml(f'<MediaContainer size="0" friendlyName="Benchmark" machineIdentifier="{token}" version="1.29.0.6244" myPlex="0" platform="Linux"/>')
+            elif path == "/library":
+                self.send_xml('<MediaContainer size="1" title1="Plex Library"><Directory key="sections" title="Library Sections"/></MediaContainer>')
+            elif path == "/library/sections":
+                self.send_xml(
+                    '<MediaContainer size="3">'
+                    f'<Directory key="{movie_section}" type="movie" title="Movies" agent="tv.plex.agents.movie" scanner="Plex Movie" language="en-US" uuid="benchmark-movies"/>'
+                    f'<Directory key="{show_section}" type="show" title="TV Shows" agent="tv.plex.agents.series" scanner="Plex TV Series" language="en-US" uuid="benchmark-shows"/>'
+                    f'<Directory key="{overlay_section}" type="movie" title="Overlay Movies" agent="tv.plex.agents.movie" scanner="Plex Movie" language="en-US" uuid="benchmark-overlays"/>'
+                    '</MediaContainer>'
+                )
+            elif len(parts) == 5 and parts[1:3] == ["library", "sections"] and parts[4] in ["all", "collections"]:
+                section_id = int(parts[3])
+                if "includeMeta" in query:
+                    self.send_xml(f'<MediaContainer size="0" totalSize="0">{filter_meta(section_id)}</MediaContainer>')
+                    return
+                if parts[4] == "collections" or query.get("type") == "18":
+                    keys = []
+                elif section_id == show_section and query.get("type") == "4":
+                    keys = sections["episode"]
+                else:
+                    keys = sections.get(section_id, [])
+                if "label" in query:
+                    keys = [k for k in keys if k in overlay_items and query["label"] in [str(i) for i in overlay_items[k]["labels"].values()]]
+                start = int(self.headers.get("X-Plex-Container-Start", query.get("X-Plex-Container-Start", 0)))
+                size = int(self.headers.get("X-Plex-Container-Size", query.get("X-Plex-Container-Size", len(keys))))
+                page = keys[start:start + size]
+                self.send_xml(f'<MediaContainer size="{len(page)}" totalSize="{len(keys)}" offset="{start}" librarySectionID="{section_id}">{"".join([item_xml(k) for k in page])}</MediaContainer>')
+            elif len(parts) == 5 and parts[1:3] == ["library", "sections"] and parts[4] == "genre":
+                self.send_xml(choices_xml({g: i for i, g in enumerate(genres, 1)}))
+            elif len(parts) == 5 and parts[1:3] == ["library", "sections"] and parts[4] == "label":
+                self.send_xml(choices_xml(labels))
+            elif len(parts) == 6 and parts[1:3] == ["library", "metadata"] and parts[4] == "thumb":
+                self.send_body(poster_bytes, "image/jpeg")
+            elif len(parts) == 4 and parts[1:3] == ["library", "metadata"]:
+                found = [item_xml(int(k)) for k in parts[3].split(",") if k.isdigit() and item_xml(int(k))]
+                self.send_xml(f'<MediaContainer size="{len(found)}">{"".join(found)}</MediaContainer>')
+            else:
+                self.send_empty(404)
+
+        def do_POST(self):
+            path, _, _ = self.read_request()
+            parts = path.split("/")
+            if len(parts) == 5 and parts[1:3] == ["library", "metadata"] and parts[4] == "posters" and int(parts[3]) in overlay_items:
+                overlay_items[int(parts[3])]["thumb"] += 1
+                self.send_empty()
+            else:
+                self.send_empty(404)
+
+        def do_PUT(self):
+            path, query, _ = self.read_request()
+            parts = path.split("/")
+            if len(parts) == 5 and parts[1:3] == ["library", "sections"] and parts[4] == "all" and "id" in query:
+                for rating_key in [int(k) for k in query["id"].split(",") if int(k) in overlay_items]:
+                    item_labels = overlay_items[rating_key]["labels"]
+                    for key, value in query.items():
+                        if key.startswith("label[") and key.endswith(".tag.tag"):
+                            if value not in labels:
+                                labels[value] = len(labels) + 1
+                            item_labels[value] = labels[value]
+                        elif key == "label[].tag.tag-":
+                            for label in value.split(","):
+                                item_labels.pop(label, None)
+                self.send_empty()
+            else:
+                self.send_empty(404)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubPlex)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+class Results:
+    def __init__(self):
+        self.results = []
+
+    def time(self, name, count, function):
+        start = time.perf_counter()
+        value = function()
+        seconds = time.perf_counter() - start
+        self.results.append({"name": name, "items": count, "seconds": round(seconds, 6), "per_item_ms": round(seconds * 1000 / count, 6) if count else None})
+        print(f"{name:<40} {count:>8} items {seconds:>10.3f}s", file=sys.stderr)
+        return value
+
+class BenchmarkConfig:
+    def __init__(self, default_dir):
+        import requests
+        from modules.cache import Cache
+        self.default_dir = default_dir
+        self.session = requests.Session()
+        self.Cache = Cache(os.path.join(default_dir, "config.yml"), 60)
+        self.trace_mode = False
+        self.daemon = False
+        self.test_mode = False
+        self.no_missing = True
+        self.ignore_schedules = False
+        self.requested_collections = None
+        self.run_hour = datetime.now().hour
+        self.custom_repo = None
+        self.playlist_names = []
+        self.builder_ids = {}
+        self.builder_lock = threading.Lock()
+        for service in ["TMDb", "Trakt", "MyAnimeList", "OMDb", "AniDB", "AniList", "Ergast", "FlixPatrol", "ICheckMovies", "IMDb", "Letterboxd", "Mdblist", "Reciperr", "TVDb"]:
+            setattr(self, service, None)
+        from modules.convert import Convert
+        self.Convert = Convert(self)
+
+    def get(self, url, headers=None, params=None):
+        return self.session.get(url, headers=headers, params=params)
+
+    def get_json(self, url):
+        return []
+
+    def configured(self, attr):
+        return False
+
+    def warm(self, name, key, create, bind=True):
+        return create()
+
+    def notify(self, text, server=None, library=None, collection=None, playlist=None, critical=True):
+        pass
+
+def library_params(config, name, port):
+    params = {"mapping_name": name, "name": name, "metadata_path": [], "overlay_path": [], "skip_library": False, "asset_depth": 0,
+              "asset_directory": [], "default_dir": config.default_dir, "report_path": None, "overlay_format": "jpg", "overlay_quality": 90,
+              "overlay_compress_level": 6, "overlay_optimize": False, "sync_mode": "append", "default_collection_order": None, "minimum_items": 1,
+              "item_refresh_delay": 0, "ignore_ids": [], "ignore_imdb_ids": [], "asset_folders": True, "show_unmanaged": False,
+              "show_asset_not_needed": True, "show_missing": False, "show_missing_assets": False, "delete_collections_with_less": None,
+              "plex": {"url": f"http://127.0.0.1:{port}", "token": token, "timeout": 60, "clean_bundles": False, "empty_trash": False, "optimize": False}}
+    for attr in ["create_asset_folders", "dimensional_asset_rename", "prioritize_assets", "download_url_assets", "show_missing_season_assets",
+                 "show_missing_episode_assets", "delete_below_minimum", "delete_not_scheduled", "missing_only_released", "show_filtered",
+                 "show_options", "save_report", "only_filter_missing", "assets_for_all", "delete_unmanaged_collections", "mass_genre_update",
+                 "mass_audience_rating_update", "mass_critic_rating_update", "mass_user_rating_update", "mass_episode_audience_rating_update",
+                 "mass_episode_critic_rating_update", "mass_episode_user_rating_update", "mass_content_rating_update",
+                 "mass_originally_available_update", "mass_imdb_parental_labels", "mass_trakt_rating_update", "radarr_add_all_existing",
+                 "radarr_remove_by_tag", "sonarr_add_all_existing", "sonarr_remove_by_tag", "update_blank_track_titles",
+                 "remove_title_parentheses", "remove_overlays", "reapply_overlays", "mass_collection_mode", "metadata_backup", "genre_mapper",
+                 "content_rating_mapper", "error_webhooks", "changes_webhooks", "split_duplicates"]:
+        params[attr] = None if attr.endswith(("_mapper", "_webhooks", "_backup", "_mode", "_by_tag")) else False
+    return params
+
+def write_yaml(path, data):
+    from ruamel import yaml
+    with open(path, "w", encoding="utf-8") as handle:
+        yaml.YAML().dump(data, handle)
+    return path
+
+def main():
+    selected = [b.strip() for b in args.benchmarks.split(",")] if args.benchmarks else None
+    def wanted(name):
+        return selected is None or name in selected
+
+    temp_dir = tempfile.mkdtemp(prefix="pmm-benchmark-")
+    logger = MyLogger("Plex Meta Manager", temp_dir, 100, "=", True, False)
+    from modules import util
+    util.logger = logger
+    from modules.builder import CollectionBuilder
+    from modules.meta import DataFile, MetadataFile, OverlayFile
+    from modules.overlays import Overlays
+    from modules.plex import Plex
+
+    port_queue = multiprocessing.Queue()
+    server_process = multiprocessing.Process(target=run_server, args=(args.movies, args.shows, args.episodes, args.posters, args.seed, port_queue), daemon=True)
+    server_process.start()
+    results = Results()
+    try:
+        port = port_queue.get(timeout=600)
+        config = BenchmarkConfig(temp_dir)
+        movies = Plex(config, library_params(config, "Movies", port))
+        shows = Plex(config, library_params(config, "TV Shows", port))
+
+        movie_items = []
+        if wanted("plex_get_all_movies") or wanted("map_guids") or wanted("filter_and_save_items"):
+            movie_items = results.time("plex_get_all_movies", args.movies, lambda: movies.get_all())
+        if wanted("plex_get_all_shows"):
+            results.time("plex_get_all_shows", args.shows, lambda: shows.get_all())
+        if wanted("plex_get_all_episodes"):
+            results.time("plex_get_all_episodes", args.shows * args.episodes, lambda: shows.get_all(collection_level="episode"))
+
+        if wanted("cache_guid_map_write") or wanted("map_guids") or wanted("filter_and_save_items"):
+            def write_guids():
+                for item in movie_items:
+                    config.Cache.update_guid_map(item.guid, str(item.ratingKey), f"tt{item.ratingKey:07d}", False, "movie")
+            results.time("cache_guid_map_write", len(movie_items), write_guids)
+        if wanted("cache_guid_map_read"):
+            results.time("cache_guid_map_read", len(movie_items), lambda: [config.Cache.query_guid_map(i.guid) for i in movie_items])
+        if wanted("cache_image_map"):
+            table_name = config.Cache.get_image_table_name("Benchmark")
+            def image_map():
+                for i in range(1, args.movies + 1):
+                    config.Cache.update_image_map(i, f"{table_name}_overlays", f"/library/metadata/{i}/thumb/1", f"compare{i}", overlay="4K|HDR")
+                for i in range(1, args.movies + 1):
+                    config.Cache.query_image_map(i, f"{table_name}_overlays")
+            results.time("cache_image_map", args.movies * 2, image_map)
+
+        if wanted("map_guids") or wanted("filter_and_save_items"):
+            results.time("map_guids", len(movie_items), lambda: movies.map_guids(movie_items))
+
+        if wanted("filter_and_save_items"):
+            metadata_path = write_yaml(os.path.join(temp_dir, "benchmark_collections.yml"), {"collections": {"Benchmark": {
+                "plex_all": True,
+                "filters": {"year.gte": 1980, "audience_rating.gte": 3.0, "genre": ["Action", "Drama", "Comedy", "Thriller"]}
+            }}})
+            metadata = MetadataFile(config, movies, "File", metadata_path, {}, [])
+            builder = CollectionBuilder(config, metadata, "Benchmark", metadata.collections["Benchmark"], library=movies)
+            ids = [(item.ratingKey, "ratingKey") for item in movie_items[:args.filter_items]]
+            results.time("filter_and_save_items", len(ids), lambda: builder.filter_and_save_items(ids))
+
+        if wanted("apply_template"):
+            data_file = DataFile(config, "File", os.path.join(temp_dir, "benchmark.yml"), {}, [])
+            data_file.data_type = "Collection"
+            data_file.templates = {"Benchmark": ({
+                "default": {"minimum": 5, "sort_prefix": "!"},
+                "optional": ["tmdb_list"],
+                "tmdb_collection_details": "<<tmdb_id>>",
+                "tmdb_list": "<<tmdb_list>>",
+                "sort_title": "<<sort_prefix>><<collection_name>>",
+                "summary": "<<collection_name>> released between <<start>> and <<end>>",
+                "url_poster": "https://example.com/posters/<<collection_name_encoded>>.jpg",
+                "minimum_items": "<<minimum>>",
+                "filters": {"year.gte": "<<start>>", "year.lte": "<<end>>", "genre": "<<genre>>"}
+            }, {})}
+            def expand():
+                for i in range(args.templates):
+                    data_file.apply_template(f"Collection {i}", {}, [{"name": "Benchmark", "tmdb_id": i, "start": 1950 + i % 50, "end": 1960 + i % 50, "genre": genres[i % len(genres)]}])
+            results.time("apply_template", args.templates, expand)
+
+        if wanted("overlay_compositing"):
+            overlay_library = Plex(config, library_params(config, "Overlay Movies", port))
+            overlay_image = Image.new("RGBA", (305, 105), (0, 0, 0, 0))
+            ImageDraw.Draw(overlay_image).rounded_rectangle((0, 0, 304, 104), 30, fill=(0, 0, 0, 153))
+            overlay_image.save(os.path.join(temp_dir, "Benchmark.png"))
+            overlay_path = write_yaml(os.path.join(temp_dir, "benchmark_overlays.yml"), {"overlays": {
+                "Benchmark": {"overlay": {"name": "Benchmark", "file": os.path.join(temp_dir, "Benchmark.png"), "horizontal_offset": 30, "vertical_offset": 30}, "plex_all": True},
+                "Rating": {"overlay": {"name": "text(audience_rating)", "horizontal_align": "right", "vertical_align": "bottom", "horizontal_offset": 30,
+                                       "vertical_offset": 30, "font_size": 63, "back_color": "#00000099", "back_width": 305, "back_height": 105}, "plex_all": True}
+            }})
+            overlay_library.overlay_files = [OverlayFile(config, overlay_library, "File", overlay_path, {}, [])]
+            results.time("overlay_compositing", args.posters, lambda: Overlays(config, overlay_library).run_overlays())
+            poster_path = os.path.join(temp_dir, "poster.jpg")
+            Image.new("RGB", (2000, 3000), (40, 60, 90)).save(poster_path, "JPEG", quality=90)
+            def decode():
+                for _ in range(args.posters):
+                    util.load_poster(poster_path, (1000, 1500))
+            results.time("overlay_poster_decode", args.posters, decode)
+            def decode_blur():
+                for _ in range(args.posters):
+                    util.load_poster(poster_path, (1000, 1500), blur=50)
+            results.time("overlay_poster_decode_blur", args.posters, decode_blur)
+    finally:
+        server_process.terminate()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    output = {
+        "commit": commit,
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plexapi": plexapi.VERSION,
+        "parameters": {"movies": args.movies, "shows": args.shows, "episodes": args.episodes, "filter_items": args.filter_items, "posters": args.posters, "templates": args.templates, "seed": args.seed},
+        "results": results.results
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(output, handle, indent=2)
+    else:
+        print(json.dumps(output, indent=2))
+
+if __name__ == "__main__":
+    main()
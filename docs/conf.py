@@ -167,6 +167,7 @@ html_theme_options = {
             ("MdbList", "config/mdblist"),
             ("OMDb", "config/omdb"),
             ("AniDB", "config/anidb"),
+            ("AniList", "config/anilist"),
             ("MyAnimeList", "config/myanimelist"),
             ("Notifiarr", "config/notifiarr"),
         ]),
@@ -140,5 +140,5 @@ class AniDB:
         else:
             raise Failed(f"AniDB Error: Method {method} not supported")
         logger.debug("")
-        logger.debug(f"{len(anidb_ids)} AniDB IDs Found: {anidb_ids}")
+        logger.debug("%s AniDB IDs Found: %s", len(anidb_ids), anidb_ids)
         return anidb_ids
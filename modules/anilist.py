@@ -57,9 +57,11 @@ country_codes = [
 ]
 
 class AniList:
-    def __init__(self, config):
+    def __init__(self, config, batch_size=25):
         self.config = config
+        self.batch_size = batch_size
         self._options = None
+        self._titles = {}
 
     @property
     def options(self):
@@ -76,7 +78,7 @@ class AniList:
             self._options["Tag Category"][media_tag["category"].lower().replace(" ", "-")] = media_tag["category"]
         return self._options
 
-    def _request(self, query, variables, level=1):
+    def _request(self, query, variables, level=1, partial=False):
         if self.config.trace_mode:
             logger.debug(f"Query: {query}")
             logger.debug(f"Variables: {variables}")
@@ -89,20 +91,31 @@ class AniList:
                 wait_time = int(response.headers["Retry-After"]) if "Retry-After" in response.headers else 0
                 time.sleep(wait_time if wait_time > 0 else 10)
                 if level < 6:
-                    return self._request(query, variables, level=level + 1)
+                    return self._request(query, variables, level=level + 1, partial=partial)
                 raise Failed(f"AniList Error: Connection Failed")
-            else:
+            elif not partial or not json_obj.get("data"):
                 raise Failed(f"AniList Error: {json_obj['errors'][0]['message']}")
-        else:
-            time.sleep(60 / 90)
+        time.sleep(60 / 90)
         return json_obj
 
+    def _batch(self, anilist_ids, fields, studio=False):
+        results = {}
+        anilist_ids = list(dict.fromkeys(anilist_ids))
+        for i in range(0, len(anilist_ids), self.batch_size):
+            batch = anilist_ids[i:i + self.batch_size]
+            aliases = " ".join([f"a{anilist_id}: {'Studio' if studio else 'Media'}(id: {anilist_id}) {{{fields}}}" for anilist_id in batch])
+            data = self._request(f"query {{{aliases}}}", {}, partial=True)["data"]
+            for anilist_id in batch:
+                results[anilist_id] = data[f"a{anilist_id}"] if data and f"a{anilist_id}" in data else None
+                if results[anilist_id] and not studio:
+                    title = results[anilist_id]["title"]
+                    self._titles[anilist_id] = title["english" if title["english"] else "romaji"]
+        return results
+
     def _validate_id(self, anilist_id):
-        query = "query ($id: Int) {Media(id: $id) {id title{romaji english}}}"
-        media = self._request(query, {"id": anilist_id})["data"]["Media"]
-        if media["id"]:
-            return media["id"], media["title"]["english" if media["title"]["english"] else "romaji"]
-        raise Failed(f"AniList Error: No AniList ID found for {anilist_id}")
+        if anilist_id not in self._titles and not self._batch([anilist_id], "id title{romaji english}")[anilist_id]:
+            raise Failed(f"AniList Error: No AniList ID found for {anilist_id}")
+        return anilist_id, self._titles[anilist_id]
 
     def _pagenation(self, query, limit=0, variables=None):
         anilist_ids = []
@@ -189,39 +202,35 @@ class AniList:
                     anilist_ids.append(media["id"])
         return anilist_ids, name
 
-    def _relations(self, anilist_id, ignore_ids=None):
-        query = """
-            query ($id: Int) {
-              Media(id: $id) {
-                id
-                relations {
-                  edges {node{id type} relationType}
-                  nodes {id type}
-                }
-              }
-            }
-        """
-        new_anilist_ids = []
-        anilist_ids = []
-        name = ""
-        if not ignore_ids:
-            ignore_ids = [anilist_id]
-            anilist_id, name = self._validate_id(anilist_id)
-            anilist_ids.append(anilist_id)
-        json_obj = self._request(query, {"id": anilist_id})
-        edges = [media["node"]["id"] for media in json_obj["data"]["Media"]["relations"]["edges"]
-                 if media["relationType"] not in ["CHARACTER", "OTHER"] and media["node"]["type"] == "ANIME"]
-        for media in json_obj["data"]["Media"]["relations"]["nodes"]:
-            if media["id"] and media["id"] not in ignore_ids and media["id"] in edges and media["type"] == "ANIME":
-                new_anilist_ids.append(media["id"])
-                ignore_ids.append(media["id"])
-                anilist_ids.append(media["id"])
-
-        for next_id in new_anilist_ids:
-            new_relation_ids, ignore_ids, _ = self._relations(next_id, ignore_ids=ignore_ids)
-            anilist_ids.extend(new_relation_ids)
+    def _relations(self, anilist_id):
+        fields = "id title{romaji english} relations{edges{node{id type} relationType} nodes{id type}}"
+        related = {}
+        current = [anilist_id]
+        while current:
+            next_ids = []
+            for media_id, media in self._batch(current, fields).items():
+                if not media:
+                    if media_id == anilist_id:
+                        raise Failed(f"AniList Error: No AniList ID found for {anilist_id}")
+                    related[media_id] = []
+                    continue
+                edges = [e["node"]["id"] for e in media["relations"]["edges"] if e["relationType"] not in ["CHARACTER", "OTHER"] and e["node"]["type"] == "ANIME"]
+                related[media_id] = [m["id"] for m in media["relations"]["nodes"] if m["id"] and m["id"] in edges and m["type"] == "ANIME"]
+                next_ids.extend([r for r in related[media_id] if r not in related and r not in current and r not in next_ids])
+            current = next_ids
 
-        return anilist_ids, ignore_ids, name
+        anilist_ids = [anilist_id]
+        ignore_ids = {anilist_id}
+        def walk(media_id):
+            new_ids = [r for r in related.get(media_id, []) if r not in ignore_ids]
+            for new_id in new_ids:
+                if new_id not in ignore_ids:
+                    ignore_ids.add(new_id)
+                    anilist_ids.append(new_id)
+            for new_id in new_ids:
+                walk(new_id)
+        walk(anilist_id)
+        return anilist_ids, self._titles[anilist_id]
 
     def _userlist(self, username, list_name, sort_by):
         query = """
@@ -273,12 +282,12 @@ class AniList:
     def validate_anilist_ids(self, anilist_ids, studio=False):
         anilist_id_list = util.get_int_list(anilist_ids, "AniList ID")
         anilist_values = []
-        query = f"query ($id: Int) {{{'Studio(id: $id) {name}' if studio else 'Media(id: $id) {id}'}}}"
+        results = self._batch(anilist_id_list, "name" if studio else "id title{romaji english}", studio=studio)
         for anilist_id in anilist_id_list:
-            try:
-                self._request(query, {"id": anilist_id})
+            if results[anilist_id]:
                 anilist_values.append(anilist_id)
-            except Failed as e:     logger.error(e)
+            else:
+                logger.error(f"AniList Error: No AniList {'Studio ' if studio else ''}ID found for {anilist_id}")
         if len(anilist_values) > 0:
             return anilist_values
         raise Failed(f"AniList Error: No valid AniList IDs in {anilist_ids}")
@@ -292,7 +301,7 @@ class AniList:
             anilist_ids, name = self._studio(data)
             logger.info(f"Processing AniList Studio: ({data}) {name} ({len(anilist_ids)} Anime)")
         elif method == "anilist_relations":
-            anilist_ids, _, name = self._relations(data)
+            anilist_ids, name = self._relations(data)
             logger.info(f"Processing AniList Relations: ({data}) {name} ({len(anilist_ids)} Anime)")
         elif method == "anilist_userlist":
             anilist_ids = self._userlist(data["username"], data["list_name"], data["sort_by"])
@@ -321,5 +330,5 @@ class AniList:
             logger.info(message)
             anilist_ids = self._search(**data)
         logger.debug("")
-        logger.debug(f"{len(anilist_ids)} AniList IDs Found: {anilist_ids}")
+        logger.debug("%s AniList IDs Found: %s", len(anilist_ids), anilist_ids)
         return anilist_ids
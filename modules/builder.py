@@ -1,4 +1,5 @@
-import os, re, time
+import os, re, threading, time
+from concurrent.futures import Future
 from datetime import datetime
 from modules import anidb, anilist, flixpatrol, icheckmovies, imdb, letterboxd, mal, plex, radarr, reciperr, sonarr, tautulli, tmdb, trakt, tvdb, mdblist, util
 from modules.util import Failed, NonExisting, NotScheduled, NotScheduledRange, Overlay, Deleted
@@ -174,8 +175,29 @@ music_attributes = [
    "item_assets", "item_refresh", "item_refresh_delay", "plex_search", "plex_all", "filters"
 ] + details + summary_details + poster_details + background_details
 
+builder_services = [
+    "plex", "tautulli", "anidb", "anilist", "mal", "tvdb", "imdb", "flixpatrol", "icheckmovies",
+    "letterboxd", "reciperr", "stevenlu", "mdblist", "tmdb", "trakt", "radarr", "sonarr"
+]
+no_prefetch_services = ["plex", "tautulli", "radarr", "sonarr"]
+service_limits = {"anidb": 1, "anilist": 1, "mal": 1}
+library_bound_services = ["plex", "tautulli", "anidb", "anilist", "mal", "radarr", "sonarr"]
+no_memo_methods = ["plex_search", "plex_collectionless"]
+
+def memo_value(value):
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), memo_value(v)) for k, v in value.items()))
+    elif isinstance(value, (list, tuple)):
+        return tuple(memo_value(v) for v in value)
+    return str(value).strip()
+
+def builder_service(method):
+    return next((s for s in builder_services if s in method), None)
+
+service_semaphores = {s: threading.BoundedSemaphore(service_limits[s] if s in service_limits else 2) for s in builder_services}
+
 class CollectionBuilder:
-    def __init__(self, config, metadata, name, data, library=None, overlay=None, extra=None):
+    def __init__(self, config, metadata, name, data, library=None, overlay=None, extra=None, prefetch_only=False):
         self.config = config
         self.metadata = metadata
         self.mapping_name = name
@@ -184,6 +206,7 @@ class CollectionBuilder:
         self.libraries = []
         self.playlist = library is None
         self.overlay = overlay
+        self.prefetch_only = prefetch_only
         methods = {m.lower(): m for m in self.data}
         if self.playlist:
             self.type = "playlist"
@@ -336,6 +359,7 @@ class CollectionBuilder:
         self.added_to_radarr = []
         self.added_to_sonarr = []
         self.builders = []
+        self.prefetched_ids = {}
         self.filters = []
         self.tmdb_filters = []
         self.added_items = []
@@ -406,7 +430,7 @@ class CollectionBuilder:
                         err = e
                 if err:
                     suffix = ""
-                    if self.details["delete_not_scheduled"]:
+                    if self.details["delete_not_scheduled"] and not self.prefetch_only:
                         try:
                             self.obj = self.library.get_playlist(self.name) if self.playlist else self.library.get_collection(self.name)
                             logger.info(self.delete())
@@ -623,7 +647,7 @@ class CollectionBuilder:
                     logger.warning(f"Collection Warning: {method_final} attribute is blank")
                 elif self.playlist and method_name not in playlist_attributes:
                     raise Failed(f"{self.Type} Error: {method_final} attribute not allowed when using playlists")
-                elif not self.config.Trakt and "trakt" in method_name:
+                elif "trakt" in method_name and not self.config.Trakt:
                     raise Failed(f"{self.Type} Error: {method_final} requires Trakt to be configured")
                 elif not self.library.Radarr and "radarr" in method_name:
                     logger.error(f"{self.Type} Error: {method_final} requires Radarr to be configured")
@@ -631,7 +655,7 @@ class CollectionBuilder:
                     logger.error(f"{self.Type} Error: {method_final} requires Sonarr to be configured")
                 elif not self.library.Tautulli and "tautulli" in method_name:
                     raise Failed(f"{self.Type} Error: {method_final} requires Tautulli to be configured")
-                elif not self.config.MyAnimeList and "mal" in method_name:
+                elif "mal" in method_name and not self.config.MyAnimeList:
                     raise Failed(f"{self.Type} Error: {method_final} requires MyAnimeList to be configured")
                 elif self.library.is_movie and method_name in show_only_builders:
                     raise Failed(f"{self.Type} Error: {method_final} attribute only allowed for show libraries")
@@ -718,6 +742,9 @@ class CollectionBuilder:
         if not self.server_preroll and not self.smart_url and not self.blank_collection and len(self.builders) == 0:
             raise Failed(f"{self.Type} Error: No builders were found")
 
+        if self.prefetch_only:
+            return
+
         if self.blank_collection and len(self.builders) > 0:
             raise Failed(f"{self.Type} Error: No builders allowed with blank_collection")
 
@@ -757,7 +784,7 @@ class CollectionBuilder:
                 if (self.smart and not self.obj.smart) or (not self.smart and self.obj.smart):
                     logger.info("")
                     logger.error(f"{self.Type} Error: Converting {self.obj.title} to a {'smart' if self.smart else 'normal'} collection")
-                    self.library.query(self.obj.delete)
+                    self.library.delete(self.obj)
                     self.obj = None
             except Failed:
                 self.obj = None
@@ -1463,11 +1490,62 @@ class CollectionBuilder:
                 else:
                     logger.error(message)
 
+    def prefetch_ids(self, executor):
+        if self.smart_url or self.blank_collection:
+            return
+        for method, value in self.builders:
+            service = builder_service(method)
+            prefetch_key = (method, str(value))
+            if service and service not in no_prefetch_services and prefetch_key not in self.prefetched_ids:
+                records = []
+                self.prefetched_ids[prefetch_key] = (executor.submit(self._prefetch, service_semaphores[service], method, value, records), records)
+
+    def _prefetch(self, semaphore, method, value, records):
+        with semaphore:
+            logger.start_capture(records)
+            try:
+                return self.fetch_ids(method, value)
+            finally:
+                logger.stop_capture()
+
     def gather_ids(self, method, value):
+        prefetch_key = (method, str(value))
+        if prefetch_key in self.prefetched_ids:
+            future, records = self.prefetched_ids.pop(prefetch_key)
+            try:
+                return future.result()
+            finally:
+                logger.replay(records)
+        return self.fetch_ids(method, value)
+
+    def fetch_ids(self, method, value):
+        if method in no_memo_methods:
+            return self._fetch_ids(method, value)
+        service = builder_service(method)
+        scope = self.library.mapping_name if service in library_bound_services else self.library.type
+        memo_key = (scope, method, memo_value(value), self.language, self.tmdb_region)
+        with self.config.builder_lock:
+            fetching = memo_key not in self.config.builder_ids
+            if fetching:
+                self.config.builder_ids[memo_key] = Future()
+            future = self.config.builder_ids[memo_key]
+        if fetching:
+            try:
+                future.set_result(self._fetch_ids(method, value))
+            except BaseException as e:
+                with self.config.builder_lock:
+                    self.config.builder_ids.pop(memo_key)
+                future.set_exception(e)
+                raise
+        else:
+            logger.info(f"Builder: {method} loaded from an earlier collection")
+        return list(future.result())
+
+    def _fetch_ids(self, method, value):
         expired = None
         list_key = None
         if self.config.Cache and self.details["cache_builders"]:
-            list_key, expired = self.config.Cache.query_list_cache(f"{self.library.type}:{method}", str(value), self.details["cache_builders"])
+            list_key, expired = self.config.Cache.query_list_cache(f"{self.library.type}:{method}", str(value))
             if list_key and expired is False:
                 logger.info(f"Builder: {method} loaded from Cache")
                 return self.config.Cache.query_list_ids(list_key)
@@ -1521,8 +1599,9 @@ class CollectionBuilder:
         if len(ids) > 0:
             total_ids = len(ids)
             logger.debug("")
-            logger.debug(f"{total_ids} IDs Found: {ids}")
+            logger.debug("%s IDs Found: %s", total_ids, ids)
             logger.debug("")
+            self.config.Convert.preload(ids)
             for i, input_data in enumerate(ids, 1):
                 input_id, id_type = input_data
                 logger.ghost(f"Parsing ID {i}/{total_ids}")
@@ -1648,6 +1727,8 @@ class CollectionBuilder:
                 if not isinstance(rating_keys, list):
                     rating_keys = [rating_keys]
                 for rk in rating_keys:
+                    if self.library and not self.library.in_watch_scope(int(rk)):
+                        continue
                     try:
                         item = self.fetch_item(rk)
                         if self.playlist and isinstance(item, (Show, Season)):
@@ -1670,7 +1751,7 @@ class CollectionBuilder:
             if not isinstance(item, (Movie, Show, Season, Episode, Artist, Album, Track)):
                 logger.error(f"{self.Type} Error: Item: {item} is an invalid type")
                 continue
-            if item not in self.added_items:
+            if item not in self.added_items and (not self.library or self.library.in_watch_scope(item)):
                 if item.ratingKey in self.filtered_keys:
                     if self.details["show_filtered"] is True:
                         logger.info(f"{name} {self.Type} | X | {self.filtered_keys[item.ratingKey]}")
@@ -2057,6 +2138,8 @@ class CollectionBuilder:
                 amount_added += 1
                 if self.details["changes_webhooks"]:
                     self.notification_additions.append(util.item_set(item, self.library.get_id_from_maps(item.ratingKey)))
+        if items_added and not self.playlist:
+            self.library.clear_tags("label" if self.smart_label_collection else "collection")
         if self.playlist and items_added and not self.obj:
             self.obj = self.library.create_playlist(self.name, items_added)
             logger.info("")
@@ -2089,6 +2172,8 @@ class CollectionBuilder:
                 amount_removed += 1
                 if self.details["changes_webhooks"]:
                     self.notification_removals.append(util.item_set(item, self.library.get_id_from_maps(item.ratingKey)))
+            if items_removed and not self.playlist:
+                self.library.clear_tags("label" if self.smart_label_collection else "collection")
             if self.playlist and items_removed:
                 self.obj.reload()
                 self.obj.removeItems(items_removed)
@@ -2613,7 +2698,7 @@ class CollectionBuilder:
         else:
             output = ""
         if self.obj:
-            self.library.query(self.obj.delete)
+            self.library.delete(self.obj)
 
         if self.playlist and self.valid_users:
             for user in self.valid_users:
@@ -2695,6 +2780,8 @@ class CollectionBuilder:
                     else:
                         add_id = None
                     self.notification_additions.append(util.item_set(current, add_id))
+            if amount_added:
+                self.library.clear_tags("label" if self.smart_label_collection else "collection")
             self.send_notifications()
             logger.info(f"{len(rating_keys)} {self.collection_level.capitalize()}{'s' if len(rating_keys) > 1 else ''} Processed")
 
@@ -1,14 +1,63 @@
-import os, random, sqlite3
+import json, os, random, sqlite3, threading, time
 from contextlib import closing
-from datetime import datetime, timedelta
+from datetime import datetime
 from modules import util
+from modules.metrics import metrics
 
 logger = util.logger
 
+crosswalk_types = ["tmdb", "imdb", "tvdb"]
+schema_version = 1
+maintenance_interval = 7
+expiring_tables = [
+    "guids_map", "id_crosswalk", "letterboxd_map", "flixpatrol_map", "omdb_data3", "mdb_data2", "tmdb_movie_data",
+    "tmdb_show_data", "tvdb_data3", "tvdb_map", "anime_map", "list_cache", "imdb_parental", "ergast_race"
+]
+rebuilt_tables = expiring_tables + ["radarr_adds", "sonarr_adds", "list_ids", "overlay_ratings", "library_snapshot", "library_watermark", "url_etags"]
+
+def get_cache_path(config_path):
+    return f"{os.path.splitext(config_path)[0]}.cache"
+
+def expiration_time(expired, expiration):
+    return int(time.time()) + 86400 * (expiration if expired is True else expiration - random.randint(1, expiration))
+
+def is_expired(expiration_date):
+    return expiration_date is None or expiration_date < time.time()
+
+def cache_stats(config_path):
+    stats = []
+    with sqlite3.connect(get_cache_path(config_path)) as connection:
+        with closing(connection.cursor()) as cursor:
+            sizes = {}
+            try:
+                cursor.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")
+                sizes = {name: size for name, size in cursor.fetchall()}
+            except sqlite3.OperationalError:
+                pass
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
+            for table in [row[0] for row in cursor.fetchall()]:
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name = ?", (table,))
+                index_size = sum([sizes[row[0]] for row in cursor.fetchall() if row[0] in sizes])
+                cursor.execute(f"SELECT count(*) FROM {table}")
+                stats.append((table, cursor.fetchone()[0], sizes[table] + index_size if table in sizes else None))
+    return stats
+
+def cache_metric(table):
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            result = func(*args, **kwargs)
+            metrics.cache_result(table, result[-1] is False)
+            return result
+        return wrapper
+    return decorator
+
 class Cache:
-    def __init__(self, config_path, expiration):
-        self.cache_path = f"{os.path.splitext(config_path)[0]}.cache"
+    def __init__(self, config_path, expiration, max_size=0):
+        self.cache_path = get_cache_path(config_path)
         self.expiration = expiration
+        self.max_size = max_size
+        self._memory = {}
+        self._memory_lock = threading.Lock()
         with sqlite3.connect(self.cache_path) as connection:
             connection.row_factory = sqlite3.Row
             with closing(connection.cursor()) as cursor:
@@ -27,56 +76,51 @@ class Cache:
                 cursor.execute("DROP TABLE IF EXISTS omdb_data2")
                 cursor.execute("DROP TABLE IF EXISTS tvdb_data")
                 cursor.execute("DROP TABLE IF EXISTS tvdb_data2")
+                cursor.execute("PRAGMA user_version")
+                migrate = []
+                if cursor.fetchone()[0] < schema_version:
+                    cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+                    existing = [row["name"] for row in cursor.fetchall()]
+                    for table in rebuilt_tables:
+                        if table in existing:
+                            cursor.execute(f"DROP TABLE IF EXISTS {table}_old")
+                            cursor.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+                            migrate.append(table)
+                    if migrate:
+                        logger.info("Upgrading cache database, this may take a while...")
                 cursor.execute(
                     """CREATE TABLE IF NOT EXISTS guids_map (
-                    key INTEGER PRIMARY KEY,
-                    plex_guid TEXT UNIQUE,
+                    plex_guid TEXT PRIMARY KEY,
                     t_id TEXT,
                     imdb_id TEXT,
                     media_type TEXT,
-                    expiration_date TEXT)"""
+                    expiration_date INTEGER) WITHOUT ROWID"""
                 )
                 cursor.execute(
-                    """CREATE TABLE IF NOT EXISTS imdb_to_tmdb_map (
+                    """CREATE TABLE IF NOT EXISTS id_crosswalk (
                     key INTEGER PRIMARY KEY,
-                    imdb_id TEXT UNIQUE,
-                    tmdb_id TEXT,
                     media_type TEXT,
-                    expiration_date TEXT)"""
-                )
-                cursor.execute(
-                    """CREATE TABLE IF NOT EXISTS imdb_to_tvdb_map2 (
-                    key INTEGER PRIMARY KEY,
-                    imdb_id TEXT UNIQUE,
-                    tvdb_id TEXT,
-                    expiration_date TEXT)"""
-                )
-                cursor.execute(
-                    """CREATE TABLE IF NOT EXISTS tmdb_to_tvdb_map2 (
-                    key INTEGER PRIMARY KEY,
-                    tmdb_id TEXT UNIQUE,
+                    tmdb_id TEXT,
+                    imdb_id TEXT,
                     tvdb_id TEXT,
-                    expiration_date TEXT)"""
+                    expiration_date INTEGER)"""
                 )
                 cursor.execute(
                     """CREATE TABLE IF NOT EXISTS letterboxd_map (
-                    key INTEGER PRIMARY KEY,
-                    letterboxd_id TEXT UNIQUE,
+                    letterboxd_id TEXT PRIMARY KEY,
                     tmdb_id TEXT,
-                    expiration_date TEXT)"""
+                    expiration_date INTEGER) WITHOUT ROWID"""
                 )
                 cursor.execute(
                     """CREATE TABLE IF NOT EXISTS flixpatrol_map (
-                    key INTEGER PRIMARY KEY,
-                    flixpatrol_id TEXT UNIQUE,
+                    flixpatrol_id TEXT PRIMARY KEY,
                     tmdb_id TEXT,
                     media_type TEXT,
-                    expiration_date TEXT)"""
+                    expiration_date INTEGER) WITHOUT ROWID"""
                 )
                 cursor.execute(
                     """CREATE TABLE IF NOT EXISTS omdb_data3 (
-                    key INTEGER PRIMARY KEY,
-                    imdb_id TEXT UNIQUE,
+                    imdb_id TEXT PRIMARY KEY,
                     title TEXT,
                     year INTEGER,
                     released TEXT,
@@ -89,12 +133,11 @@ class Cache:
                     series_id TEXT,
                     season_num INTEGER,
                     episode_num INTEGER,
-                    expiration_date TEXT)"""
+                    expiration_date INTEGER)"""
                 )
                 cursor.execute(
                     """CREATE TABLE IF NOT EXISTS mdb_data2 (
-                    key INTEGER PRIMARY KEY,
-                    key_id TEXT UNIQUE,
+                    key_id TEXT PRIMARY KEY,
                     title TEXT,
                     year INTEGER,
                     released TEXT,
@@ -113,12 +156,11 @@ class Cache:
                     letterboxd_rating REAL,
                     commonsense TEXT,
                     certification TEXT,
-                    expiration_date TEXT)"""
+                    expiration_date INTEGER)"""
                 )
                 cursor.execute(
                     """CREATE TABLE IF NOT EXISTS tmdb_movie_data (
-                    key INTEGER PRIMARY KEY,
-                    tmdb_id INTEGER UNIQUE,
+                    tmdb_id INTEGER PRIMARY KEY,
                     title TEXT,
                     original_title TEXT,
                     studio TEXT,
@@ -136,12 +178,11 @@ class Cache:
                     release_date TEXT,
                     collection_id INTEGER,
                     collection_name TEXT,
-                    expiration_date TEXT)"""
+                    expiration_date INTEGER)"""
                 )
                 cursor.execute(
                     """CREATE TABLE IF NOT EXISTS tmdb_show_data (
-                    key INTEGER PRIMARY KEY,
-                    tmdb_id INTEGER UNIQUE,
+                    tmdb_id INTEGER PRIMARY KEY,
                     title TEXT,
                     original_title TEXT,
                     studio TEXT,
@@ -163,12 +204,12 @@ class Cache:
                     tvdb_id INTEGER,
                     countries TEXT,
                     seasons TEXT,
-                    expiration_date TEXT)"""
+                    expiration_date INTEGER)"""
                 )
                 cursor.execute(
                     """CREATE TABLE IF NOT EXISTS tvdb_data3 (
                     key INTEGER PRIMARY KEY,
-                    tvdb_id INTEGER UNIQUE,
+                    tvdb_id INTEGER,
                     type TEXT,
                     title TEXT,
                     summary TEXT,
@@ -176,23 +217,22 @@ class Cache:
                     background_url TEXT,
                     release_date TEXT,
                     genres TEXT,
-                    expiration_date TEXT)"""
+                    expiration_date INTEGER,
+                    UNIQUE(tvdb_id, type))"""
                 )
                 cursor.execute(
                     """CREATE TABLE IF NOT EXISTS tvdb_map (
-                    key INTEGER PRIMARY KEY,
-                    tvdb_url TEXT UNIQUE,
+                    tvdb_url TEXT PRIMARY KEY,
                     tvdb_id INTEGER,
-                    expiration_date TEXT)"""
+                    expiration_date INTEGER) WITHOUT ROWID"""
                 )
                 cursor.execute(
                     """CREATE TABLE IF NOT EXISTS anime_map (
-                    key INTEGER PRIMARY KEY,
-                    anidb TEXT UNIQUE,
+                    anidb TEXT PRIMARY KEY,
                     anilist TEXT,
                     myanimelist TEXT,
                     kitsu TEXT,
-                    expiration_date TEXT)"""
+                    expiration_date INTEGER) WITHOUT ROWID"""
                 )
                 cursor.execute(
                     """CREATE TABLE IF NOT EXISTS image_maps (
@@ -201,57 +241,118 @@ class Cache:
                 )
                 cursor.execute(
                     """CREATE TABLE IF NOT EXISTS radarr_adds (
-                    key INTEGER PRIMARY KEY,
                     tmdb_id TEXT,
-                    library TEXT)"""
+                    library TEXT,
+                    PRIMARY KEY(tmdb_id, library)) WITHOUT ROWID"""
                 )
                 cursor.execute(
                     """CREATE TABLE IF NOT EXISTS sonarr_adds (
-                    key INTEGER PRIMARY KEY,
                     tvdb_id TEXT,
-                    library TEXT)"""
+                    library TEXT,
+                    PRIMARY KEY(tvdb_id, library)) WITHOUT ROWID"""
                 )
                 cursor.execute(
                     """CREATE TABLE IF NOT EXISTS list_cache (
                     key INTEGER PRIMARY KEY,
                     list_type TEXT,
                     list_data TEXT,
-                    expiration_date TEXT)"""
+                    expiration_date INTEGER,
+                    UNIQUE(list_type, list_data))"""
                 )
                 cursor.execute(
                     """CREATE TABLE IF NOT EXISTS list_ids (
-                    key INTEGER PRIMARY KEY,
-                    list_key TEXT,
+                    list_key INTEGER,
                     media_id TEXT,
-                    media_type TEXT)"""
+                    media_type TEXT,
+                    PRIMARY KEY(list_key, media_id, media_type)) WITHOUT ROWID"""
                 )
                 cursor.execute(
                     """CREATE TABLE IF NOT EXISTS imdb_parental (
-                    key INTEGER PRIMARY KEY,
-                    imdb_id TEXT,
+                    imdb_id TEXT PRIMARY KEY,
                     nudity TEXT,
                     violence TEXT,
                     profanity TEXT,
                     alcohol TEXT,
                     frightening TEXT,
-                    expiration_date TEXT)"""
+                    expiration_date INTEGER) WITHOUT ROWID"""
                 )
                 cursor.execute(
                     """CREATE TABLE IF NOT EXISTS ergast_race (
-                    key INTEGER PRIMARY KEY,
                     season INTEGER,
                     round INTEGER,
                     name TEXT,
                     date TEXT,
-                    expiration_date TEXT)"""
+                    expiration_date INTEGER,
+                    PRIMARY KEY(season, round)) WITHOUT ROWID"""
                 )
                 cursor.execute(
                     """CREATE TABLE IF NOT EXISTS overlay_ratings (
-                    key INTEGER PRIMARY KEY,
                     rating_key INTEGER,
                     type TEXT,
-                    rating REAL)"""
+                    rating REAL,
+                    PRIMARY KEY(rating_key, type)) WITHOUT ROWID"""
+                )
+                cursor.execute(
+                    """CREATE TABLE IF NOT EXISTS overlay_backups (
+                    library TEXT,
+                    rating_key INTEGER,
+                    source TEXT,
+                    etag TEXT,
+                    modified TEXT,
+                    location TEXT,
+                    PRIMARY KEY(library, rating_key)) WITHOUT ROWID"""
+                )
+                cursor.execute(
+                    """CREATE TABLE IF NOT EXISTS library_snapshot (
+                    library TEXT,
+                    rating_key INTEGER,
+                    guid TEXT,
+                    updated_at INTEGER,
+                    PRIMARY KEY(library, rating_key)) WITHOUT ROWID"""
                 )
+                cursor.execute(
+                    """CREATE TABLE IF NOT EXISTS library_watermark (
+                    library TEXT PRIMARY KEY,
+                    watermark INTEGER) WITHOUT ROWID"""
+                )
+                cursor.execute(
+                    """CREATE TABLE IF NOT EXISTS url_etags (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    data TEXT)"""
+                )
+                cursor.execute(
+                    """CREATE TABLE IF NOT EXISTS cache_maintenance (
+                    name TEXT PRIMARY KEY,
+                    last_run INTEGER) WITHOUT ROWID"""
+                )
+                for table in migrate:
+                    cursor.execute(f"PRAGMA table_info({table}_old)")
+                    old_columns = [row["name"] for row in cursor.fetchall()]
+                    cursor.execute(f"PRAGMA table_info({table})")
+                    columns = [row["name"] for row in cursor.fetchall() if row["name"] in old_columns]
+                    values = [f"CAST(strftime('%s', expiration_date) AS INTEGER) + {self.expiration * 86400}" if c == "expiration_date" else c for c in columns]
+                    cursor.execute(f"INSERT OR IGNORE INTO {table}({', '.join(columns)}) SELECT {', '.join(values)} FROM {table}_old")
+                    cursor.execute(f"DROP TABLE {table}_old")
+                for map_name, media_type, id_names in [
+                    ("imdb_to_tmdb_map", None, ["imdb", "tmdb"]),
+                    ("tmdb_to_tvdb_map2", "show", ["tmdb", "tvdb"]),
+                    ("imdb_to_tvdb_map2", "show", ["imdb", "tvdb"])
+                ]:
+                    cursor.execute("SELECT count(name) FROM sqlite_master WHERE type='table' AND name=?", (map_name,))
+                    if cursor.fetchone()[0] > 0:
+                        cursor.execute(f"SELECT *, CAST(strftime('%s', expiration_date) AS INTEGER) + {self.expiration * 86400} AS expires FROM {map_name}")
+                        for row in cursor.fetchall():
+                            if row["expires"] and all(row[f"{i}_id"] for i in id_names):
+                                self._merge_crosswalk(cursor, media_type if media_type else row["media_type"], {i: row[f"{i}_id"] for i in id_names}, row["expires"])
+                        cursor.execute(f"DROP TABLE IF EXISTS {map_name}")
+                cursor.execute("CREATE INDEX IF NOT EXISTS id_crosswalk_tmdb ON id_crosswalk(tmdb_id, media_type)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS id_crosswalk_imdb ON id_crosswalk(imdb_id)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS id_crosswalk_tvdb ON id_crosswalk(tvdb_id)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS anime_map_anilist ON anime_map(anilist)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS anime_map_myanimelist ON anime_map(myanimelist)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS anime_map_kitsu ON anime_map(kitsu)")
+                cursor.execute(f"PRAGMA user_version = {schema_version}")
                 cursor.execute("SELECT count(name) FROM sqlite_master WHERE type='table' AND name='image_map'")
                 if cursor.fetchone()[0] > 0:
                     cursor.execute(f"SELECT DISTINCT library FROM image_map")
@@ -263,7 +364,44 @@ class Cache:
                                 final_table = table_name if row["type"] == "poster" else f"{table_name}_backgrounds"
                                 self.update_image_map(row["rating_key"], final_table, row["location"], row["compare"], overlay=row["overlay"])
                     cursor.execute("DROP TABLE IF EXISTS image_map")
+                cursor.execute("SELECT last_run FROM cache_maintenance WHERE name = 'maintenance'")
+                row = cursor.fetchone()
+                run_maintenance = not row or row["last_run"] < time.time() - maintenance_interval * 86400
+        if run_maintenance:
+            self.maintenance()
+
+    def maintenance(self):
+        logger.info("Running cache database maintenance...")
+        now = int(time.time())
+        removed = 0
+        with sqlite3.connect(self.cache_path) as connection:
+            connection.row_factory = sqlite3.Row
+            with closing(connection.cursor()) as cursor:
+                for table in expiring_tables:
+                    cursor.execute(f"DELETE FROM {table} WHERE expiration_date IS NULL OR expiration_date < ?", (now,))
+                    removed += cursor.rowcount
+                cursor.execute("DELETE FROM list_ids WHERE list_key NOT IN (SELECT key FROM list_cache)")
+                removed += cursor.rowcount
+                if self.max_size:
+                    cursor.execute("SELECT (page_count - freelist_count) * page_size FROM pragma_page_count, pragma_freelist_count, pragma_page_size")
+                    size = cursor.fetchone()[0]
+                    if size > self.max_size * 1048576:
+                        fraction = 1 - self.max_size * 1048576 / size
+                        for table in expiring_tables:
+                            cursor.execute(f"SELECT count(*) FROM {table}")
+                            offset = int(cursor.fetchone()[0] * fraction)
+                            if offset > 0:
+                                cursor.execute(f"DELETE FROM {table} WHERE expiration_date <= (SELECT expiration_date FROM {table} ORDER BY expiration_date LIMIT 1 OFFSET ?)", (offset - 1,))
+                                removed += cursor.rowcount
+                        cursor.execute("DELETE FROM list_ids WHERE list_key NOT IN (SELECT key FROM list_cache)")
+                        removed += cursor.rowcount
+                cursor.execute("INSERT OR REPLACE INTO cache_maintenance(name, last_run) VALUES('maintenance', ?)", (now,))
+        with closing(sqlite3.connect(self.cache_path, isolation_level=None)) as connection:
+            connection.execute("ANALYZE")
+            connection.execute("VACUUM")
+        logger.info(f"Cache database maintenance removed {removed} rows")
 
+    @cache_metric("guids_map")
     def query_guid_map(self, plex_guid):
         id_to_return = None
         imdb_id = None
@@ -275,49 +413,97 @@ class Cache:
                 cursor.execute(f"SELECT * FROM guids_map WHERE plex_guid = ?", (plex_guid,))
                 row = cursor.fetchone()
                 if row:
-                    time_between_insertion = datetime.now() - datetime.strptime(row["expiration_date"], "%Y-%m-%d")
                     id_to_return = util.get_list(row["t_id"], int_list=True)
                     imdb_id = util.get_list(row["imdb_id"])
                     media_type = row["media_type"]
-                    expired = time_between_insertion.days > self.expiration
+                    expired = is_expired(row["expiration_date"])
         return id_to_return, imdb_id, media_type, expired
 
     def update_guid_map(self, plex_guid, t_id, imdb_id, expired, media_type):
-        expiration_date = datetime.now() if expired is True else (datetime.now() - timedelta(days=random.randint(1, self.expiration)))
+        expiration_date = expiration_time(expired, self.expiration)
         with sqlite3.connect(self.cache_path) as connection:
             connection.row_factory = sqlite3.Row
             with closing(connection.cursor()) as cursor:
                 cursor.execute(f"INSERT OR IGNORE INTO guids_map(plex_guid) VALUES(?)", (plex_guid,))
                 if media_type is None:
                     sql = f"UPDATE guids_map SET t_id = ?, imdb_id = ?, expiration_date = ? WHERE plex_guid = ?"
-                    cursor.execute(sql, (t_id, imdb_id, expiration_date.strftime("%Y-%m-%d"), plex_guid))
+                    cursor.execute(sql, (t_id, imdb_id, expiration_date, plex_guid))
                 else:
                     sql = f"UPDATE guids_map SET t_id = ?, imdb_id = ?, expiration_date = ?, media_type = ? WHERE plex_guid = ?"
-                    cursor.execute(sql, (t_id, imdb_id, expiration_date.strftime("%Y-%m-%d"), media_type, plex_guid))
-
-    def query_imdb_to_tmdb_map(self, _id, imdb=True, media_type=None, return_type=False):
-        from_id = "imdb_id" if imdb else "tmdb_id"
-        to_id = "tmdb_id" if imdb else "imdb_id"
-        return self._query_map("imdb_to_tmdb_map", _id, from_id, to_id, media_type=media_type, return_type=return_type)
+                    cursor.execute(sql, (t_id, imdb_id, expiration_date, media_type, plex_guid))
 
-    def update_imdb_to_tmdb_map(self, media_type, expired, imdb_id, tmdb_id):
-        self._update_map("imdb_to_tmdb_map", "imdb_id", imdb_id, "tmdb_id", tmdb_id, expired, media_type=media_type)
+    @cache_metric("id_crosswalk")
+    def query_crosswalk(self, id_type, _id, media_type=None):
+        ids = None
+        expired = None
+        with sqlite3.connect(self.cache_path) as connection:
+            connection.row_factory = sqlite3.Row
+            with closing(connection.cursor()) as cursor:
+                if media_type is None:
+                    cursor.execute(f"SELECT * FROM id_crosswalk WHERE {id_type}_id = ?", (str(_id),))
+                else:
+                    cursor.execute(f"SELECT * FROM id_crosswalk WHERE {id_type}_id = ? AND media_type = ?", (str(_id), media_type))
+                row = cursor.fetchone()
+                if row:
+                    ids = self._crosswalk_ids(row)
+                    expired = is_expired(row["expiration_date"])
+        return ids, expired
 
-    def query_imdb_to_tvdb_map(self, _id, imdb=True):
-        from_id = "imdb_id" if imdb else "tvdb_id"
-        to_id = "tvdb_id" if imdb else "imdb_id"
-        return self._query_map("imdb_to_tvdb_map2", _id, from_id, to_id)
+    def query_crosswalk_ids(self, id_type, id_list, media_type=None):
+        found = {}
+        with sqlite3.connect(self.cache_path) as connection:
+            connection.row_factory = sqlite3.Row
+            with closing(connection.cursor()) as cursor:
+                cursor.execute("CREATE TEMP TABLE IF NOT EXISTS crosswalk_lookup (lookup_id TEXT)")
+                cursor.execute("DELETE FROM crosswalk_lookup")
+                cursor.executemany("INSERT INTO crosswalk_lookup(lookup_id) VALUES(?)", [(str(i),) for i in set(id_list)])
+                sql = f"SELECT c.* FROM crosswalk_lookup l JOIN id_crosswalk c ON c.{id_type}_id = l.lookup_id"
+                if media_type is None:
+                    cursor.execute(sql)
+                else:
+                    cursor.execute(f"{sql} WHERE c.media_type = ?", (media_type,))
+                for row in cursor.fetchall():
+                    if not is_expired(row["expiration_date"]):
+                        found[row[f"{id_type}_id"]] = self._crosswalk_ids(row)
+        for _id in set(id_list):
+            metrics.cache_result("id_crosswalk", str(_id) in found)
+        return found
 
-    def update_imdb_to_tvdb_map(self, expired, imdb_id, tvdb_id):
-        self._update_map("imdb_to_tvdb_map2", "imdb_id", imdb_id, "tvdb_id", tvdb_id, expired)
+    def update_crosswalk(self, media_type, expired, **ids):
+        expiration_date = expiration_time(expired, self.expiration)
+        with sqlite3.connect(self.cache_path) as connection:
+            connection.row_factory = sqlite3.Row
+            with closing(connection.cursor()) as cursor:
+                self._merge_crosswalk(cursor, media_type, ids, expiration_date)
 
-    def query_tmdb_to_tvdb_map(self, _id, tmdb=True):
-        from_id = "tmdb_id" if tmdb else "tvdb_id"
-        to_id = "tvdb_id" if tmdb else "tmdb_id"
-        return self._query_map("tmdb_to_tvdb_map2", _id, from_id, to_id)
+    def _crosswalk_ids(self, row):
+        ids = {"media_type": row["media_type"]}
+        for id_type in crosswalk_types:
+            value = row[f"{id_type}_id"]
+            ids[id_type] = int(value) if value and value.isdigit() else value
+        return ids
 
-    def update_tmdb_to_tvdb_map(self, expired, tmdb_id, tvdb_id):
-        self._update_map("tmdb_to_tvdb_map2", "tmdb_id", tmdb_id, "tvdb_id", tvdb_id, expired)
+    def _merge_crosswalk(self, cursor, media_type, ids, expiration_date):
+        ids = {k: str(v) for k, v in ids.items() if v}
+        keys = []
+        for id_type, value in ids.items():
+            if id_type == "tmdb":
+                cursor.execute("SELECT key FROM id_crosswalk WHERE tmdb_id = ? AND media_type = ?", (value, media_type))
+            else:
+                cursor.execute(f"SELECT key FROM id_crosswalk WHERE {id_type}_id = ?", (value,))
+            keys.extend([row["key"] for row in cursor.fetchall() if row["key"] not in keys])
+        if not keys:
+            cursor.execute("INSERT INTO id_crosswalk(media_type) VALUES(?)", (media_type,))
+            keys = [cursor.lastrowid]
+        elif len(keys) > 1:
+            cursor.execute(f"SELECT * FROM id_crosswalk WHERE key IN ({', '.join(['?'] * len(keys))})", keys)
+            for row in cursor.fetchall():
+                for id_type in crosswalk_types:
+                    if id_type not in ids and row[f"{id_type}_id"]:
+                        ids[id_type] = row[f"{id_type}_id"]
+            cursor.execute(f"DELETE FROM id_crosswalk WHERE key IN ({', '.join(['?'] * (len(keys) - 1))})", keys[1:])
+        sets = [f"{id_type}_id = ?" for id_type in ids]
+        cursor.execute(f"UPDATE id_crosswalk SET {', '.join(sets)}, media_type = ?, expiration_date = ? WHERE key = ?", list(ids.values()) + [media_type, expiration_date, keys[0]])
 
     def query_letterboxd_map(self, letterboxd_id):
         return self._query_map("letterboxd_map", letterboxd_id, "letterboxd_id", "tmdb_id")
@@ -344,8 +530,6 @@ class Cache:
                     cursor.execute(f"SELECT * FROM {map_name} WHERE {from_id} = ? AND media_type = ?", (_id, media_type))
                 row = cursor.fetchone()
                 if row and row[to_id]:
-                    datetime_object = datetime.strptime(row["expiration_date"], "%Y-%m-%d")
-                    time_between_insertion = datetime.now() - datetime_object
                     if "_" in row[to_id]:
                         id_to_return = row[to_id]
                     else:
@@ -353,27 +537,29 @@ class Cache:
                             id_to_return = int(row[to_id])
                         except ValueError:
                             id_to_return = row[to_id]
-                    expired = time_between_insertion.days > self.expiration
+                    expired = is_expired(row["expiration_date"])
                     out_type = row["media_type"] if return_type else None
+        metrics.cache_result(map_name, expired is False)
         if return_type:
             return id_to_return, out_type, expired
         else:
             return id_to_return, expired
 
     def _update_map(self, map_name, val1_name, val1, val2_name, val2, expired, media_type=None):
-        expiration_date = datetime.now() if expired is True else (datetime.now() - timedelta(days=random.randint(1, self.expiration)))
+        expiration_date = expiration_time(expired, self.expiration)
         with sqlite3.connect(self.cache_path) as connection:
             connection.row_factory = sqlite3.Row
             with closing(connection.cursor()) as cursor:
                 cursor.execute(f"INSERT OR IGNORE INTO {map_name}({val1_name}) VALUES(?)", (val1,))
                 if media_type is None:
                     sql = f"UPDATE {map_name} SET {val2_name} = ?, expiration_date = ? WHERE {val1_name} = ?"
-                    cursor.execute(sql, (val2, expiration_date.strftime("%Y-%m-%d"), val1))
+                    cursor.execute(sql, (val2, expiration_date, val1))
                 else:
                     sql = f"UPDATE {map_name} SET {val2_name} = ?, expiration_date = ?, media_type = ? WHERE {val1_name} = ?"
-                    cursor.execute(sql, (val2, expiration_date.strftime("%Y-%m-%d"), media_type, val1))
+                    cursor.execute(sql, (val2, expiration_date, media_type, val1))
 
-    def query_omdb(self, imdb_id, expiration):
+    @cache_metric("omdb_data3")
+    def query_omdb(self, imdb_id):
         omdb_dict = {}
         expired = None
         with sqlite3.connect(self.cache_path) as connection:
@@ -396,13 +582,11 @@ class Cache:
                     omdb_dict["Season"] = row["season_num"] if row["season_num"] else None
                     omdb_dict["Episode"] = row["episode_num"] if row["episode_num"] else None
                     omdb_dict["Response"] = "True"
-                    datetime_object = datetime.strptime(row["expiration_date"], "%Y-%m-%d")
-                    time_between_insertion = datetime.now() - datetime_object
-                    expired = time_between_insertion.days > expiration
+                    expired = is_expired(row["expiration_date"])
         return omdb_dict, expired
 
     def update_omdb(self, expired, omdb, expiration):
-        expiration_date = datetime.now() if expired is True else (datetime.now() - timedelta(days=random.randint(1, expiration)))
+        expiration_date = expiration_time(expired, expiration)
         with sqlite3.connect(self.cache_path) as connection:
             connection.row_factory = sqlite3.Row
             with closing(connection.cursor()) as cursor:
@@ -413,9 +597,10 @@ class Cache:
                 cursor.execute(update_sql, (
                     omdb.title, omdb.year, omdb.released.strftime("%d %b %Y") if omdb.released else None, omdb.content_rating,
                     omdb.genres_str, omdb.imdb_rating, omdb.imdb_votes, omdb.metacritic_rating, omdb.type, omdb.series_id,
-                    omdb.season_num, omdb.episode_num, expiration_date.strftime("%Y-%m-%d"), omdb.imdb_id))
+                    omdb.season_num, omdb.episode_num, expiration_date, omdb.imdb_id))
 
-    def query_mdb(self, key_id, expiration):
+    @cache_metric("mdb_data2")
+    def query_mdb(self, key_id):
         mdb_dict = {}
         expired = None
         with sqlite3.connect(self.cache_path) as connection:
@@ -444,13 +629,11 @@ class Cache:
                         {"source": "tmdb", "value": row["tmdb_rating"] if row["tmdb_rating"] else None},
                         {"source": "letterboxd", "value": row["letterboxd_rating"] if row["letterboxd_rating"] else None}
                     ]
-                    datetime_object = datetime.strptime(row["expiration_date"], "%Y-%m-%d")
-                    time_between_insertion = datetime.now() - datetime_object
-                    expired = time_between_insertion.days > expiration
+                    expired = is_expired(row["expiration_date"])
         return mdb_dict, expired
 
     def update_mdb(self, expired, key_id, mdb, expiration):
-        expiration_date = datetime.now() if expired is True else (datetime.now() - timedelta(days=random.randint(1, expiration)))
+        expiration_date = expiration_time(expired, expiration)
         with sqlite3.connect(self.cache_path) as connection:
             connection.row_factory = sqlite3.Row
             with closing(connection.cursor()) as cursor:
@@ -464,10 +647,11 @@ class Cache:
                     mdb.imdbid, mdb.traktid, mdb.tmdbid, mdb.score, mdb.imdb_rating, mdb.metacritic_rating,
                     mdb.metacriticuser_rating, mdb.trakt_rating, mdb.tomatoes_rating, mdb.tomatoesaudience_rating,
                     mdb.tmdb_rating, mdb.letterboxd_rating, mdb.content_rating, mdb.commonsense,
-                    expiration_date.strftime("%Y-%m-%d"), key_id
+                    expiration_date, key_id
                 ))
 
-    def query_tmdb_movie(self, tmdb_id, expiration):
+    @cache_metric("tmdb_movie_data")
+    def query_tmdb_movie(self, tmdb_id):
         tmdb_dict = {}
         expired = None
         with sqlite3.connect(self.cache_path) as connection:
@@ -493,13 +677,11 @@ class Cache:
                     tmdb_dict["release_date"] = datetime.strptime(row["release_date"], "%Y-%m-%d") if row["release_date"] else None
                     tmdb_dict["collection_id"] = row["collection_id"] if row["collection_id"] else None
                     tmdb_dict["collection_name"] = row["collection_name"] if row["collection_name"] else None
-                    datetime_object = datetime.strptime(row["expiration_date"], "%Y-%m-%d")
-                    time_between_insertion = datetime.now() - datetime_object
-                    expired = time_between_insertion.days > expiration
+                    expired = is_expired(row["expiration_date"])
         return tmdb_dict, expired
 
     def update_tmdb_movie(self, expired, obj, expiration):
-        expiration_date = datetime.now() if expired is True else (datetime.now() - timedelta(days=random.randint(1, expiration)))
+        expiration_date = expiration_time(expired, expiration)
         with sqlite3.connect(self.cache_path) as connection:
             connection.row_factory = sqlite3.Row
             with closing(connection.cursor()) as cursor:
@@ -512,10 +694,11 @@ class Cache:
                     obj.title, obj.original_title, obj.studio, obj.overview, obj.tagline, obj.imdb_id, obj.poster_url, obj.backdrop_url,
                     obj.vote_count, obj.vote_average, obj.language_iso, obj.language_name, "|".join(obj.genres), "|".join(obj.keywords),
                     obj.release_date.strftime("%Y-%m-%d") if obj.release_date else None, obj.collection_id, obj.collection_name,
-                    expiration_date.strftime("%Y-%m-%d"), obj.tmdb_id
+                    expiration_date, obj.tmdb_id
                 ))
 
-    def query_tmdb_show(self, tmdb_id, expiration):
+    @cache_metric("tmdb_show_data")
+    def query_tmdb_show(self, tmdb_id):
         tmdb_dict = {}
         expired = None
         with sqlite3.connect(self.cache_path) as connection:
@@ -545,13 +728,11 @@ class Cache:
                     tmdb_dict["tvdb_id"] = row["tvdb_id"] if row["tvdb_id"] else None
                     tmdb_dict["countries"] = row["countries"] if row["countries"] else ""
                     tmdb_dict["seasons"] = row["seasons"] if row["seasons"] else ""
-                    datetime_object = datetime.strptime(row["expiration_date"], "%Y-%m-%d")
-                    time_between_insertion = datetime.now() - datetime_object
-                    expired = time_between_insertion.days > expiration
+                    expired = is_expired(row["expiration_date"])
         return tmdb_dict, expired
 
     def update_tmdb_show(self, expired, obj, expiration):
-        expiration_date = datetime.now() if expired is True else (datetime.now() - timedelta(days=random.randint(1, expiration)))
+        expiration_date = expiration_time(expired, expiration)
         with sqlite3.connect(self.cache_path) as connection:
             connection.row_factory = sqlite3.Row
             with closing(connection.cursor()) as cursor:
@@ -566,10 +747,11 @@ class Cache:
                     obj.first_air_date.strftime("%Y-%m-%d") if obj.first_air_date else None,
                     obj.last_air_date.strftime("%Y-%m-%d") if obj.last_air_date else None,
                     obj.status, obj.type, obj.tvdb_id, "|".join([str(c) for c in obj.countries]), "|".join([str(s) for s in obj.seasons]),
-                    expiration_date.strftime("%Y-%m-%d"), obj.tmdb_id
+                    expiration_date, obj.tmdb_id
                 ))
 
-    def query_tvdb(self, tvdb_id, is_movie, expiration):
+    @cache_metric("tvdb_data3")
+    def query_tvdb(self, tvdb_id, is_movie):
         tvdb_dict = {}
         expired = None
         with sqlite3.connect(self.cache_path) as connection:
@@ -586,13 +768,11 @@ class Cache:
                     tvdb_dict["background_url"] = row["background_url"] if row["background_url"] else ""
                     tvdb_dict["release_date"] = datetime.strptime(row["release_date"], "%Y-%m-%d") if row["release_date"] else None
                     tvdb_dict["genres"] = row["genres"] if row["genres"] else ""
-                    datetime_object = datetime.strptime(row["expiration_date"], "%Y-%m-%d")
-                    time_between_insertion = datetime.now() - datetime_object
-                    expired = time_between_insertion.days > expiration
+                    expired = is_expired(row["expiration_date"])
         return tvdb_dict, expired
 
     def update_tvdb(self, expired, obj, expiration):
-        expiration_date = datetime.now() if expired is True else (datetime.now() - timedelta(days=random.randint(1, expiration)))
+        expiration_date = expiration_time(expired, expiration)
         with sqlite3.connect(self.cache_path) as connection:
             connection.row_factory = sqlite3.Row
             with closing(connection.cursor()) as cursor:
@@ -602,10 +782,11 @@ class Cache:
                 tvdb_date = f"{str(obj.release_date.year).zfill(4)}-{str(obj.release_date.month).zfill(2)}-{str(obj.release_date.day).zfill(2)}" if obj.release_date else None
                 cursor.execute(update_sql, (
                     obj.title, obj.summary, obj.poster_url, obj.background_url, tvdb_date, "|".join(obj.genres),
-                    expiration_date.strftime("%Y-%m-%d"), obj.tvdb_id, "movie" if obj.is_movie else "show"
+                    expiration_date, obj.tvdb_id, "movie" if obj.is_movie else "show"
                 ))
 
-    def query_tvdb_map(self, tvdb_url, expiration):
+    @cache_metric("tvdb_map")
+    def query_tvdb_map(self, tvdb_url):
         tvdb_id = None
         expired = None
         with sqlite3.connect(self.cache_path) as connection:
@@ -615,19 +796,18 @@ class Cache:
                 row = cursor.fetchone()
                 if row:
                     tvdb_id = int(row["tvdb_id"]) if row["tvdb_id"] else None
-                    datetime_object = datetime.strptime(row["expiration_date"], "%Y-%m-%d")
-                    time_between_insertion = datetime.now() - datetime_object
-                    expired = time_between_insertion.days > expiration
+                    expired = is_expired(row["expiration_date"])
         return tvdb_id, expired
 
     def update_tvdb_map(self, expired, tvdb_url, tvdb_id, expiration):
-        expiration_date = datetime.now() if expired is True else (datetime.now() - timedelta(days=random.randint(1, expiration)))
+        expiration_date = expiration_time(expired, expiration)
         with sqlite3.connect(self.cache_path) as connection:
             connection.row_factory = sqlite3.Row
             with closing(connection.cursor()) as cursor:
                 cursor.execute("INSERT OR IGNORE INTO tvdb_map(tvdb_url) VALUES(?)", (tvdb_url, ))
-                cursor.execute("UPDATE tvdb_map SET tvdb_id = ?, expiration_date = ? WHERE tvdb_url = ?", (tvdb_id, expiration_date.strftime("%Y-%m-%d"), tvdb_url))
+                cursor.execute("UPDATE tvdb_map SET tvdb_id = ?, expiration_date = ? WHERE tvdb_url = ?", (tvdb_id, expiration_date, tvdb_url))
 
+    @cache_metric("anime_map")
     def query_anime_map(self, anime_id, id_type):
         ids = None
         expired = None
@@ -637,24 +817,22 @@ class Cache:
                 cursor.execute(f"SELECT * FROM anime_map WHERE {id_type} = ?", (anime_id, ))
                 row = cursor.fetchone()
                 if row and row["anidb"]:
-                    datetime_object = datetime.strptime(row["expiration_date"], "%Y-%m-%d")
-                    time_between_insertion = datetime.now() - datetime_object
                     ids = {
                         "anilist": int(row["anilist"]) if row["anilist"] else None,
                         "anidb": int(row["anidb"]) if row["anidb"] else None,
                         "myanimelist": int(row["myanimelist"]) if row["myanimelist"] else None,
                         "kitsu": int(row["kitsu"]) if row["kitsu"] else None
                     }
-                    expired = time_between_insertion.days > self.expiration
+                    expired = is_expired(row["expiration_date"])
         return ids, expired
 
     def update_anime_map(self, expired, anime_ids):
-        expiration_date = datetime.now() if expired is True else (datetime.now() - timedelta(days=random.randint(1, self.expiration)))
+        expiration_date = expiration_time(expired, self.expiration)
         with sqlite3.connect(self.cache_path) as connection:
             connection.row_factory = sqlite3.Row
             with closing(connection.cursor()) as cursor:
                 cursor.execute("INSERT OR IGNORE INTO anime_map(anidb) VALUES(?)", (anime_ids["anidb"],))
-                cursor.execute("UPDATE anime_map SET anilist = ?, myanimelist = ?, kitsu = ?, expiration_date = ? WHERE anidb = ?", (anime_ids["anidb"], anime_ids["myanimelist"], anime_ids["kitsu"], expiration_date.strftime("%Y-%m-%d"), anime_ids["anidb"]))
+                cursor.execute("UPDATE anime_map SET anilist = ?, myanimelist = ?, kitsu = ?, expiration_date = ? WHERE anidb = ?", (anime_ids["anidb"], anime_ids["myanimelist"], anime_ids["kitsu"], expiration_date, anime_ids["anidb"]))
 
     def get_image_table_name(self, library):
         table_name = None
@@ -705,17 +883,75 @@ class Cache:
                         )
         return table_name
 
+    def load_tables(self, *tables):
+        with self._memory_lock:
+            to_load = []
+            for table in tables:
+                if table in self._memory:
+                    self._memory[table]["users"] += 1
+                else:
+                    to_load.append(table)
+            if not to_load:
+                return
+            with sqlite3.connect(self.cache_path) as connection:
+                with closing(connection.cursor()) as cursor:
+                    for table in to_load:
+                        if table == "overlay_ratings":
+                            cursor.execute("SELECT rating_key, type, rating FROM overlay_ratings")
+                            rows = {(row[0], row[1]): row[2] for row in cursor.fetchall()}
+                        else:
+                            cursor.execute(f"SELECT rating_key, location, compare, overlay FROM {table}")
+                            rows = {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+                        self._memory[table] = {"users": 1, "rows": rows, "dirty": set()}
+
+    def save_tables(self, *tables):
+        with self._memory_lock:
+            writes = {}
+            for table in tables:
+                if table not in self._memory:
+                    continue
+                memory = self._memory[table]
+                writes[table] = [(key, memory["rows"][key]) for key in memory["dirty"]]
+                memory["dirty"] = set()
+                memory["users"] -= 1
+                if memory["users"] < 1:
+                    del self._memory[table]
+            if not any(writes.values()):
+                return
+            with sqlite3.connect(self.cache_path) as connection:
+                with closing(connection.cursor()) as cursor:
+                    for table, rows in writes.items():
+                        if table == "overlay_ratings":
+                            cursor.executemany("INSERT OR REPLACE INTO overlay_ratings(rating_key, type, rating) VALUES(?, ?, ?)",
+                                               [(rating_key, rating_type, rating) for (rating_key, rating_type), rating in rows])
+                        elif rows:
+                            cursor.executemany(f"INSERT OR IGNORE INTO {table}(rating_key) VALUES(?)", [(key,) for key, _ in rows])
+                            cursor.executemany(f"UPDATE {table} SET location = ?, compare = ?, overlay = ? WHERE rating_key = ?",
+                                               [(location, compare, overlay, key) for key, (location, compare, overlay) in rows])
+
     def query_image_map(self, rating_key, table_name):
+        memory = self._memory.get(table_name)
+        if memory is not None:
+            row = memory["rows"].get(str(rating_key))
+            metrics.cache_result(table_name, row is not None)
+            return row if row else (None, None, None)
         with sqlite3.connect(self.cache_path) as connection:
             connection.row_factory = sqlite3.Row
             with closing(connection.cursor()) as cursor:
                 cursor.execute(f"SELECT * FROM {table_name} WHERE rating_key = ?", (rating_key,))
                 row = cursor.fetchone()
+                metrics.cache_result(table_name, row is not None)
                 if row:
                     return row["location"], row["compare"], row["overlay"]
         return None, None, None
 
     def update_image_map(self, rating_key, table_name, location, compare, overlay=""):
+        with self._memory_lock:
+            if table_name in self._memory:
+                key = str(rating_key)
+                self._memory[table_name]["rows"][key] = tuple([None if v is None else str(v) for v in [location, compare, overlay]])
+                self._memory[table_name]["dirty"].add(key)
+                return
         with sqlite3.connect(self.cache_path) as connection:
             connection.row_factory = sqlite3.Row
             with closing(connection.cursor()) as cursor:
@@ -752,19 +988,20 @@ class Cache:
 
     def update_list_cache(self, list_type, list_data, expired, expiration):
         list_key = None
-        expiration_date = datetime.now() if expired is True else (datetime.now() - timedelta(days=expiration))
+        expiration_date = int(time.time()) + 86400 * (expiration if expired is True else 1)
         with sqlite3.connect(self.cache_path) as connection:
             connection.row_factory = sqlite3.Row
             with closing(connection.cursor()) as cursor:
                 cursor.execute(f"INSERT OR IGNORE INTO list_cache(list_type, list_data) VALUES(?, ?)", (list_type, list_data))
-                cursor.execute(f"UPDATE list_cache SET expiration_date = ? WHERE list_type = ? AND list_data = ?", (expiration_date.strftime("%Y-%m-%d"), list_type, list_data))
+                cursor.execute(f"UPDATE list_cache SET expiration_date = ? WHERE list_type = ? AND list_data = ?", (expiration_date, list_type, list_data))
                 cursor.execute(f"SELECT * FROM list_cache WHERE list_type = ? AND list_data = ?", (list_type, list_data))
                 row = cursor.fetchone()
                 if row and row["key"]:
                     list_key = row["key"]
         return list_key
 
-    def query_list_cache(self, list_type, list_data, expiration):
+    @cache_metric("list_cache")
+    def query_list_cache(self, list_type, list_data):
         list_key = None
         expired = None
         with sqlite3.connect(self.cache_path) as connection:
@@ -773,10 +1010,8 @@ class Cache:
                 cursor.execute(f"SELECT * FROM list_cache WHERE list_type = ? AND list_data = ?", (list_type, list_data))
                 row = cursor.fetchone()
                 if row and row["key"]:
-                    datetime_object = datetime.strptime(row["expiration_date"], "%Y-%m-%d")
-                    time_between_insertion = datetime.now() - datetime_object
                     list_key = row["key"]
-                    expired = time_between_insertion.days > expiration
+                    expired = is_expired(row["expiration_date"])
         return list_key, expired
 
     def update_list_ids(self, list_key, media_ids):
@@ -804,7 +1039,8 @@ class Cache:
             with closing(connection.cursor()) as cursor:
                 cursor.execute(f"DELETE FROM list_ids WHERE list_key = ?", (list_key,))
 
-    def query_imdb_parental(self, imdb_id, expiration):
+    @cache_metric("imdb_parental")
+    def query_imdb_parental(self, imdb_id):
         imdb_dict = {}
         expired = None
         with sqlite3.connect(self.cache_path) as connection:
@@ -818,13 +1054,11 @@ class Cache:
                     imdb_dict["profanity"] = row["profanity"] if row["profanity"] else "None"
                     imdb_dict["alcohol"] = row["alcohol"] if row["alcohol"] else "None"
                     imdb_dict["frightening"] = row["frightening"] if row["frightening"] else "None"
-                    datetime_object = datetime.strptime(row["expiration_date"], "%Y-%m-%d")
-                    time_between_insertion = datetime.now() - datetime_object
-                    expired = time_between_insertion.days > expiration
+                    expired = is_expired(row["expiration_date"])
         return imdb_dict, expired
 
     def update_imdb_parental(self, expired, imdb_id, parental, expiration):
-        expiration_date = datetime.now() if expired is True else (datetime.now() - timedelta(days=random.randint(1, expiration)))
+        expiration_date = expiration_time(expired, expiration)
         with sqlite3.connect(self.cache_path) as connection:
             connection.row_factory = sqlite3.Row
             with closing(connection.cursor()) as cursor:
@@ -832,9 +1066,10 @@ class Cache:
                 update_sql = "UPDATE imdb_parental SET nudity = ?, violence = ?, profanity = ?, alcohol = ?, " \
                              "frightening = ?, expiration_date = ? WHERE imdb_id = ?"
                 cursor.execute(update_sql, (parental["nudity"], parental["violence"], parental["profanity"], parental["alcohol"],
-                                            parental["frightening"], expiration_date.strftime("%Y-%m-%d"), imdb_id))
+                                            parental["frightening"], expiration_date, imdb_id))
 
-    def query_ergast(self, year, expiration):
+    @cache_metric("ergast_race")
+    def query_ergast(self, year):
         ergast_list = []
         expired = None
         with sqlite3.connect(self.cache_path) as connection:
@@ -850,13 +1085,11 @@ class Cache:
                             "date": row["date"] if row["date"] else None
                         })
                         if not expired:
-                            datetime_object = datetime.strptime(row["expiration_date"], "%Y-%m-%d")
-                            time_between_insertion = datetime.now() - datetime_object
-                            expired = time_between_insertion.days > expiration
+                            expired = is_expired(row["expiration_date"])
         return ergast_list, expired
 
     def update_ergast(self, expired, season, races, expiration):
-        expiration_date = datetime.now() if expired is True else (datetime.now() - timedelta(days=random.randint(1, expiration)))
+        expiration_date = expiration_time(expired, expiration)
         with sqlite3.connect(self.cache_path) as connection:
             connection.row_factory = sqlite3.Row
             with closing(connection.cursor()) as cursor:
@@ -864,22 +1097,98 @@ class Cache:
                 cursor.executemany("INSERT OR IGNORE INTO ergast_race(season, round) VALUES(?, ?)", [(r.season, r.round) for r in races])
                 cursor.executemany("UPDATE ergast_race SET name = ?, date = ?, expiration_date = ? WHERE season = ? AND round = ?",
                                    [(r.name, r.date.strftime("%Y-%m-%d") if r.date else None,
-                                     expiration_date.strftime("%Y-%m-%d"), r.season, r.round) for r in races])
+                                     expiration_date, r.season, r.round) for r in races])
 
     def query_overlay_ratings(self, rating_key, rating_type):
+        memory = self._memory.get("overlay_ratings")
+        if memory is not None:
+            rating = memory["rows"].get((int(rating_key), rating_type))
+            metrics.cache_result("overlay_ratings", rating is not None)
+            return rating
         rating = None
         with sqlite3.connect(self.cache_path) as connection:
             connection.row_factory = sqlite3.Row
             with closing(connection.cursor()) as cursor:
                 cursor.execute("SELECT * FROM overlay_ratings WHERE rating_key = ? AND type = ?", (rating_key, rating_type))
                 row = cursor.fetchone()
+                metrics.cache_result("overlay_ratings", row is not None)
                 if row:
                     rating = row["rating"]
         return rating
 
     def update_overlay_ratings(self, rating_key, rating_type, rating):
+        with self._memory_lock:
+            if "overlay_ratings" in self._memory:
+                try:
+                    rating = float(rating)
+                except (TypeError, ValueError):
+                    pass
+                self._memory["overlay_ratings"]["rows"][(int(rating_key), rating_type)] = rating
+                self._memory["overlay_ratings"]["dirty"].add((int(rating_key), rating_type))
+                return
         with sqlite3.connect(self.cache_path) as connection:
             connection.row_factory = sqlite3.Row
             with closing(connection.cursor()) as cursor:
                 cursor.execute("INSERT OR IGNORE INTO overlay_ratings(rating_key, type) VALUES(?, ?)", (rating_key, rating_type))
                 cursor.execute("UPDATE overlay_ratings SET rating = ? WHERE rating_key = ? AND type = ?", (rating, rating_key, rating_type))
+
+    def query_overlay_backup(self, library, rating_key):
+        with sqlite3.connect(self.cache_path) as connection:
+            connection.row_factory = sqlite3.Row
+            with closing(connection.cursor()) as cursor:
+                cursor.execute("SELECT * FROM overlay_backups WHERE library = ? AND rating_key = ?", (library, rating_key))
+                row = cursor.fetchone()
+                metrics.cache_result("overlay_backups", row is not None)
+                if row:
+                    return {"source": row["source"], "etag": row["etag"], "modified": row["modified"], "location": row["location"]}
+
+    def update_overlay_backup(self, library, rating_key, source, location, etag=None, modified=None):
+        with sqlite3.connect(self.cache_path) as connection:
+            connection.row_factory = sqlite3.Row
+            with closing(connection.cursor()) as cursor:
+                cursor.execute("INSERT OR REPLACE INTO overlay_backups(library, rating_key, source, etag, modified, location) VALUES(?, ?, ?, ?, ?, ?)",
+                               (library, rating_key, source, etag, modified, location))
+
+    def query_library_snapshot(self, library):
+        watermark = None
+        snapshot = {}
+        with sqlite3.connect(self.cache_path) as connection:
+            connection.row_factory = sqlite3.Row
+            with closing(connection.cursor()) as cursor:
+                cursor.execute("SELECT * FROM library_watermark WHERE library = ?", (library,))
+                row = cursor.fetchone()
+                if row:
+                    watermark = row["watermark"]
+                    cursor.execute("SELECT * FROM library_snapshot WHERE library = ?", (library,))
+                    for row in cursor:
+                        snapshot[row["rating_key"]] = (row["guid"], row["updated_at"])
+        return watermark, snapshot
+
+    def update_library_snapshot(self, library, watermark, items, removed_keys=None, replace=False):
+        with sqlite3.connect(self.cache_path) as connection:
+            connection.row_factory = sqlite3.Row
+            with closing(connection.cursor()) as cursor:
+                if replace:
+                    cursor.execute("DELETE FROM library_snapshot WHERE library = ?", (library,))
+                if removed_keys:
+                    cursor.executemany("DELETE FROM library_snapshot WHERE library = ? AND rating_key = ?", [(library, k) for k in removed_keys])
+                cursor.executemany("INSERT OR REPLACE INTO library_snapshot(library, rating_key, guid, updated_at) VALUES(?, ?, ?, ?)",
+                                   [(library, k, guid, updated_at) for k, guid, updated_at in items])
+                cursor.execute("INSERT OR IGNORE INTO library_watermark(library) VALUES(?)", (library,))
+                cursor.execute("UPDATE library_watermark SET watermark = ? WHERE library = ?", (watermark, library))
+
+    def query_url_etag(self, url):
+        with sqlite3.connect(self.cache_path) as connection:
+            connection.row_factory = sqlite3.Row
+            with closing(connection.cursor()) as cursor:
+                cursor.execute("SELECT * FROM url_etags WHERE url = ?", (url,))
+                row = cursor.fetchone()
+                if row:
+                    return row["etag"], json.loads(row["data"])
+        return None, None
+
+    def update_url_etag(self, url, etag, data):
+        with sqlite3.connect(self.cache_path) as connection:
+            connection.row_factory = sqlite3.Row
+            with closing(connection.cursor()) as cursor:
+                cursor.execute("INSERT OR REPLACE INTO url_etags(url, etag, data) VALUES(?, ?, ?)", (url, etag, json.dumps(data)))
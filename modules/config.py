@@ -1,6 +1,6 @@
-import base64, os, requests
+import base64, os, requests, threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from lxml import html
 from modules import util, radarr, sonarr
 from modules.anidb import AniDB
 from modules.anilist import AniList
@@ -14,6 +14,7 @@ from modules.github import GitHub
 from modules.letterboxd import Letterboxd
 from modules.mal import MyAnimeList
 from modules.meta import PlaylistFile
+from modules.metrics import metrics
 from modules.notifiarr import Notifiarr
 from modules.omdb import OMDb
 from modules.overlays import Overlays
@@ -33,6 +34,7 @@ from retrying import retry
 logger = util.logger
 
 sync_modes = {"append": "Only Add Items to the Collection or Playlist", "sync": "Add & Remove Items from the Collection or Playlist"}
+overlay_formats = {"jpg": "Encode Overlaid Posters as JPEG", "png": "Encode Overlaid Posters as PNG", "webp": "Encode Overlaid Posters as WebP"}
 mass_genre_options = {"tmdb": "Use TMDb Metadata", "imdb": "Use IMDb Rating", "omdb": "Use IMDb Metadata through OMDb", "tvdb": "Use TVDb Metadata", "anidb": "Use AniDB Tag Metadata"}
 mass_content_options = {"omdb": "Use IMDb Metadata through OMDb", "mdb": "Use MdbList Metadata", "mdb_commonsense": "Use Commonsense Rating through MDbList"}
 mass_available_options = {"tmdb": "Use TMDb Metadata", "omdb": "Use IMDb Metadata through OMDb", "mdb": "Use MdbList Metadata", "tvdb": "Use TVDb Metadata", "anidb": "Use AniDB Metadata"}
@@ -54,6 +56,8 @@ mass_rating_options = {
     "anidb_rating": "Use AniDB Rating",
     "anidb_average": "Use AniDB Average"
 }
+warm_services = {}
+prefetch_workers = 8
 
 class ConfigFile:
     def __init__(self, default_dir, attrs):
@@ -84,9 +88,15 @@ class ConfigFile:
         self.collection_only = attrs["collection_only"] if "collection_only" in attrs else False
         self.operations_only = attrs["operations_only"] if "operations_only" in attrs else False
         self.overlays_only = attrs["overlays_only"] if "overlays_only" in attrs else False
+        self.daemon = attrs["daemon"] if "daemon" in attrs else False
+        self._lazy = {}
+        self._lazy_locks = {}
+        self.remote_files = {}
+        self._remote_locks = {}
+        self._remote_lock = threading.Lock()
         current_time = datetime.now()
 
-        loaded_yaml = YAML(self.config_path)
+        loaded_yaml = YAML(self.config_path, cached=True)
         self.data = loaded_yaml.data
 
         def replace_attr(all_data, attr, par):
@@ -288,6 +298,7 @@ class ConfigFile:
         self.general = {
             "cache": check_for_attribute(self.data, "cache", parent="settings", var_type="bool", default=True),
             "cache_expiration": check_for_attribute(self.data, "cache_expiration", parent="settings", var_type="int", default=60),
+            "cache_max_size": check_for_attribute(self.data, "cache_max_size", parent="settings", var_type="int", default=0),
             "asset_directory": check_for_attribute(self.data, "asset_directory", parent="settings", var_type="list_path", default_is_none=True),
             "asset_folders": check_for_attribute(self.data, "asset_folders", parent="settings", var_type="bool", default=True),
             "asset_depth": check_for_attribute(self.data, "asset_depth", parent="settings", var_type="int", default=0),
@@ -298,6 +309,10 @@ class ConfigFile:
             "show_missing_season_assets": check_for_attribute(self.data, "show_missing_season_assets", parent="settings", var_type="bool", default=False),
             "show_missing_episode_assets": check_for_attribute(self.data, "show_missing_episode_assets", parent="settings", var_type="bool", default=False),
             "show_asset_not_needed": check_for_attribute(self.data, "show_asset_not_needed", parent="settings", var_type="bool", default=True),
+            "overlay_format": check_for_attribute(self.data, "overlay_format", parent="settings", test_list=overlay_formats, default="jpg"),
+            "overlay_quality": check_for_attribute(self.data, "overlay_quality", parent="settings", var_type="int", default=90),
+            "overlay_compress_level": check_for_attribute(self.data, "overlay_compress_level", parent="settings", var_type="int", default=6),
+            "overlay_optimize": check_for_attribute(self.data, "overlay_optimize", parent="settings", var_type="bool", default=False),
             "sync_mode": check_for_attribute(self.data, "sync_mode", parent="settings", default="append", test_list=sync_modes),
             "default_collection_order": check_for_attribute(self.data, "default_collection_order", parent="settings", default_is_none=True),
             "minimum_items": check_for_attribute(self.data, "minimum_items", parent="settings", var_type="int", default=1),
@@ -321,6 +336,8 @@ class ConfigFile:
             "verify_ssl": check_for_attribute(self.data, "verify_ssl", parent="settings", var_type="bool", default=True),
             "custom_repo": check_for_attribute(self.data, "custom_repo", parent="settings", default_is_none=True),
             "check_nightly": check_for_attribute(self.data, "check_nightly", parent="settings", var_type="bool", default=False),
+            "library_workers": check_for_attribute(self.data, "library_workers", parent="settings", var_type="int", default=1),
+            "builder_workers": check_for_attribute(self.data, "builder_workers", parent="settings", var_type="int", default=1),
             "assets_for_all": check_for_attribute(self.data, "assets_for_all", parent="settings", var_type="bool", default=False, save=False, do_print=False)
         }
         self.custom_repo = None
@@ -332,36 +349,44 @@ class ConfigFile:
         self.check_nightly = self.general["check_nightly"]
         self.latest_version = util.current_version(self.version, nightly=self.check_nightly)
 
-        self.session = requests.Session()
-        if not self.general["verify_ssl"]:
-            self.session.verify = False
-            if self.session.verify is False:
-                import urllib3
-                urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        self.builder_ids = {}
+        self.builder_lock = threading.Lock()
+
+        def new_session():
+            warm_services.clear()
+            session = requests.Session()
+            session.hooks["response"].append(metrics.record_response)
+            if not self.general["verify_ssl"]:
+                session.verify = False
+                if session.verify is False:
+                    import urllib3
+                    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+            return session
+        self.session = self.warm("session", self.general["verify_ssl"], new_session, bind=False)
 
         if self.general["cache"]:
             logger.separator()
-            self.Cache = Cache(self.config_path, self.general["cache_expiration"])
+            self.Cache = Cache(self.config_path, self.general["cache_expiration"], self.general["cache_max_size"])
         else:
             self.Cache = None
         self.GitHub = GitHub(self)
 
         logger.separator()
 
-        self.NotifiarrFactory = None
         if "notifiarr" in self.data:
-            logger.info("Connecting to Notifiarr...")
             try:
-                self.NotifiarrFactory = Notifiarr(self, {
+                notifiarr_params = {
                     "apikey": check_for_attribute(self.data, "apikey", parent="notifiarr", throw=True),
                     "develop": check_for_attribute(self.data, "develop", parent="notifiarr", var_type="bool", default=False, do_print=False, save=False),
                     "test": check_for_attribute(self.data, "test", parent="notifiarr", var_type="bool", default=False, do_print=False, save=False)
-                })
+                }
+                self.lazy("NotifiarrFactory", "Notifiarr", lambda: Notifiarr(self, notifiarr_params))
             except Failed as e:
                 logger.stacktrace()
                 logger.error(e)
-            logger.info(f"Notifiarr Connection {'Failed' if self.NotifiarrFactory is None else 'Successful'}")
+                self.NotifiarrFactory = None
         else:
+            self.NotifiarrFactory = None
             logger.warning("notifiarr attribute not found")
 
         self.webhooks = {
@@ -371,7 +396,7 @@ class ConfigFile:
             "run_end": check_for_attribute(self.data, "run_end", parent="webhooks", var_type="list", default_is_none=True),
             "changes": check_for_attribute(self.data, "changes", parent="webhooks", var_type="list", default_is_none=True)
         }
-        self.Webhooks = Webhooks(self, self.webhooks, notifiarr=self.NotifiarrFactory)
+        self.Webhooks = Webhooks(self, self.webhooks)
         try:
             self.Webhooks.start_time_hooks(self.start_time)
             if self.version[0] != "Unknown" and self.latest_version[0] != "Unknown" and self.version[1] != self.latest_version[1] or (self.version[2] and self.version[2] < self.latest_version[2]):
@@ -384,105 +409,107 @@ class ConfigFile:
         logger.separator()
 
         try:
-            self.TMDb = None
             if "tmdb" in self.data:
-                logger.info("Connecting to TMDb...")
-                self.TMDb = TMDb(self, {
+                tmdb_params = {
                     "apikey": check_for_attribute(self.data, "apikey", parent="tmdb", throw=True),
                     "language": check_for_attribute(self.data, "language", parent="tmdb", default="en"),
                     "expiration": check_for_attribute(self.data, "cache_expiration", parent="tmdb", var_type="int", default=60)
-                })
+                }
+                logger.info("Connecting to TMDb...")
+                self.TMDb = self.warm("tmdb", tmdb_params, lambda: TMDb(self, tmdb_params))
                 region = check_for_attribute(self.data, "region", parent="tmdb", test_list=self.TMDb.iso_3166_1, default_is_none=True)
                 self.TMDb.region = str(region).upper() if region else region
                 logger.info(f"TMDb Connection {'Failed' if self.TMDb is None else 'Successful'}")
             else:
                 raise Failed("Config Error: tmdb attribute not found")
 
-            logger.separator()
-
             self.OMDb = None
             if "omdb" in self.data:
-                logger.info("Connecting to OMDb...")
                 try:
-                    self.OMDb = OMDb(self, {
+                    omdb_params = {
                         "apikey": check_for_attribute(self.data, "apikey", parent="omdb", throw=True),
                         "expiration": check_for_attribute(self.data, "cache_expiration", parent="omdb", var_type="int", default=60)
-                    })
+                    }
+                    def new_omdb():
+                        omdb = self.warm("omdb", omdb_params, lambda: OMDb(self, omdb_params))
+                        omdb.limit = False
+                        return omdb
+                    self.lazy("OMDb", "OMDb", new_omdb)
                 except Failed as e:
                     logger.error(e)
-                logger.info(f"OMDb Connection {'Failed' if self.OMDb is None else 'Successful'}")
             else:
                 logger.warning("omdb attribute not found")
 
-            logger.separator()
-
             self.Mdblist = Mdblist(self)
             if "mdblist" in self.data:
-                logger.info("Connecting to Mdblist...")
                 try:
-                    self.Mdblist.add_key(
+                    mdblist_key = (
                         check_for_attribute(self.data, "apikey", parent="mdblist", throw=True),
                         check_for_attribute(self.data, "cache_expiration", parent="mdblist", var_type="int", default=60)
                     )
-                    logger.info("Mdblist Connection Successful")
+                    def new_mdblist():
+                        mdblist = Mdblist(self)
+                        mdblist.add_key(*mdblist_key)
+                        mdblist.limit = False
+                        return mdblist
+                    self.lazy("Mdblist", "Mdblist", lambda: self.warm("mdblist", mdblist_key, new_mdblist), fallback=lambda: Mdblist(self))
                 except Failed as e:
                     logger.error(e)
-                    logger.info("Mdblist Connection Failed")
             else:
                 logger.warning("mdblist attribute not found")
 
-            logger.separator()
-
             self.Trakt = None
             if "trakt" in self.data:
-                logger.info("Connecting to Trakt...")
                 try:
-                    self.Trakt = Trakt(self, {
+                    trakt_params = {
                         "client_id": check_for_attribute(self.data, "client_id", parent="trakt", throw=True),
                         "client_secret": check_for_attribute(self.data, "client_secret", parent="trakt", throw=True),
                         "pin":  check_for_attribute(self.data, "pin", parent="trakt", default_is_none=True),
                         "config_path": self.config_path,
                         "authorization": self.data["trakt"]["authorization"] if "authorization" in self.data["trakt"] else None
-                    })
+                    }
+                    self.lazy("Trakt", "Trakt", lambda: self.warm("trakt", trakt_params, lambda: Trakt(self, trakt_params)))
                 except Failed as e:
                     logger.error(e)
-                logger.info(f"Trakt Connection {'Failed' if self.Trakt is None else 'Successful'}")
             else:
                 logger.warning("trakt attribute not found")
 
-            logger.separator()
-
             self.MyAnimeList = None
             if "mal" in self.data:
-                logger.info("Connecting to My Anime List...")
                 try:
-                    self.MyAnimeList = MyAnimeList(self, {
+                    mal_params = {
                         "client_id": check_for_attribute(self.data, "client_id", parent="mal", throw=True),
                         "client_secret": check_for_attribute(self.data, "client_secret", parent="mal", throw=True),
                         "config_path": self.config_path,
                         "authorization": self.data["mal"]["authorization"] if "authorization" in self.data["mal"] else None
-                    })
+                    }
+                    self.lazy("MyAnimeList", "My Anime List", lambda: self.warm("mal", mal_params, lambda: MyAnimeList(self, mal_params)))
                 except Failed as e:
                     logger.error(e)
-                logger.info(f"My Anime List Connection {'Failed' if self.MyAnimeList is None else 'Successful'}")
             else:
                 logger.warning("mal attribute not found")
 
-            self.AniDB = AniDB(self, check_for_attribute(self.data, "language", parent="anidb", default="en"))
+            anidb_language = check_for_attribute(self.data, "language", parent="anidb", default="en")
+            self.AniDB = AniDB(self, anidb_language)
             if "anidb" in self.data:
-                logger.separator()
-                logger.info("Connecting to AniDB...")
                 try:
-                    self.AniDB.login(
+                    anidb_key = (
+                        anidb_language,
                         check_for_attribute(self.data, "username", parent="anidb", throw=True),
                         check_for_attribute(self.data, "password", parent="anidb", throw=True)
                     )
+                    def new_anidb():
+                        anidb = AniDB(self, anidb_language)
+                        anidb.login(*anidb_key[1:])
+                        return anidb
+                    self.lazy("AniDB", "AniDB", lambda: self.warm("anidb", anidb_key, new_anidb), fallback=lambda: AniDB(self, anidb_language))
                 except Failed as e:
                     logger.error(e)
-                logger.info(f"AniDB Connection {'Failed Continuing as Guest ' if self.MyAnimeList is None else 'Successful'}")
 
             logger.separator()
 
+            self.prefetch_files()
+
             self.playlist_names = []
             self.playlist_files = []
             if "playlist_files" in self.data:
@@ -508,8 +535,9 @@ class ConfigFile:
 
             self.TVDb = TVDb(self, self.general["tvdb_language"], self.general["cache_expiration"])
             self.IMDb = IMDb(self)
-            self.Convert = Convert(self)
-            self.AniList = AniList(self)
+            self.Convert = self.warm("convert", None, lambda: Convert(self))
+            anilist_batch_size = check_for_attribute(self.data, "batch_size", parent="anilist", var_type="int", default=25)
+            self.AniList = self.warm("anilist", anilist_batch_size, lambda: AniList(self, anilist_batch_size if anilist_batch_size > 0 else 25))
             self.FlixPatrol = FlixPatrol(self)
             self.ICheckMovies = ICheckMovies(self)
             self.Letterboxd = Letterboxd(self)
@@ -617,6 +645,10 @@ class ConfigFile:
                 params["show_missing_season_assets"] = check_for_attribute(lib, "show_missing_season_assets", parent="settings", var_type="bool", default=self.general["show_missing_season_assets"], do_print=False, save=False)
                 params["show_missing_episode_assets"] = check_for_attribute(lib, "show_missing_episode_assets", parent="settings", var_type="bool", default=self.general["show_missing_episode_assets"], do_print=False, save=False)
                 params["show_asset_not_needed"] = check_for_attribute(lib, "show_asset_not_needed", parent="settings", var_type="bool", default=self.general["show_asset_not_needed"], do_print=False, save=False)
+                params["overlay_format"] = check_for_attribute(lib, "overlay_format", parent="settings", test_list=overlay_formats, default=self.general["overlay_format"], do_print=False, save=False)
+                params["overlay_quality"] = check_for_attribute(lib, "overlay_quality", parent="settings", var_type="int", default=self.general["overlay_quality"], do_print=False, save=False)
+                params["overlay_compress_level"] = check_for_attribute(lib, "overlay_compress_level", parent="settings", var_type="int", default=self.general["overlay_compress_level"], do_print=False, save=False)
+                params["overlay_optimize"] = check_for_attribute(lib, "overlay_optimize", parent="settings", var_type="bool", default=self.general["overlay_optimize"], do_print=False, save=False)
                 params["minimum_items"] = check_for_attribute(lib, "minimum_items", parent="settings", var_type="int", default=self.general["minimum_items"], do_print=False, save=False)
                 params["item_refresh_delay"] = check_for_attribute(lib, "item_refresh_delay", parent="settings", var_type="int", default=self.general["item_refresh_delay"], do_print=False, save=False)
                 params["delete_below_minimum"] = check_for_attribute(lib, "delete_below_minimum", parent="settings", var_type="bool", default=self.general["delete_below_minimum"], do_print=False, save=False)
@@ -735,14 +767,15 @@ class ConfigFile:
                     logger.error(f"Config Error: Operation {attr} cannot be {params[attr]} without a successful {service} Connection")
                     params[attr] = None
 
-                for mass_key in ["mass_genre_update", "mass_audience_rating_update", "mass_critic_rating_update", "mass_content_rating_update", "mass_originally_available_update"]:
-                    if params[mass_key] == "omdb" and self.OMDb is None:
-                        error_check(mass_key, "OMDb")
-                    if params[mass_key] and params[mass_key].startswith("mdb") and not self.Mdblist.has_key:
-                        error_check(mass_key, "MdbList API")
+                if not self.test_mode and not self.collection_only and not self.overlays_only:
+                    for mass_key in ["mass_genre_update", "mass_audience_rating_update", "mass_critic_rating_update", "mass_content_rating_update", "mass_originally_available_update"]:
+                        if params[mass_key] == "omdb" and not self.configured("OMDb"):
+                            error_check(mass_key, "OMDb")
+                        if params[mass_key] and params[mass_key].startswith("mdb") and not self.configured("Mdblist"):
+                            error_check(mass_key, "MdbList API")
 
-                if self.Trakt is None and params["mass_trakt_rating_update"]:
-                    error_check("mass_trakt_rating_update", "Trakt")
+                    if params["mass_trakt_rating_update"] and not self.configured("Trakt"):
+                        error_check("mass_trakt_rating_update", "Trakt")
 
                 lib_vars = {}
                 if lib and "template_variables" in lib and lib["template_variables"] and isinstance(lib["template_variables"], dict):
@@ -911,7 +944,7 @@ class ConfigFile:
                         logger.info("")
                     logger.info(f"{display_name} library's Tautulli Connection {'Failed' if library.Tautulli is None else 'Successful'}")
 
-                library.Webhooks = Webhooks(self, {"error_webhooks": library.error_webhooks}, library=library, notifiarr=self.NotifiarrFactory)
+                library.Webhooks = Webhooks(self, {"error_webhooks": library.error_webhooks}, library=library)
                 library.Overlays = Overlays(self, library)
 
                 logger.info("")
@@ -937,6 +970,125 @@ class ConfigFile:
             logger.clear_errors()
             raise
 
+    def lazy(self, attr, name, create, fallback=None):
+        self.__dict__.pop(attr, None)
+        self._lazy[attr] = (name, create, fallback)
+        self._lazy_locks[attr] = threading.RLock()
+
+    def configured(self, attr):
+        return attr in self._lazy
+
+    def __getattr__(self, attr):
+        lazy = self.__dict__.get("_lazy")
+        if not lazy or attr not in lazy:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{attr}'")
+        with self._lazy_locks[attr]:
+            if attr not in self.__dict__:
+                name, create, fallback = lazy[attr]
+                logger.info(f"Connecting to {name}...")
+                connected = True
+                try:
+                    service = create()
+                except Failed as e:
+                    logger.stacktrace()
+                    logger.error(e)
+                    connected = False
+                    service = fallback() if fallback else None
+                logger.info(f"{name} Connection {'Successful' if connected else 'Failed'}")
+                self.__dict__[attr] = service
+        return self.__dict__[attr]
+
+    def warm(self, name, key, create, bind=True):
+        if not self.daemon:
+            return create()
+        warm_key = (name, repr(key))
+        if warm_key in warm_services:
+            service = warm_services[warm_key]
+            if bind:
+                service.config = self
+            return service
+        for old_key in [k for k in warm_services if k[0] == name]:
+            warm_services.pop(old_key)
+        service = create()
+        warm_services[warm_key] = service
+        return service
+
+    def remote_path(self, file_type, file_path):
+        if file_type == "Repo" and not self.custom_repo:
+            raise Failed("Config Error: No custom_repo defined")
+        return file_path if file_type == "URL" else f"{self.custom_repo if file_type == 'Repo' else util.github_base}{file_path}.yml"
+
+    def load_remote(self, file_type, file_path):
+        content_path = self.remote_path(file_type, file_path)
+        with self._remote_lock:
+            if content_path not in self._remote_locks:
+                self._remote_locks[content_path] = threading.Lock()
+        with self._remote_locks[content_path]:
+            if content_path in self.remote_files:
+                data = util.load_parsed_yaml(self.remote_files[content_path])
+                if data:
+                    return data
+            etag, cached = self.Cache.query_url_etag(content_path) if self.Cache else (None, None)
+            headers = {}
+            if cached:
+                if etag:
+                    headers["If-None-Match"] = etag
+                if cached["modified"]:
+                    headers["If-Modified-Since"] = cached["modified"]
+            response = self.get(content_path, headers=headers if headers else None)
+            if response.status_code == 304:
+                data = util.load_parsed_yaml(cached["key"])
+                if data:
+                    logger.debug(f"Not Modified: {content_path}")
+                    self.remote_files[content_path] = cached["key"]
+                    return data
+                response = self.get(content_path)
+            if response.status_code >= 400:
+                raise Failed(f"URL Error: No file found at {content_path}")
+            yaml = YAML(input_data=response.content, check_empty=True, cached=True)
+            self.remote_files[content_path] = yaml.key
+            if self.Cache and ("ETag" in response.headers or "Last-Modified" in response.headers):
+                self.Cache.update_url_etag(content_path, response.headers.get("ETag"), {"key": yaml.key, "modified": response.headers.get("Last-Modified")})
+            return yaml.data
+
+    def prefetch_files(self):
+        to_fetch = []
+        if "playlist_files" in self.data and self.data["playlist_files"]:
+            to_fetch.extend(util.remote_files(self.data["playlist_files"]))
+        if "libraries" in self.data and self.data["libraries"]:
+            for library_name, lib in self.data["libraries"].items():
+                if not lib or (self.requested_libraries and library_name not in self.requested_libraries):
+                    continue
+                if "metadata_path" in lib and lib["metadata_path"] and not self.operations_only and not self.overlays_only:
+                    to_fetch.extend(util.remote_files(lib["metadata_path"]))
+                if "overlay_path" in lib and lib["overlay_path"] and not self.operations_only and not self.collection_only:
+                    to_fetch.extend(util.remote_files(lib["overlay_path"]))
+        fetched = set()
+        with ThreadPoolExecutor(max_workers=prefetch_workers) as executor:
+            while to_fetch:
+                current = {}
+                for file_type, file_path in to_fetch:
+                    try:
+                        content_path = self.remote_path(file_type, file_path)
+                    except Failed:
+                        continue
+                    if content_path not in fetched and content_path not in current:
+                        current[content_path] = (file_type, file_path)
+                if not current:
+                    break
+                logger.info(f"Prefetching {len(current)} Remote File{'s' if len(current) > 1 else ''}")
+                fetched.update(current)
+                futures = {content_path: executor.submit(self.load_remote, file_type, file_path) for content_path, (file_type, file_path) in current.items()}
+                to_fetch = []
+                for content_path, future in futures.items():
+                    try:
+                        data = future.result()
+                    except (Failed, requests.exceptions.RequestException) as e:
+                        logger.debug(f"Prefetch Error: {e}")
+                        continue
+                    if "external_templates" in data and data["external_templates"]:
+                        to_fetch.extend(util.remote_files(data["external_templates"]))
+
     def notify(self, text, server=None, library=None, collection=None, playlist=None, critical=True):
         for error in util.get_list(text, split=False):
             try:
@@ -946,6 +1098,7 @@ class ConfigFile:
                 logger.error(f"Webhooks Error: {e}")
 
     def get_html(self, url, headers=None, params=None):
+        from lxml import html
         return html.fromstring(self.get(url, headers=headers, params=params).content)
 
     def get_json(self, url, json=None, headers=None, params=None):
@@ -959,6 +1112,7 @@ class ConfigFile:
         return base64.b64encode(self.get(url).content).decode('utf-8')
 
     def post_html(self, url, data=None, json=None, headers=None):
+        from lxml import html
         return html.fromstring(self.post(url, data=data, json=json, headers=headers).content)
 
     def post_json(self, url, data=None, json=None, headers=None):
@@ -1,4 +1,4 @@
-import re, requests
+import re, requests, threading
 from modules import util
 from modules.util import Failed
 from plexapi.exceptions import BadRequest
@@ -17,6 +17,7 @@ class Convert:
         self._anidb_to_tvdb = {}
         self._imdb_to_anidb = {}
         self._tvdb_to_anidb = {}
+        self._preloaded = threading.local()
         for anime_id in self.config.get_json(anime_lists_url):
             if "anidb_id" in anime_id:
                 self._anidb_ids[anime_id["anidb_id"]] = anime_id
@@ -87,18 +88,41 @@ class Convert:
                 logger.warning(f"Convert Error: AniDB ID not found for MyAnimeList ID: {mal_id}")
         return ids
 
+    def preload(self, ids):
+        crosswalk = {}
+        self._preloaded.crosswalk = crosswalk
+        if not self.config.Cache:
+            return
+        imdb_ids = [i for i, id_type in ids if id_type == "imdb"]
+        tmdb_ids = [i for i, id_type in ids if id_type == "tmdb_show"]
+        if imdb_ids:
+            for _id, cache_ids in self.config.Cache.query_crosswalk_ids("imdb", imdb_ids).items():
+                crosswalk[("imdb", _id, None)] = cache_ids
+        if tmdb_ids:
+            for _id, cache_ids in self.config.Cache.query_crosswalk_ids("tmdb", tmdb_ids, media_type="show").items():
+                crosswalk[("tmdb", _id, "show")] = cache_ids
+
+    def _query_crosswalk(self, id_type, _id, media_type=None):
+        crosswalk = getattr(self._preloaded, "crosswalk", {})
+        if (id_type, str(_id), media_type) in crosswalk:
+            return crosswalk[(id_type, str(_id), media_type)], False
+        if self.config.Cache:
+            return self.config.Cache.query_crosswalk(id_type, _id, media_type=media_type)
+        return None, False
+
+    def _update_crosswalk(self, media_type, expired, **ids):
+        if self.config.Cache:
+            self.config.Cache.update_crosswalk(media_type, expired, **ids)
+
     def tmdb_to_imdb(self, tmdb_id, is_movie=True, fail=False):
         media_type = "movie" if is_movie else "show"
-        expired = False
-        if self.config.Cache and is_movie:
-            cache_id, expired = self.config.Cache.query_imdb_to_tmdb_map(tmdb_id, imdb=False, media_type=media_type)
-            if cache_id and not expired:
-                return cache_id
+        cache_ids, expired = self._query_crosswalk("tmdb", tmdb_id, media_type=media_type)
+        if cache_ids and cache_ids["imdb"] and not expired:
+            return cache_ids["imdb"]
         try:
             imdb_id = self.config.TMDb.convert_from(tmdb_id, "imdb_id", is_movie)
             if imdb_id:
-                if self.config.Cache:
-                    self.config.Cache.update_imdb_to_tmdb_map(media_type, expired, imdb_id, tmdb_id)
+                self._update_crosswalk(media_type, expired, tmdb=tmdb_id, imdb=imdb_id)
                 return imdb_id
         except Failed:
             pass
@@ -108,16 +132,13 @@ class Convert:
             return None
 
     def imdb_to_tmdb(self, imdb_id, fail=False):
-        expired = False
-        if self.config.Cache:
-            cache_id, cache_type, expired = self.config.Cache.query_imdb_to_tmdb_map(imdb_id, imdb=True, return_type=True)
-            if cache_id and not expired:
-                return cache_id, cache_type
+        cache_ids, expired = self._query_crosswalk("imdb", imdb_id)
+        if cache_ids and cache_ids["tmdb"] and not expired:
+            return cache_ids["tmdb"], cache_ids["media_type"]
         try:
             tmdb_id, tmdb_type = self.config.TMDb.convert_imdb_to(imdb_id)
             if tmdb_id:
-                if self.config.Cache:
-                    self.config.Cache.update_imdb_to_tmdb_map(tmdb_type, expired, imdb_id, tmdb_id)
+                self._update_crosswalk(tmdb_type, expired, imdb=imdb_id, tmdb=tmdb_id)
                 return tmdb_id, tmdb_type
         except Failed:
             pass
@@ -127,16 +148,13 @@ class Convert:
             return None, None
 
     def tmdb_to_tvdb(self, tmdb_id, fail=False):
-        expired = False
-        if self.config.Cache:
-            cache_id, expired = self.config.Cache.query_tmdb_to_tvdb_map(tmdb_id, tmdb=True)
-            if cache_id and not expired:
-                return cache_id
+        cache_ids, expired = self._query_crosswalk("tmdb", tmdb_id, media_type="show")
+        if cache_ids and cache_ids["tvdb"] and not expired:
+            return cache_ids["tvdb"]
         try:
             tvdb_id = self.config.TMDb.convert_from(tmdb_id, "tvdb_id", False)
             if tvdb_id:
-                if self.config.Cache:
-                    self.config.Cache.update_tmdb_to_tvdb_map(expired, tmdb_id, tvdb_id)
+                self._update_crosswalk("show", expired, tmdb=tmdb_id, tvdb=tvdb_id)
                 return tvdb_id
         except Failed:
             pass
@@ -146,16 +164,13 @@ class Convert:
             return None
 
     def tvdb_to_tmdb(self, tvdb_id, fail=False):
-        expired = False
-        if self.config.Cache:
-            cache_id, expired = self.config.Cache.query_tmdb_to_tvdb_map(tvdb_id, tmdb=False)
-            if cache_id and not expired:
-                return cache_id
+        cache_ids, expired = self._query_crosswalk("tvdb", tvdb_id)
+        if cache_ids and cache_ids["tmdb"] and not expired:
+            return cache_ids["tmdb"]
         try:
             tmdb_id = self.config.TMDb.convert_tvdb_to(tvdb_id)
             if tmdb_id:
-                if self.config.Cache:
-                    self.config.Cache.update_tmdb_to_tvdb_map(expired, tmdb_id, tvdb_id)
+                self._update_crosswalk("show", expired, tvdb=tvdb_id, tmdb=tmdb_id)
                 return tmdb_id
         except Failed:
             pass
@@ -165,16 +180,13 @@ class Convert:
             return None
 
     def tvdb_to_imdb(self, tvdb_id, fail=False):
-        expired = False
-        if self.config.Cache:
-            cache_id, expired = self.config.Cache.query_imdb_to_tvdb_map(tvdb_id, imdb=False)
-            if cache_id and not expired:
-                return cache_id
+        cache_ids, expired = self._query_crosswalk("tvdb", tvdb_id)
+        if cache_ids and cache_ids["imdb"] and not expired:
+            return cache_ids["imdb"]
         try:
-            imdb_id = self.tmdb_to_imdb(self.tvdb_to_tmdb(tvdb_id, fail=True), is_movie=False, fail=True)
+            tmdb_id = cache_ids["tmdb"] if cache_ids and cache_ids["tmdb"] and not expired else self.tvdb_to_tmdb(tvdb_id, fail=True)
+            imdb_id = self.tmdb_to_imdb(tmdb_id, is_movie=False, fail=True)
             if imdb_id:
-                if self.config.Cache:
-                    self.config.Cache.update_imdb_to_tvdb_map(expired, imdb_id, tvdb_id)
                 return imdb_id
         except Failed:
             pass
@@ -184,18 +196,14 @@ class Convert:
             return None
 
     def imdb_to_tvdb(self, imdb_id, fail=False):
-        expired = False
-        if self.config.Cache:
-            cache_id, expired = self.config.Cache.query_imdb_to_tvdb_map(imdb_id, imdb=True)
-            if cache_id and not expired:
-                return cache_id
+        cache_ids, expired = self._query_crosswalk("imdb", imdb_id)
+        if cache_ids and cache_ids["tvdb"] and not expired:
+            return cache_ids["tvdb"]
         try:
             tmdb_id, tmdb_type = self.imdb_to_tmdb(imdb_id, fail=True)
             if tmdb_type == "show":
                 tvdb_id = self.tmdb_to_tvdb(tmdb_id, fail=True)
                 if tvdb_id:
-                    if self.config.Cache:
-                        self.config.Cache.update_imdb_to_tvdb_map(expired, imdb_id, tvdb_id)
                     return tvdb_id
         except Failed:
             pass
@@ -138,7 +138,7 @@ class Ergast:
     def get_races(self, year, language, ignore_cache=False):
         expired = None
         if self.config.Cache and not ignore_cache:
-            race_list, expired = self.config.Cache.query_ergast(year, self.config.Cache.expiration)
+            race_list, expired = self.config.Cache.query_ergast(year)
             if race_list and expired is False:
                 return [Race(r, language) for r in race_list]
         response = self.config.get(f"{base_url}{year}.json")
@@ -132,7 +132,7 @@ class IMDb:
             time.sleep(2)
         logger.exorcise()
         if len(imdb_ids) > 0:
-            logger.debug(f"{len(imdb_ids)} IMDb IDs Found: {imdb_ids}")
+            logger.debug("%s IMDb IDs Found: %s", len(imdb_ids), imdb_ids)
             return imdb_ids
         raise Failed(f"IMDb Error: No IMDb IDs Found at {imdb_url}")
 
@@ -140,7 +140,7 @@ class IMDb:
         parental_dict = {}
         expired = None
         if self.config.Cache and not ignore_cache:
-            parental_dict, expired = self.config.Cache.query_imdb_parental(imdb_id, self.config.Cache.expiration)
+            parental_dict, expired = self.config.Cache.query_imdb_parental(imdb_id)
             if parental_dict and expired is False:
                 return parental_dict
         response = self.config.get_html(f"https://www.imdb.com/title/{imdb_id}/parentalguide")
@@ -1,4 +1,5 @@
 import os
+from datetime import datetime
 from abc import ABC, abstractmethod
 from modules import util
 from modules.meta import MetadataFile, OverlayFile
@@ -30,6 +31,9 @@ class Library(ABC):
         self.movie_rating_key_map = {}
         self.show_rating_key_map = {}
         self.cached_items = {}
+        self.watch_keys = None
+        self.watch_parents = set()
+        self.watch_items = []
         self.run_again = []
         self.overlays_old = []
         self.type = ""
@@ -56,6 +60,10 @@ class Library(ABC):
         self.show_missing_season_assets = params["show_missing_season_assets"]
         self.show_missing_episode_assets = params["show_missing_episode_assets"]
         self.show_asset_not_needed = params["show_asset_not_needed"]
+        self.overlay_format = params["overlay_format"]
+        self.overlay_quality = min(max(params["overlay_quality"], 1), 100)
+        self.overlay_compress_level = min(max(params["overlay_compress_level"], 0), 9)
+        self.overlay_optimize = params["overlay_optimize"]
         self.sync_mode = params["sync_mode"]
         self.default_collection_order = params["default_collection_order"]
         self.minimum_items = params["minimum_items"]
@@ -163,6 +171,7 @@ class Library(ABC):
                         if overlay and "Overlay" in test:
                             item.removeLabel("Overlay")
                             item.saveEdits()
+                            self.clear_tags("label")
                     self._upload_image(item, poster)
                     poster_uploaded = True
                     logger.info(f"Detail: {poster.attribute} updated {poster.message}")
@@ -226,10 +235,34 @@ class Library(ABC):
     def item_labels(self, item):
         pass
 
+    @abstractmethod
+    def clear_tags(self, tag):
+        pass
+
+    @abstractmethod
+    def clear_caches(self):
+        pass
+
+    @abstractmethod
+    def delete(self, obj):
+        pass
+
     @abstractmethod
     def get_all(self, collection_level=None, load=False):
         pass
 
+    @abstractmethod
+    def get_changed_items(self, watermark):
+        pass
+
+    @abstractmethod
+    def get_library_keys(self):
+        pass
+
+    @abstractmethod
+    def fetch_items(self, rating_keys):
+        pass
+
     def add_additions(self, collection, items, is_movie):
         self._add_to_file("Added", collection, items, is_movie)
 
@@ -283,6 +316,76 @@ class Library(ABC):
             self.cached_items[item.ratingKey] = (item, False)
         return items
 
+    def save_snapshot(self, items):
+        watermark = 0
+        snapshot_items = []
+        for item in items:
+            updated_at = util.epoch(item.updatedAt)
+            watermark = max(watermark, updated_at, util.epoch(item.addedAt))
+            snapshot_items.append((item.ratingKey, item.guid, updated_at))
+        self.config.Cache.update_library_snapshot(self.mapping_name, watermark, snapshot_items, replace=True)
+
+    def load_snapshot_items(self):
+        watermark, snapshot = self.config.Cache.query_library_snapshot(self.mapping_name)
+        if watermark is None:
+            items = self.cache_items()
+            self.save_snapshot(items)
+            return items
+        logger.info("")
+        logger.separator(f"Loading {self.name} Library Changes", space=False, border=False)
+        logger.info("")
+        logger.info(f"Loading Changes since {datetime.fromtimestamp(watermark)}")
+        changed = self.get_changed_items(watermark)
+        changed_keys = set([i.ratingKey for i in changed])
+        current_keys = self.get_library_keys()
+        removed_keys = [k for k in snapshot if k not in current_keys]
+        missing_keys = [k for k in current_keys if k not in snapshot and k not in changed_keys]
+        if missing_keys:
+            changed.extend(self.fetch_items(missing_keys).values())
+        new_watermark = watermark
+        snapshot_items = []
+        for item in changed:
+            self.cached_items[item.ratingKey] = (item, False)
+            updated_at = util.epoch(item.updatedAt)
+            new_watermark = max(new_watermark, updated_at, util.epoch(item.addedAt))
+            snapshot_items.append((item.ratingKey, item.guid, updated_at))
+        self.config.Cache.update_library_snapshot(self.mapping_name, new_watermark, snapshot_items, removed_keys=removed_keys)
+        logger.info(f"{len(changed)} Changed, {len(removed_keys)} Removed, {len(current_keys)} Total {self.type}s")
+        return changed + [(k, snapshot[k][0]) for k in current_keys if k in snapshot and k not in changed_keys]
+
+    def load_watch_items(self, rating_keys):
+        fetched = self.fetch_items(rating_keys)
+        self.watch_keys = set(fetched)
+        self.watch_parents = set()
+        top_keys = []
+        for item in fetched.values():
+            parent_keys = [int(k) for k in [getattr(item, "parentRatingKey", None), getattr(item, "grandparentRatingKey", None)] if k]
+            self.watch_parents.update(parent_keys)
+            top_key = parent_keys[-1] if parent_keys else item.ratingKey
+            if top_key not in top_keys:
+                top_keys.append(top_key)
+        missing_keys = [k for k in top_keys if k not in fetched]
+        if missing_keys:
+            fetched.update(self.fetch_items(missing_keys))
+        self.watch_items = [fetched[k] for k in top_keys if k in fetched]
+        for item in self.watch_items:
+            self.cached_items[item.ratingKey] = (item, False)
+        return self.watch_items
+
+    def clear_watch_items(self):
+        self.watch_keys = None
+        self.watch_parents = set()
+        self.watch_items = []
+
+    def in_watch_scope(self, item):
+        if self.watch_keys is None:
+            return True
+        if isinstance(item, int):
+            return item in self.watch_keys or item in self.watch_parents
+        if item.ratingKey in self.watch_keys or item.ratingKey in self.watch_parents:
+            return True
+        return any([int(k) in self.watch_keys for k in [getattr(item, "parentRatingKey", None), getattr(item, "grandparentRatingKey", None)] if k])
+
     def map_guids(self, items):
         for i, item in enumerate(items, 1):
             if isinstance(item, tuple):
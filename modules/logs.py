@@ -1,5 +1,5 @@
-import io, logging, os, re, sys, traceback
-from logging.handlers import RotatingFileHandler
+import atexit, io, logging, os, queue, re, sys, threading, time, traceback
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 LOG_DIR = "logs"
 COLLECTION_DIR = "collections"
@@ -19,12 +19,47 @@ INFO = 20
 DEBUG = 10
 
 
-def fmt_filter(record):
-    record.levelname = f"[{record.levelname}]"
-    record.filename = f"[{record.filename}:{record.lineno}]"
-    return True
+GHOST_INTERVAL = 0.1
+POOL_REGEX = "(HTTPS?ConnectionPool)\\(.*?\\)"
 
-_srcfile = os.path.normcase(fmt_filter.__code__.co_filename)
+
+def _redacted(match):
+    return f"{match.group(1)}(redacted)" if match.group(1) else "(redacted)"
+
+_srcfile = _redacted.__code__.co_filename
+
+
+class LogFormatter(logging.Formatter):
+    def __init__(self, screen_width, is_file=False):
+        super().__init__()
+        self.screen_width = screen_width
+        self.is_file = is_file
+
+    def format(self, record):
+        lines = record.getMessage().split("\n")
+        if record.exc_info:
+            lines.extend(self.formatException(record.exc_info).split("\n"))
+        border = getattr(record, "border", True)
+        width = self.screen_width - 2
+        first = f"| {lines[0]:<{width}} |" if border else f"{lines[0]:<{width}}"
+        if self.is_file:
+            first = f"[{self.formatTime(record)}] {f'[{record.filename}:{record.lineno}]':<27} {f'[{record.levelname}]':<10} {first}"
+            rest = [f"{' ' * 65}| {line}" for line in lines[1:]]
+        else:
+            rest = [f"| {line:<{width}} |" if border else f"{line:<{width}}" for line in lines[1:]]
+        return "\n".join([first] + rest)
+
+
+class LogDispatcher(logging.Handler):
+    def __init__(self, prepare):
+        super().__init__()
+        self.prepare = prepare
+
+    def emit(self, record):
+        self.prepare(record)
+        for handler in record.file_handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
 
 
 class MyLogger:
@@ -47,82 +82,141 @@ class MyLogger:
         self.playlists_handler = None
         self.secrets = []
         self.spacing = 0
+        self.last_ghost = 0
+        self._redact = re.compile(POOL_REGEX)
+        self._file_handlers = []
+        self._queue = None
+        self._listener = None
+        self._listener_pid = None
         self.playlists_log = os.path.join(self.playlists_dir, PLAYLISTS_LOG)
+        self._lock = threading.RLock()
+        self._capture = threading.local()
         os.makedirs(self.log_dir, exist_ok=True)
         self._logger = logging.getLogger(self.logger_name)
         self._logger.setLevel(logging.DEBUG)
 
         cmd_handler = logging.StreamHandler()
-        cmd_handler.setLevel(logging.DEBUG if self.debug else logging.INFO)
-
+        cmd_handler.setLevel(logging.DEBUG)
+        cmd_handler.setFormatter(LogFormatter(self.screen_width))
+        cmd_handler.addFilter(self._prepare)
         self._logger.addHandler(cmd_handler)
 
+        self._queue_handler = QueueHandler(None)
+        self._queue_handler.prepare = self._queue_prepare
+        self._queue_handler.addFilter(lambda record: getattr(record, "file_handlers", None))
+        self._logger.addHandler(self._queue_handler)
+        atexit.register(self.stop)
+
     def clear_errors(self):
         self.saved_errors = []
 
-    def _get_handler(self, log_file, count=3):
+    def _get_handler(self, log_file, count=3, thread_only=False):
         _handler = RotatingFileHandler(log_file, delay=True, mode="w", backupCount=count, encoding="utf-8")
-        self._formatter(_handler)
+        _handler.setFormatter(LogFormatter(self.screen_width, is_file=True))
         if os.path.isfile(log_file):
+            self.flush()
             _handler.doRollover()
+        if thread_only:
+            thread_id = threading.get_ident()
+            _handler.addFilter(lambda record: record.thread == thread_id)
         return _handler
 
-    def _formatter(self, handler, border=True):
-        text = f"| %(message)-{self.screen_width - 2}s |" if border else f"%(message)-{self.screen_width - 2}s"
-        if isinstance(handler, RotatingFileHandler):
-            text = f"[%(asctime)s] %(filename)-27s %(levelname)-10s {text}"
-        handler.setFormatter(logging.Formatter(text))
+    def _listen(self):
+        if self._listener_pid != os.getpid():
+            self._queue = queue.Queue()
+            self._queue_handler.queue = self._queue
+            self._listener = QueueListener(self._queue, LogDispatcher(self._prepare))
+            self._listener.start()
+            self._listener_pid = os.getpid()
+
+    def _add_handler(self, handler):
+        with self._lock:
+            self._listen()
+            if handler not in self._file_handlers:
+                self._file_handlers.append(handler)
+
+    def _remove_handler(self, handler):
+        with self._lock:
+            if handler in self._file_handlers:
+                self._file_handlers.remove(handler)
+
+    def flush(self):
+        if self._listener_pid == os.getpid():
+            self._queue.join()
+
+    def stop(self):
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                self._listener.stop()
+                self._listener_pid = None
 
     def add_main_handler(self):
         self.main_handler = self._get_handler(self.main_log, count=10)
-        self.main_handler.addFilter(fmt_filter)
-        self._logger.addHandler(self.main_handler)
+        self._add_handler(self.main_handler)
 
     def remove_main_handler(self):
-        self._logger.removeHandler(self.main_handler)
+        self._remove_handler(self.main_handler)
+        self.flush()
+
+    def close_handlers(self):
+        self.flush()
+        for handlers in [self.library_handlers, self.playlist_handlers] + list(self.collection_handlers.values()):
+            for handler in handlers.values():
+                self._remove_handler(handler)
+                handler.close()
+        for handler in [self.main_handler, self.playlists_handler]:
+            if handler:
+                self._remove_handler(handler)
+                handler.close()
+        self.library_handlers = {}
+        self.collection_handlers = {}
+        self.playlist_handlers = {}
+        self.main_handler = None
+        self.playlists_handler = None
 
     def add_library_handler(self, library_key):
         os.makedirs(os.path.join(self.log_dir, library_key, COLLECTION_DIR), exist_ok=True)
-        self.library_handlers[library_key] = self._get_handler(os.path.join(self.log_dir, library_key, LIBRARY_LOG))
-        self._logger.addHandler(self.library_handlers[library_key])
+        self.library_handlers[library_key] = self._get_handler(os.path.join(self.log_dir, library_key, LIBRARY_LOG), thread_only=True)
+        self._add_handler(self.library_handlers[library_key])
 
     def remove_library_handler(self, library_key):
         if library_key in self.library_handlers:
-            self._logger.removeHandler(self.library_handlers[library_key])
+            self._remove_handler(self.library_handlers[library_key])
 
     def re_add_library_handler(self, library_key):
         if library_key in self.library_handlers:
-            self._logger.addHandler(self.library_handlers[library_key])
+            self._add_handler(self.library_handlers[library_key])
 
     def add_playlists_handler(self):
         os.makedirs(self.playlists_dir, exist_ok=True)
         self.playlists_handler = self._get_handler(self.playlists_log, count=10)
-        self._logger.addHandler(self.playlists_handler)
+        self._add_handler(self.playlists_handler)
 
     def remove_playlists_handler(self):
-        self._logger.removeHandler(self.playlists_handler)
+        self._remove_handler(self.playlists_handler)
 
     def add_collection_handler(self, library_key, collection_key):
         collection_dir = os.path.join(self.log_dir, str(library_key), COLLECTION_DIR, str(collection_key))
         os.makedirs(collection_dir, exist_ok=True)
         if library_key not in self.collection_handlers:
             self.collection_handlers[library_key] = {}
-        self.collection_handlers[library_key][collection_key] = self._get_handler(os.path.join(collection_dir, COLLECTION_LOG))
-        self._logger.addHandler(self.collection_handlers[library_key][collection_key])
+        if collection_key not in self.collection_handlers[library_key]:
+            self.collection_handlers[library_key][collection_key] = self._get_handler(os.path.join(collection_dir, COLLECTION_LOG), thread_only=True)
+        self._add_handler(self.collection_handlers[library_key][collection_key])
 
     def remove_collection_handler(self, library_key, collection_key):
         if library_key in self.collection_handlers and collection_key in self.collection_handlers[library_key]:
-            self._logger.removeHandler(self.collection_handlers[library_key][collection_key])
+            self._remove_handler(self.collection_handlers[library_key][collection_key])
 
     def add_playlist_handler(self, playlist_key):
         playlist_dir = os.path.join(self.playlists_dir, playlist_key)
         os.makedirs(playlist_dir, exist_ok=True)
-        self.playlist_handlers[playlist_key] = self._get_handler(os.path.join(playlist_dir, PLAYLIST_LOG))
-        self._logger.addHandler(self.playlist_handlers[playlist_key])
+        self.playlist_handlers[playlist_key] = self._get_handler(os.path.join(playlist_dir, PLAYLIST_LOG), thread_only=True)
+        self._add_handler(self.playlist_handlers[playlist_key])
 
     def remove_playlist_handler(self, playlist_key):
         if playlist_key in self.playlist_handlers:
-            self._logger.removeHandler(self.playlist_handlers[playlist_key])
+            self._remove_handler(self.playlist_handlers[playlist_key])
 
     def _centered(self, text, sep=" ", side_space=True, left=False):
         if len(text) > self.screen_width - 2:
@@ -137,27 +231,21 @@ class MyLogger:
         return final_text
 
     def separator(self, text=None, space=True, border=True, debug=False, side_space=True, left=False):
+        with self._lock:
+            self._separator(text=text, space=space, border=border, debug=debug, side_space=side_space, left=left)
+
+    def _separator(self, text=None, space=True, border=True, debug=False, side_space=True, left=False):
         sep = " " if space else self.separating_character
-        for handler in self._logger.handlers:
-            self._formatter(handler, border=False)
+        log = self.debug if debug else self.info
+        no_border = {"border": False}
         border_text = f"|{self.separating_character * self.screen_width}|"
-        if border and debug:
-            self.debug(border_text)
-        elif border:
-            self.info(border_text)
+        if border:
+            log(border_text, extra=no_border)
         if text:
-            text_list = text.split("\n")
-            for t in text_list:
-                if debug:
-                    self.debug(f"|{sep}{self._centered(t, sep=sep, side_space=side_space, left=left)}{sep}|")
-                else:
-                    self.info(f"|{sep}{self._centered(t, sep=sep, side_space=side_space, left=left)}{sep}|")
-            if border and debug:
-                self.debug(border_text)
-            elif border:
-                self.info(border_text)
-        for handler in self._logger.handlers:
-            self._formatter(handler)
+            for t in text.split("\n"):
+                log(f"|{sep}{self._centered(t, sep=sep, side_space=side_space, left=left)}{sep}|", extra=no_border)
+            if border:
+                log(border_text, extra=no_border)
 
     def debug(self, msg, *args, **kwargs):
         if self._logger.isEnabledFor(DEBUG):
@@ -175,13 +263,13 @@ class MyLogger:
             self._log(WARNING, str(msg), args, **kwargs)
 
     def error(self, msg, *args, **kwargs):
-        if self.save_errors:
+        if self.save_errors and not self.capturing:
             self.saved_errors.append(msg)
         if self._logger.isEnabledFor(ERROR):
             self._log(ERROR, str(msg), args, **kwargs)
 
     def critical(self, msg, *args, **kwargs):
-        if self.save_errors:
+        if self.save_errors and not self.capturing:
             self.saved_errors.append(msg)
         if self._logger.isEnabledFor(CRITICAL):
             self._log(CRITICAL, str(msg), args, **kwargs)
@@ -197,7 +285,11 @@ class MyLogger:
         return display_title
 
     def ghost(self, text):
-        if not self.ignore_ghost:
+        if not self.ignore_ghost and not self.capturing:
+            now = time.monotonic()
+            if now - self.last_ghost < GHOST_INTERVAL:
+                return
+            self.last_ghost = now
             try:
                 final_text = f"| {text}"
             except UnicodeEncodeError:
@@ -210,45 +302,76 @@ class MyLogger:
         if not self.ignore_ghost:
             print(self._space(" "), end="\r")
             self.spacing = 0
+            self.last_ghost = 0
 
     def secret(self, text):
-        if str(text) not in self.secrets:
+        if str(text) and str(text) not in self.secrets:
             self.secrets.append(str(text))
+            escaped = [re.escape(secret) for secret in sorted(self.secrets, key=len, reverse=True)]
+            self._redact = re.compile("|".join(escaped + [POOL_REGEX]))
+
+    def _prepare(self, record):
+        if not getattr(record, "redacted", False):
+            try:
+                msg = record.getMessage()
+            except (TypeError, ValueError):
+                msg = f"{record.msg} {record.args}"
+            record.msg = self._redact.sub(_redacted, msg)
+            record.args = None
+            record.redacted = True
+        return True
+
+    def _queue_prepare(self, record):
+        if getattr(record, "redacted", False) or not record.args:
+            return record
+        if isinstance(record.args, dict):
+            record.args = record.args.copy()
+        else:
+            record.args = tuple(a.copy() if isinstance(a, (list, set, dict)) else a for a in record.args)
+        return record
+
+    @property
+    def capturing(self):
+        return getattr(self._capture, "records", None) is not None
+
+    def start_capture(self, records):
+        self._capture.records = records
+
+    def stop_capture(self):
+        self._capture.records = None
+
+    def replay(self, records):
+        with self._lock:
+            for record in records:
+                if self.save_errors and record.levelno >= ERROR:
+                    self.saved_errors.append(record.getMessage())
+                record.thread = threading.get_ident()
+                record.file_handlers = tuple(self._file_handlers)
+                self._logger.handle(record)
 
     def _log(self, level, msg, args, exc_info=None, extra=None, stack_info=False, stacklevel=1):
-        if self.spacing > 0:
+        with self._lock:
+            self._log_record(level, msg, args, exc_info=exc_info, extra=extra, stack_info=stack_info, stacklevel=stacklevel)
+
+    def _log_record(self, level, msg, args, exc_info=None, extra=None, stack_info=False, stacklevel=1):
+        if self.spacing > 0 and not self.capturing:
             self.exorcise()
-        if "\n" in msg:
-            for i, line in enumerate(msg.split("\n")):
-                self._log(level, line, args, exc_info=exc_info, extra=extra, stack_info=stack_info, stacklevel=stacklevel)
-                if i == 0:
-                    for handler in self._logger.handlers:
-                        if isinstance(handler, RotatingFileHandler):
-                            handler.setFormatter(logging.Formatter(" " * 65 + "| %(message)s"))
-            for handler in self._logger.handlers:
-                if isinstance(handler, RotatingFileHandler):
-                    handler.setFormatter(logging.Formatter("[%(asctime)s] %(filename)-27s %(levelname)-10s | %(message)s"))
-        else:
-            for secret in self.secrets:
-                if secret in msg:
-                    msg = msg.replace(secret, "(redacted)")
-            if "HTTPConnectionPool" in msg:
-                msg = re.sub("HTTPConnectionPool\\((.*?)\\)", "HTTPConnectionPool(redacted)", msg)
-            if "HTTPSConnectionPool" in msg:
-                msg = re.sub("HTTPSConnectionPool\\((.*?)\\)", "HTTPSConnectionPool(redacted)", msg)
-            try:
-                if not _srcfile:
-                    raise ValueError
-                fn, lno, func, sinfo = self.findCaller(stack_info, stacklevel)
-            except ValueError:
-                fn, lno, func, sinfo = "(unknown file)", 0, "(unknown function)", None
-            if exc_info:
-                if isinstance(exc_info, BaseException):
-                    exc_info = (type(exc_info), exc_info, exc_info.__traceback__)
-                elif not isinstance(exc_info, tuple):
-                    exc_info = sys.exc_info()
-            record = self._logger.makeRecord(self._logger.name, level, fn, lno, msg, args, exc_info, func, extra, sinfo)
-            self._logger.handle(record)
+        try:
+            fn, lno, func, sinfo = self.findCaller(stack_info, stacklevel)
+        except ValueError:
+            fn, lno, func, sinfo = "(unknown file)", 0, "(unknown function)", None
+        if exc_info:
+            if isinstance(exc_info, BaseException):
+                exc_info = (type(exc_info), exc_info, exc_info.__traceback__)
+            elif not isinstance(exc_info, tuple):
+                exc_info = sys.exc_info()
+        record = self._logger.makeRecord(self._logger.name, level, fn, lno, msg, args, exc_info, func, extra, sinfo)
+        if self.capturing:
+            self._prepare(record)
+            self._capture.records.append(record)
+            return
+        record.file_handlers = tuple(self._file_handlers)
+        self._logger.handle(record)
 
     def findCaller(self, stack_info=False, stacklevel=1):
         f = logging.currentframe()
@@ -263,8 +386,7 @@ class MyLogger:
         rv = "(unknown file)", 0, "(unknown function)", None
         while hasattr(f, "f_code"):
             co = f.f_code
-            filename = os.path.normcase(co.co_filename)
-            if filename == _srcfile:
+            if co.co_filename == _srcfile:
                 f = f.f_back
                 continue
             sinfo = None
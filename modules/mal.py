@@ -260,5 +260,5 @@ class MyAnimeList:
         else:
             raise Failed(f"MyAnimeList Error: Method {method} not supported")
         logger.debug("")
-        logger.debug(f"{len(mal_ids)} MyAnimeList IDs Found: {mal_ids}")
+        logger.debug("%s MyAnimeList IDs Found: %s", len(mal_ids), mal_ids)
         return mal_ids
@@ -91,7 +91,7 @@ class Mdblist:
             raise Failed("MdbList Error: Either IMDb ID or TMDb ID and TMDb Type Required")
         expired = None
         if self.config.Cache and not ignore_cache:
-            mdb_dict, expired = self.config.Cache.query_mdb(key, self.expiration)
+            mdb_dict, expired = self.config.Cache.query_mdb(key)
             if mdb_dict and expired is False:
                 return MDbObj(mdb_dict)
         if self.config.trace_mode:
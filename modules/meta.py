@@ -1,5 +1,6 @@
 import math, operator, os, re, requests
 from datetime import datetime
+from functools import lru_cache
 from modules import plex, ergast, util
 from modules.util import Failed, YAML
 from plexapi.exceptions import NotFound, BadRequest
@@ -32,6 +33,39 @@ default_templates = {
     "trakt_people_list": {"tmdb_person": f"<<value>>", "plex_search": {"all": {"actor": "tmdb"}}}
 }
 
+template_regex = re.compile(r"<<([^<>]+)>>")
+radarr_sonarr_tags = ["radarr_tag", "item_radarr_tag", "sonarr_tag", "item_sonarr_tag"]
+@lru_cache(maxsize=8192)
+def compile_text(text):
+    segments = []
+    last = 0
+    for match in template_regex.finditer(text):
+        if match.start() > last:
+            segments.append((False, text[last:match.start()]))
+        segments.append((True, match.group(1)))
+        last = match.end()
+    if last < len(text):
+        segments.append((False, text[last:]))
+    return tuple(segments), frozenset([seg for is_var, seg in segments if is_var])
+
+def render_text(text, lookup, keep_type=True):
+    if not isinstance(text, str) or "<<" not in text:
+        return text
+    segments, refs = compile_text(text)
+    if not refs:
+        return text
+    if keep_type and len(segments) == 1:
+        found, value = lookup(segments[0][1])
+        return value if found else text
+    output = []
+    for is_var, segment in segments:
+        if is_var:
+            found, value = lookup(segment)
+            output.append(str(value) if found else f"<<{segment}>>")
+        else:
+            output.append(segment)
+    return "".join(output)
+
 def get_dict(attribute, attr_data, check_list=None, make_str=False):
     if check_list is None:
         check_list = []
@@ -87,18 +121,12 @@ class DataFile:
 
     def load_file(self, file_type, file_path):
         if file_type in ["URL", "Git", "Repo"]:
-            if file_type == "Repo" and not self.config.custom_repo:
-                raise Failed("Config Error: No custom_repo defined")
-            content_path = file_path if file_type == "URL" else f"{self.config.custom_repo if file_type == 'Repo' else util.github_base}{file_path}.yml"
-            response = self.config.get(content_path)
-            if response.status_code >= 400:
-                raise Failed(f"URL Error: No file found at {content_path}")
-            yaml = YAML(input_data=response.content, check_empty=True)
+            return self.config.load_remote(file_type, file_path)
         else:
             if not file_path.endswith(".yml"):
                 file_path = f"{file_path}.yml"
             if os.path.exists(os.path.abspath(file_path)):
-                yaml = YAML(path=os.path.abspath(file_path), check_empty=True)
+                yaml = YAML(path=os.path.abspath(file_path), check_empty=True, cached=True)
             else:
                 raise Failed(f"File Error: File does not exist {os.path.abspath(file_path)}")
         return yaml.data
@@ -153,8 +181,35 @@ class DataFile:
                         else:
                             variables[temp_key] = temp_value
 
-                    for key, value in variables.copy().items():
-                        variables[f"{key}_encoded"] = requests.utils.quote(str(value))
+                    encoded = {}
+
+                    def lookup(key, _method=None, allow_name=False):
+                        if key == "name" and not allow_name:
+                            return False, None
+                        if key.endswith("_encoded") and key[:-8] in variables:
+                            if key not in encoded:
+                                encoded[key] = requests.utils.quote(str(variables[key[:-8]]))
+                            return True, encoded[key]
+                        if key in variables:
+                            if _method in radarr_sonarr_tags and key in ["collection_name", "playlist_name"]:
+                                return True, str(variables[key]).replace(",", "")
+                            return True, variables[key]
+                        return False, None
+
+                    resolved = {}
+
+                    def resolve(key, _method=None):
+                        found, value = lookup(key, _method=_method)
+                        if not found or not isinstance(value, str) or "<<" not in value:
+                            return found, value
+                        resolve_key = (key, _method in radarr_sonarr_tags)
+                        if resolve_key not in resolved:
+                            resolved[resolve_key] = value
+                            resolved[resolve_key] = render_text(value, lambda k: resolve(k, _method=_method))
+                        return True, resolved[resolve_key]
+
+                    def name_lookup(key):
+                        return lookup(key, allow_name=True)
 
                     default = {}
                     if "default" in template:
@@ -163,24 +218,16 @@ class DataFile:
                         if not isinstance(template["default"], dict):
                             raise Failed(f"{self.data_type} Error: template sub-attribute default is not a dictionary")
                         for dv in template["default"]:
-                            final_key = dv
-                            for k, v in variables.items():
-                                if f"<<{k}>>" in final_key:
-                                    final_key = final_key.replace(f"<<{k}>>", str(v))
+                            final_key = render_text(dv, name_lookup, keep_type=False)
                             if final_key not in optional:
-                                final_value = template["default"][dv]
-                                for key, value in variables.items():
-                                    if f"<<{key}>>" in str(final_value):
-                                        final_value = str(final_value).replace(f"<<{key}>>", str(value))
+                                final_value = render_text(template["default"][dv], name_lookup, keep_type=False)
                                 default[final_key] = final_value
                                 default[f"{final_key}_encoded"] = requests.utils.quote(str(final_value))
 
                     if "optional" in template:
                         if template["optional"]:
                             for op in util.get_list(template["optional"]):
-                                for k, v in variables.items():
-                                    if f"<<{k}>>" in op:
-                                        op = op.replace(f"<<{k}>>", str(v))
+                                op = render_text(op, name_lookup, keep_type=False)
                                 if op not in default:
                                     optional.append(str(op))
                                     optional.append(f"{op}_encoded")
@@ -188,6 +235,7 @@ class DataFile:
                                     logger.warning(f"Template Warning: variable {op} cannot be optional if it has a default")
                         else:
                             raise Failed(f"{self.data_type} Error: template sub-attribute optional is blank")
+                    optional_vars = set(optional)
 
                     sort_name = None
                     if "move_prefix" in template or "move_collection_prefix" in template:
@@ -206,6 +254,15 @@ class DataFile:
                             raise Failed(f"{self.data_type} Error: template sub-attribute move_prefix is blank")
                     variables[f"{self.data_type.lower()}_sort"] = sort_name if sort_name else variables[name_var]
 
+                    def default_lookup(key):
+                        return (True, default[key]) if key in default else (False, None)
+
+                    def check_optional(text):
+                        if isinstance(text, str) and "<<" in text:
+                            for ref in compile_text(text)[1] & optional_vars:
+                                if not lookup(ref)[0]:
+                                    raise Failed
+
                     def check_data(_method, _data):
                         if isinstance(_data, dict):
                             final_data = {}
@@ -227,27 +284,11 @@ class DataFile:
                                 raise Failed
                         else:
                             final_data = _data
-                            def scan_text(og_txt, var, var_value):
-                                if og_txt is None:
-                                    return og_txt
-                                elif str(og_txt) == f"<<{var}>>":
-                                    return var_value
-                                elif f"<<{var}>>" in str(og_txt):
-                                    return str(og_txt).replace(f"<<{var}>>", str(var_value))
-                                else:
-                                    return og_txt
-
-                            for i in range(2):
-                                for option in optional:
-                                    if option not in variables and f"<<{option}>>" in str(final_data):
-                                        raise Failed
-                                for variable, variable_data in variables.items():
-                                    if (variable == "collection_name" or variable == "playlist_name") and _method in ["radarr_tag", "item_radarr_tag", "sonarr_tag", "item_sonarr_tag"]:
-                                        final_data = scan_text(final_data, variable, variable_data.replace(",", ""))
-                                    elif variable != "name":
-                                        final_data = scan_text(final_data, variable, variable_data)
-                            for dm, dd in default.items():
-                                final_data = scan_text(final_data, dm, dd)
+                            check_optional(final_data)
+                            final_data = render_text(final_data, lambda k: resolve(k, _method=_method))
+                            check_optional(final_data)
+                            if default:
+                                final_data = render_text(final_data, default_lookup)
                         return final_data
 
                     for method_name, attr_data in template.items():
@@ -671,7 +712,7 @@ class MetadataFile(DataFile):
                             sync.pop(other_name)
                         self.collections[other_name] = col
                     for col_title, col in sync.items():
-                        col.delete()
+                        self.library.delete(col)
                         logger.info(f"{map_name} Dynamic Collection: {col_title} Deleted")
                 except Failed as e:
                     logger.error(e)
@@ -716,6 +757,25 @@ class MetadataFile(DataFile):
         logger.separator("Running Metadata")
         logger.info("")
         next_year = datetime.now().year + 1
+        id_keys = set()
+        for mapping_name in self.metadata:
+            if (isinstance(mapping_name, int) or str(mapping_name).startswith("tt")) and not self.library.is_music:
+                if self.library.is_movie and mapping_name in self.library.movie_map:
+                    id_keys.update(self.library.movie_map[mapping_name])
+                elif self.library.is_show and mapping_name in self.library.show_map:
+                    id_keys.update(self.library.show_map[mapping_name])
+                elif mapping_name in self.library.imdb_map:
+                    id_keys.update(self.library.imdb_map[mapping_name])
+        prefetched = {}
+        if id_keys:
+            try:
+                prefetched = self.library.fetch_items(id_keys)
+            except (BadRequest, NotFound):
+                logger.stacktrace()
+
+        def fetch_mapped(item_ids):
+            return [prefetched[int(i)] if int(i) in prefetched else self.library.fetchItem(i) for i in item_ids]
+
         for mapping_name, meta in self.metadata.items():
             methods = {mm.lower(): mm for mm in meta}
 
@@ -727,16 +787,12 @@ class MetadataFile(DataFile):
                     id_type = "IMDb"
                 logger.separator(f"{id_type} ID: {mapping_name} Metadata", space=False, border=False)
                 logger.info("")
-                item = []
                 if self.library.is_movie and mapping_name in self.library.movie_map:
-                    for item_id in self.library.movie_map[mapping_name]:
-                        item.append(self.library.fetchItem(item_id))
+                    item = fetch_mapped(self.library.movie_map[mapping_name])
                 elif self.library.is_show and mapping_name in self.library.show_map:
-                    for item_id in self.library.show_map[mapping_name]:
-                        item.append(self.library.fetchItem(item_id))
+                    item = fetch_mapped(self.library.show_map[mapping_name])
                 elif mapping_name in self.library.imdb_map:
-                    for item_id in self.library.imdb_map[mapping_name]:
-                        item.append(self.library.fetchItem(item_id))
+                    item = fetch_mapped(self.library.imdb_map[mapping_name])
                 else:
                     logger.error(f"Metadata Error: {id_type} ID not mapped")
                     continue
@@ -0,0 +1,123 @@
+import json, os, threading, time
+from datetime import datetime
+from urllib.parse import urlparse
+
+latency_buckets = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.start = time.time()
+            self.phases = {}
+            self.collections = {}
+            self.requests = {}
+            self.retries = {}
+            self.cache = {}
+            self.images = {"count": 0, "bytes": 0}
+
+    def add_phase(self, library, phase, start):
+        with self._lock:
+            self.phases[(library, phase)] = (datetime.now() - start).total_seconds()
+
+    def add_collection(self, library, collection, start):
+        with self._lock:
+            self.collections[(library, str(collection))] = (datetime.now() - start).total_seconds()
+
+    def record_response(self, response, *args, **kwargs):
+        host = urlparse(response.url).hostname or "unknown"
+        if kwargs.get("stream"):
+            size = int(response.headers.get("Content-Length", 0) or 0)
+        else:
+            size = len(response.content)
+        seconds = response.elapsed.total_seconds()
+        with self._lock:
+            if host not in self.requests:
+                self.requests[host] = {"count": 0, "errors": 0, "bytes": 0, "seconds": 0.0, "buckets": [0 for _ in latency_buckets]}
+            stats = self.requests[host]
+            stats["count"] += 1
+            stats["bytes"] += size
+            stats["seconds"] += seconds
+            if response.status_code >= 400:
+                stats["errors"] += 1
+            for i, bucket in enumerate(latency_buckets):
+                if seconds <= bucket:
+                    stats["buckets"][i] += 1
+
+    def add_retry(self, exception):
+        name = type(exception).__name__
+        with self._lock:
+            self.retries[name] = self.retries[name] + 1 if name in self.retries else 1
+
+    def cache_result(self, table, hit):
+        with self._lock:
+            if table not in self.cache:
+                self.cache[table] = {"hit": 0, "miss": 0}
+            self.cache[table]["hit" if hit else "miss"] += 1
+
+    def add_image(self, size):
+        with self._lock:
+            self.images["count"] += 1
+            self.images["bytes"] += size
+
+    def data(self):
+        with self._lock:
+            return {
+                "run_seconds": time.time() - self.start,
+                "phases": [{"library": lib, "phase": phase, "seconds": s} for (lib, phase), s in self.phases.items()],
+                "collections": [{"library": lib, "collection": col, "seconds": s} for (lib, col), s in sorted(self.collections.items(), key=lambda c: c[1], reverse=True)],
+                "requests": {h: dict(v, buckets=dict(zip([str(b) for b in latency_buckets], v["buckets"]))) for h, v in self.requests.items()},
+                "retries": dict(self.retries),
+                "cache": {t: dict(v, ratio=v["hit"] / (v["hit"] + v["miss"])) for t, v in self.cache.items()},
+                "images": dict(self.images)
+            }
+
+    def prometheus(self):
+        data = self.data()
+        def label(value):
+            return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        lines = [
+            "# TYPE pmm_run_seconds gauge",
+            f"pmm_run_seconds {data['run_seconds']}",
+            "# TYPE pmm_phase_seconds gauge"
+        ]
+        lines.extend([f"pmm_phase_seconds{{library=\"{label(p['library'])}\",phase=\"{label(p['phase'])}\"}} {p['seconds']}" for p in data["phases"]])
+        lines.append("# TYPE pmm_collection_seconds gauge")
+        lines.extend([f"pmm_collection_seconds{{library=\"{label(c['library'])}\",collection=\"{label(c['collection'])}\"}} {c['seconds']}" for c in data["collections"]])
+        lines.append("# TYPE pmm_http_request_seconds histogram")
+        for host, stats in data["requests"].items():
+            for bucket, count in stats["buckets"].items():
+                lines.append(f"pmm_http_request_seconds_bucket{{host=\"{label(host)}\",le=\"{bucket}\"}} {count}")
+            lines.append(f"pmm_http_request_seconds_bucket{{host=\"{label(host)}\",le=\"+Inf\"}} {stats['count']}")
+            lines.append(f"pmm_http_request_seconds_sum{{host=\"{label(host)}\"}} {stats['seconds']}")
+            lines.append(f"pmm_http_request_seconds_count{{host=\"{label(host)}\"}} {stats['count']}")
+        lines.append("# TYPE pmm_http_response_bytes counter")
+        lines.extend([f"pmm_http_response_bytes{{host=\"{label(h)}\"}} {s['bytes']}" for h, s in data["requests"].items()])
+        lines.append("# TYPE pmm_http_errors counter")
+        lines.extend([f"pmm_http_errors{{host=\"{label(h)}\"}} {s['errors']}" for h, s in data["requests"].items()])
+        lines.append("# TYPE pmm_retries counter")
+        lines.extend([f"pmm_retries{{exception=\"{label(e)}\"}} {c}" for e, c in data["retries"].items()])
+        lines.append("# TYPE pmm_cache_lookups counter")
+        for table, stats in data["cache"].items():
+            lines.append(f"pmm_cache_lookups{{table=\"{label(table)}\",result=\"hit\"}} {stats['hit']}")
+            lines.append(f"pmm_cache_lookups{{table=\"{label(table)}\",result=\"miss\"}} {stats['miss']}")
+        lines.append("# TYPE pmm_overlay_images counter")
+        lines.append(f"pmm_overlay_images {data['images']['count']}")
+        lines.append("# TYPE pmm_overlay_image_bytes counter")
+        lines.append(f"pmm_overlay_image_bytes {data['images']['bytes']}")
+        return "\n".join(lines) + "\n"
+
+    def save(self, log_dir):
+        json_path = os.path.join(log_dir, "metrics.json")
+        prom_path = os.path.join(log_dir, "metrics.prom")
+        with open(json_path, "w", encoding="utf-8") as handle:
+            json.dump(self.data(), handle, indent=2)
+        with open(f"{prom_path}.tmp", "w", encoding="utf-8") as handle:
+            handle.write(self.prometheus())
+        os.replace(f"{prom_path}.tmp", prom_path)
+        return json_path, prom_path
+
+metrics = Metrics()
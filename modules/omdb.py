@@ -53,7 +53,7 @@ class OMDb:
     def get_omdb(self, imdb_id, ignore_cache=False):
         expired = None
         if self.config.Cache and not ignore_cache:
-            omdb_dict, expired = self.config.Cache.query_omdb(imdb_id, self.expiration)
+            omdb_dict, expired = self.config.Cache.query_omdb(imdb_id)
             if omdb_dict and expired is False:
                 return OMDbObj(imdb_id, omdb_dict)
         if self.config.trace_mode:
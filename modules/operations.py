@@ -1,6 +1,8 @@
 import os, re
 from datetime import datetime
 from modules import plex, util
+from modules.metrics import metrics
+from modules.profiling import profiler
 from modules.util import Failed, YAML
 
 logger = util.logger
@@ -11,6 +13,19 @@ class Operations:
         self.library = library
 
     def run_operations(self):
+        cache_tables = []
+        if self.config.Cache and self.library.image_table_name and self.library.assets_for_all:
+            cache_tables = [self.library.image_table_name, f"{self.library.image_table_name}_backgrounds"]
+            self.config.Cache.load_tables(*cache_tables)
+        profiler.begin(self.library.mapping_name, "operations.folded")
+        try:
+            return self._run_operations()
+        finally:
+            profiler.end(self.library.mapping_name, "operations.folded")
+            if cache_tables:
+                self.config.Cache.save_tables(*cache_tables)
+
+    def _run_operations(self):
         operation_start = datetime.now()
         logger.info("")
         logger.separator(f"{self.library.name} Library Operations")
@@ -43,13 +58,13 @@ class Operations:
         logger.debug(f"Item Operation: {self.library.items_library_operation}")
         logger.debug("")
 
-        if self.library.split_duplicates:
+        if self.library.split_duplicates and self.library.watch_keys is None:
             items = self.library.search(**{"duplicate": True})
             for item in items:
                 item.split()
                 logger.info(f"{item.title[:25]:<25} | Splitting")
 
-        if self.library.update_blank_track_titles:
+        if self.library.update_blank_track_titles and self.library.watch_keys is None:
             tracks = self.library.get_all(collection_level="track")
             num_edited = 0
             for i, track in enumerate(tracks, 1):
@@ -61,10 +76,10 @@ class Operations:
             logger.info(f"{len(tracks)} Tracks Processed; {num_edited} Blank Track Titles Updated")
 
         if self.library.items_library_operation:
-            items = self.library.get_all()
+            items = self.library.get_all() if self.library.watch_keys is None else self.library.watch_items
             radarr_adds = []
             sonarr_adds = []
-            trakt_ratings = self.config.Trakt.user_ratings(self.library.is_movie) if self.library.mass_trakt_rating_update else []
+            trakt_ratings = self.config.Trakt.user_ratings(self.library.is_movie) if self.library.mass_trakt_rating_update and self.config.Trakt else []
 
             reverse_anidb = {}
             if self.library.mass_genre_update == "anidb":
@@ -138,7 +153,9 @@ class Operations:
 
                 omdb_item = None
                 if any([o == "omdb" for o in self.library.meta_operations]):
-                    if self.config.OMDb.limit is not False:
+                    if not self.config.OMDb:
+                        logger.error("OMDb Error: No OMDb Connection")
+                    elif self.config.OMDb.limit is not False:
                         logger.error("Daily OMDb Limit Reached")
                     elif not imdb_id:
                         logger.info(f"{item.title[:25]:<25} | No IMDb ID for Guid: {item.guid}")
@@ -413,6 +430,12 @@ class Operations:
                 except Failed as e:
                     logger.error(e)
 
+        if self.library.watch_keys is not None:
+            operation_run_time = str(datetime.now() - operation_start).split('.')[0]
+            logger.info("")
+            logger.separator(f"Finished {self.library.name} Library Watched Operations\nOperations Run Time: {operation_run_time}")
+            return operation_run_time
+
         if self.library.radarr_remove_by_tag:
             self.library.Radarr.remove_all_with_tags(self.library.radarr_remove_by_tag)
         if self.library.sonarr_remove_by_tag:
@@ -436,7 +459,7 @@ class Operations:
             labels = [la.tag for la in self.library.item_labels(col)]
             if (self.library.delete_collections_with_less and col.childCount < self.library.delete_collections_with_less) \
                 or (self.library.delete_unmanaged_collections and "PMM" not in labels):
-                self.library.query(col.delete)
+                self.library.delete(col)
                 logger.info(f"{col.title} Deleted")
             elif "PMM" not in labels:
                 unmanaged_collections.append(col)
@@ -532,6 +555,7 @@ class Operations:
             logger.info(f"{len(yaml.data['metadata'])} {self.library.type.capitalize()}{'s' if len(yaml.data['metadata']) > 1 else ''} Backed Up")
 
         operation_run_time = str(datetime.now() - operation_start).split('.')[0]
+        metrics.add_phase(self.library.name, "Library Operations", operation_start)
         logger.info("")
         logger.separator(f"Finished {self.library.name} Library Operations\nOperations Run Time: {operation_run_time}")
         return operation_run_time
@@ -1,11 +1,12 @@
-import os, re, time
+import io, os, re
 from datetime import datetime
 from modules import plex, util
 from modules.builder import CollectionBuilder
+from modules.metrics import metrics
+from modules.profiling import profiler
 from modules.util import Failed, NotScheduled
 from plexapi.exceptions import BadRequest
 from plexapi.video import Movie, Show, Season, Episode
-from PIL import Image, ImageFilter
 
 logger = util.logger
 
@@ -16,13 +17,27 @@ class Overlays:
         self.overlays = []
 
     def run_overlays(self):
+        cache_tables = []
+        if self.config.Cache and self.library.image_table_name:
+            cache_tables = [self.library.image_table_name, f"{self.library.image_table_name}_backgrounds", f"{self.library.image_table_name}_overlays", "overlay_ratings"]
+            self.config.Cache.load_tables(*cache_tables)
+        profiler.begin(self.library.mapping_name, "overlays.folded")
+        try:
+            return self._run_overlays()
+        finally:
+            profiler.end(self.library.mapping_name, "overlays.folded")
+            if cache_tables:
+                self.config.Cache.save_tables(*cache_tables)
+
+    def _run_overlays(self):
+        from PIL import Image
         overlay_start = datetime.now()
         logger.info("")
         logger.separator(f"{self.library.name} Library Overlays")
         logger.info("")
         os.makedirs(self.library.overlay_backup, exist_ok=True)
 
-        old_overlays = [la for la in self.library.Plex.listFilterChoices("label") if str(la.title).lower().endswith(" overlay")]
+        old_overlays = [la for la in self.library.get_tags("label") if str(la.title).lower().endswith(" overlay")]
         if old_overlays:
             logger.info("")
             logger.separator(f"Removing Old Overlays for the {self.library.name} Library")
@@ -150,7 +165,14 @@ class Overlays:
                         if image_compare and str(poster.compare) != str(image_compare):
                             changed_image = True
                     elif has_overlay:
-                        if os.path.exists(os.path.join(self.library.overlay_backup, f"{item.ratingKey}.png")):
+                        stored = self.config.Cache.query_overlay_backup(self.library.mapping_name, item.ratingKey) if self.config.Cache else None
+                        if stored and stored["source"].startswith("http") and os.path.exists(stored["location"]):
+                            try:
+                                has_original, changed_image = self.backup_poster(item, item_title, stored["source"])
+                            except Failed as e:
+                                logger.error(e)
+                                has_original = stored["location"]
+                        elif os.path.exists(os.path.join(self.library.overlay_backup, f"{item.ratingKey}.png")):
                             has_original = os.path.join(self.library.overlay_backup, f"{item.ratingKey}.png")
                         elif os.path.exists(os.path.join(self.library.overlay_backup, f"{item.ratingKey}.jpg")):
                             has_original = os.path.join(self.library.overlay_backup, f"{item.ratingKey}.jpg")
@@ -162,16 +184,7 @@ class Overlays:
                         new_backup = item.posterUrl
                     if new_backup:
                         changed_image = True
-                        image_response = self.config.get(new_backup)
-                        if image_response.status_code >= 400:
-                            raise Failed(f"{item_title[:60]:<60} | Overlay Error: Poster Download Failed")
-                        i_ext = "jpg" if image_response.headers["Content-Type"] == "image/jpeg" else "png"
-                        backup_image_path = os.path.join(self.library.overlay_backup, f"{item.ratingKey}.{i_ext}")
-                        with open(backup_image_path, "wb") as handler:
-                            handler.write(image_response.content)
-                        while util.is_locked(backup_image_path):
-                            time.sleep(1)
-                        has_original = backup_image_path
+                        has_original, _ = self.backup_poster(item, item_title, new_backup)
 
                     poster_compare = None
                     if poster is None and has_original is None:
@@ -181,10 +194,9 @@ class Overlays:
                             canvas_width = 1920 if isinstance(item, Episode) else 1000
                             canvas_height = 1080 if isinstance(item, Episode) else 1500
 
-                            new_poster = Image.open(poster.location if poster else has_original) \
-                                .convert("RGB").resize((canvas_width, canvas_height), Image.ANTIALIAS)
-                            if blur_num > 0:
-                                new_poster = new_poster.filter(ImageFilter.GaussianBlur(blur_num))
+                            source_poster = poster.location if poster else has_original
+                            metrics.add_image(os.path.getsize(source_poster))
+                            new_poster = util.load_poster(source_poster, (canvas_width, canvas_height), blur=blur_num)
 
                             def get_text(text):
                                 text = text[5:-1]
@@ -258,9 +270,9 @@ class Overlays:
                                         else:
                                             overlay_box = overlay.get_coordinates((canvas_width, canvas_height), box=overlay.image.size, new_cords=cord)
                                         new_poster.paste(overlay.image, overlay_box, overlay.image)
-                            temp = os.path.join(self.library.overlay_folder, f"temp.png")
-                            new_poster.save(temp, "PNG")
-                            self.library.upload_poster(item, temp)
+                            poster_data = self.encode_poster(new_poster)
+                            metrics.add_image(len(poster_data))
+                            self.library.upload_poster(item, poster_data)
                             self.library.edit_tags("label", item, add_tags=["Overlay"], do_print=False)
                             self.library.reload(item, force=True)
                             poster_compare = poster.compare if poster else item.thumb
@@ -278,6 +290,7 @@ class Overlays:
                     logger.error(e)
         logger.exorcise()
         overlay_run_time = str(datetime.now() - overlay_start).split('.')[0]
+        metrics.add_phase(self.library.name, "Library Overlays", overlay_start)
         logger.info("")
         logger.separator(f"Finished {self.library.name} Library Overlays\nOverlays Run Time: {overlay_run_time}")
         return overlay_run_time
@@ -372,6 +385,49 @@ class Overlays:
                             key_to_overlays[over_key][1].remove(v)
         return key_to_overlays, properties, queues
 
+    def encode_poster(self, new_poster):
+        buffer = io.BytesIO()
+        if self.library.overlay_format == "png":
+            new_poster.save(buffer, "PNG", compress_level=self.library.overlay_compress_level, optimize=self.library.overlay_optimize)
+        elif self.library.overlay_format == "webp":
+            new_poster.save(buffer, "WEBP", quality=self.library.overlay_quality, method=6 if self.library.overlay_optimize else 4)
+        else:
+            new_poster.save(buffer, "JPEG", quality=self.library.overlay_quality, optimize=self.library.overlay_optimize)
+        return buffer.getvalue()
+
+    def backup_poster(self, item, item_title, url):
+        plex_poster = url == item.posterUrl
+        source = item.thumb if plex_poster else url
+        stored = self.config.Cache.query_overlay_backup(self.library.mapping_name, item.ratingKey) if self.config.Cache else None
+        if stored and (stored["source"] != source or not os.path.exists(stored["location"])):
+            stored = None
+        headers = {}
+        if stored:
+            if plex_poster:
+                return stored["location"], False
+            if stored["etag"]:
+                headers["If-None-Match"] = stored["etag"]
+            if stored["modified"]:
+                headers["If-Modified-Since"] = stored["modified"]
+        image_response = self.config.get(url, headers=headers if headers else None)
+        if stored and image_response.status_code == 304:
+            logger.debug(f"Not Modified: {url}")
+            return stored["location"], False
+        if image_response.status_code >= 400:
+            raise Failed(f"{item_title[:60]:<60} | Overlay Error: Poster Download Failed")
+        i_ext = "jpg" if image_response.headers.get("Content-Type") == "image/jpeg" else "png"
+        backup_image_path = os.path.join(self.library.overlay_backup, f"{item.ratingKey}.{i_ext}")
+        with open(f"{backup_image_path}.tmp", "wb") as handler:
+            handler.write(image_response.content)
+        os.replace(f"{backup_image_path}.tmp", backup_image_path)
+        other_path = os.path.join(self.library.overlay_backup, f"{item.ratingKey}.{'png' if i_ext == 'jpg' else 'jpg'}")
+        if os.path.exists(other_path):
+            os.remove(other_path)
+        if self.config.Cache:
+            self.config.Cache.update_overlay_backup(self.library.mapping_name, item.ratingKey, source, backup_image_path,
+                                                    etag=image_response.headers.get("ETag"), modified=image_response.headers.get("Last-Modified"))
+        return backup_image_path, True
+
     def find_poster_url(self, item):
         try:
             if isinstance(item, Movie):
@@ -391,7 +447,7 @@ class Overlays:
             logger.error(e)
 
     def get_overlay_items(self, label="Overlay", libtype=None, ignore=None):
-        items = self.library.search(label=label, libtype=libtype)
+        items = [o for o in self.library.search(label=label, libtype=libtype) if self.library.in_watch_scope(o)]
         return items if not ignore else [o for o in items if o.ratingKey not in ignore]
 
     def remove_overlay(self, item, item_title, label, locations):
@@ -3,7 +3,6 @@ from datetime import datetime, timedelta
 from modules import builder, util
 from modules.library import Library
 from modules.util import Failed, ImageData
-from PIL import Image
 from plexapi import utils
 from plexapi.audio import Artist, Track, Album
 from plexapi.exceptions import BadRequest, NotFound, Unauthorized
@@ -398,6 +397,10 @@ sort_types = {
     "track": ("title.asc", 10, track_sorts)
 }
 
+class TimeoutPlexServer(PlexServer):
+    def query(self, key, method=None, headers=None, timeout=None, **kwargs):
+        return super().query(key, method=method, headers=headers, timeout=timeout or self._timeout, **kwargs)
+
 class Plex(Library):
     def __init__(self, config, params):
         super().__init__(config, params)
@@ -408,7 +411,7 @@ class Plex(Library):
         logger.secret(self.url)
         logger.secret(self.token)
         try:
-            self.PlexServer = PlexServer(baseurl=self.url, token=self.token, session=self.config.session, timeout=self.timeout)
+            self.PlexServer = self.config.warm(f"plex:{self.url}:{self.token}:{self.timeout}", None, lambda: TimeoutPlexServer(baseurl=self.url, token=self.token, session=self.config.session, timeout=self.timeout), bind=False)
         except Unauthorized:
             raise Failed("Plex Error: Plex token is invalid")
         except ValueError as e:
@@ -431,6 +434,12 @@ class Plex(Library):
         self.type = self.Plex.type.capitalize()
         self._users = []
         self._all_items = []
+        self._tag_choices = {}
+        self._search_choices = {}
+        self._collection_titles = None
+        self._collection_keys = {}
+        self._title_index = None
+        self._title_year_index = None
         self._account = None
         self.agent = self.Plex.agent
         self.is_movie = self.type == "Movie"
@@ -453,9 +462,9 @@ class Plex(Library):
     def get_all_collections(self, label=None):
         args = "?type=18"
         if label:
-            label_id = next((c.key for c in self.get_tags("label") if c.title == label), None)
-            if label_id:
-                args = f"{args}&label={label_id}"
+            label_tag = self.get_tag_map("label").get(label)
+            if label_tag:
+                args = f"{args}&label={label_tag.key}"
             else:
                 return []
         return self.get_filter_items(args)
@@ -495,8 +504,50 @@ class Plex(Library):
         logger.info(f"Loaded {self.Plex._totalViewSize} {collection_level.capitalize()}s")
         if collection_level in [None, "show", "artist", "movie"]:
             self._all_items = results
+            self._title_index = None
+            self._title_year_index = None
         return results
 
+    def get_changed_items(self, watermark):
+        changed = {}
+        for attr in ["updatedAt", "addedAt"]:
+            key = f"/library/sections/{self.Plex.key}/all?includeGuids=1&type={utils.searchType(self.Plex.TYPE)}&{attr}>>={watermark}"
+            container_start = 0
+            container_size = plexapi.X_PLEX_CONTAINER_SIZE
+            while True:
+                results = self.fetchItems(key, container_start, container_size)
+                for item in results:
+                    changed[item.ratingKey] = item
+                if len(results) < container_size:
+                    break
+                container_start += container_size
+        return list(changed.values())
+
+    def get_library_keys(self):
+        keys = set()
+        container_start = 0
+        container_size = plexapi.X_PLEX_CONTAINER_SIZE
+        while True:
+            data = self._query(f"/library/sections/{self.Plex.key}/all?type={utils.searchType(self.Plex.TYPE)}"
+                               f"&X-Plex-Container-Start={container_start}&X-Plex-Container-Size={container_size}")
+            found = [int(e.attrib["ratingKey"]) for e in data if e.attrib.get("ratingKey")]
+            keys.update(found)
+            if len(found) < container_size:
+                break
+            container_start += container_size
+        return keys
+
+    def _load_title_index(self):
+        if self._title_index is None:
+            self._title_index = {}
+            self._title_year_index = {}
+            for item in self._all_items:
+                if item.title not in self._title_index:
+                    self._title_index[item.title] = item
+                year = getattr(item, "year", None)
+                if year and (item.title, year) not in self._title_year_index:
+                    self._title_year_index[(item.title, year)] = item
+
     def upload_theme(self, collection, url=None, filepath=None):
         key = f"/library/metadata/{collection.ratingKey}/themes"
         if url:
@@ -508,6 +559,18 @@ class Plex(Library):
     def create_playlist(self, name, items):
         return self.PlexServer.createPlaylist(name, items=items)
 
+    def fetch_items(self, rating_keys):
+        rating_keys = [int(k) for k in rating_keys]
+        fetched = {}
+        for i in range(0, len(rating_keys), 100):
+            for item in self._fetch_batch(rating_keys[i:i + 100]):
+                fetched[item.ratingKey] = item
+        return fetched
+
+    @retry(stop_max_attempt_number=6, wait_fixed=10000, retry_on_exception=util.retry_if_not_plex)
+    def _fetch_batch(self, rating_keys):
+        return self.PlexServer.fetchItems(f"/library/metadata/{','.join([str(k) for k in rating_keys])}")
+
     @retry(stop_max_attempt_number=6, wait_fixed=10000, retry_on_exception=util.retry_if_not_plex)
     def fetchItems(self, key, container_start, container_size):
         return self.Plex.fetchItems(key, container_start=container_start, container_size=container_size)
@@ -590,6 +653,8 @@ class Plex(Library):
     def upload_poster(self, item, image, url=False):
         if url:
             item.uploadPoster(url=image)
+        elif isinstance(image, bytes):
+            self.PlexServer.query(f"/library/metadata/{item.ratingKey}/posters", method=self.PlexServer._session.post, data=image)
         else:
             item.uploadPoster(filepath=image)
 
@@ -603,10 +668,13 @@ class Plex(Library):
     def get_search_choices(self, search_name, title=True, name_pairs=False):
         final_search = search_translation[search_name] if search_name in search_translation else search_name
         final_search = show_translation[final_search] if self.is_show and final_search in show_translation else final_search
+        use_title = title and final_search not in ["contentRating", "audioLanguage", "subtitleLanguage", "resolution"]
+        choice_key = (final_search, use_title, name_pairs)
+        if choice_key in self._search_choices:
+            return self._search_choices[choice_key]
         try:
             names = []
             choices = {}
-            use_title = title and final_search not in ["contentRating", "audioLanguage", "subtitleLanguage", "resolution"]
             for choice in self.get_tags(final_search):
                 if choice.title not in names:
                     names.append((choice.title, choice.key) if name_pairs else choice.title)
@@ -614,15 +682,45 @@ class Plex(Library):
                 choices[choice.key] = choice.title if use_title else choice.key
                 choices[choice.title.lower()] = choice.title if use_title else choice.key
                 choices[choice.key.lower()] = choice.title if use_title else choice.key
+            self._search_choices[choice_key] = (choices, names)
             return choices, names
         except NotFound:
             logger.debug(f"Search Attribute: {final_search}")
             raise Failed(f"Plex Error: plex_search attribute: {search_name} not supported")
 
-    @retry(stop_max_attempt_number=6, wait_fixed=10000, retry_on_exception=util.retry_if_not_plex)
     def get_tags(self, tag):
+        if tag not in self._tag_choices:
+            self._tag_choices[tag] = self._get_tags(tag)
+        return self._tag_choices[tag]
+
+    @retry(stop_max_attempt_number=6, wait_fixed=10000, retry_on_exception=util.retry_if_not_plex)
+    def _get_tags(self, tag):
         return self.Plex.listFilterChoices(field=tag)
 
+    def get_tag_map(self, tag):
+        map_key = (tag, "map")
+        if map_key not in self._search_choices:
+            tag_map = {}
+            for choice in self.get_tags(tag):
+                tag_map[choice.title] = choice
+            self._search_choices[map_key] = tag_map
+        return self._search_choices[map_key]
+
+    def clear_caches(self):
+        self._all_items = []
+        self._tag_choices = {}
+        self._search_choices = {}
+        self._collection_titles = None
+        self._collection_keys = {}
+        self._title_index = None
+        self._title_year_index = None
+
+    def clear_tags(self, tag):
+        for field in [f for f in self._tag_choices if f == tag or f.endswith(f".{tag}")]:
+            del self._tag_choices[field]
+        for choice_key in [k for k in self._search_choices if k[0] == tag or k[0].endswith(f".{tag}")]:
+            del self._search_choices[choice_key]
+
     @retry(stop_max_attempt_number=6, wait_fixed=10000, retry_on_exception=util.retry_if_not_plex)
     def _query(self, key, post=False, put=False):
         if post:                method = self.Plex._server._session.post
@@ -687,7 +785,7 @@ class Plex(Library):
         self._query(key, put=True)
 
     def smart_label_check(self, label):
-        return label in [la.title for la in self.get_tags("label")]
+        return label in self.get_tag_map("label")
 
     def test_smart_filter(self, uri_args):
         logger.debug(f"Smart Collection Test: {uri_args}")
@@ -704,7 +802,7 @@ class Plex(Library):
             "sectionId": self.Plex.key,
             "uri": self.build_smart_filter(uri_args)
         }
-        self._query(f"/library/collections{utils.joinArgs(args)}", post=True)
+        self._create_collection(f"/library/collections{utils.joinArgs(args)}")
 
     def create_blank_collection(self, title):
         args = {
@@ -714,7 +812,41 @@ class Plex(Library):
             "sectionId": self.Plex.key,
             "uri": f"{self.PlexServer._uriRoot()}/library/metadata"
         }
-        self._query(f"/library/collections{utils.joinArgs(args)}", post=True)
+        self._create_collection(f"/library/collections{utils.joinArgs(args)}")
+
+    def _create_collection(self, key):
+        data = self._query(key, post=True)
+        self.clear_tags("collection")
+        if self._collection_titles is not None:
+            try:
+                self._index_collection(Collection(self.PlexServer, data[0], initpath=key))
+            except IndexError:
+                self._collection_titles = None
+
+    def _load_collections(self):
+        if self._collection_titles is None:
+            self._collection_titles = {}
+            self._collection_keys = {}
+            for collection in self.get_all_collections():
+                self._index_collection(collection)
+
+    def _index_collection(self, collection):
+        self._collection_keys[collection.ratingKey] = collection.title
+        if collection.title not in self._collection_titles:
+            self._collection_titles[collection.title] = []
+        self._collection_titles[collection.title].append(collection.ratingKey)
+
+    def _unindex_collection(self, rating_key):
+        title = self._collection_keys.pop(rating_key, None)
+        if title in self._collection_titles:
+            self._collection_titles[title] = [k for k in self._collection_titles[title] if k != rating_key]
+            if not self._collection_titles[title]:
+                self._collection_titles.pop(title)
+
+    def delete(self, obj):
+        self.query(obj.delete)
+        if isinstance(obj, Collection) and self._collection_titles is not None:
+            self._unindex_collection(obj.ratingKey)
 
     def get_smart_filter_from_uri(self, uri):
         smart_filter = parse.parse_qs(parse.urlparse(uri.replace("/#!/", "/")).query)["key"][0]
@@ -759,19 +891,31 @@ class Plex(Library):
             raise Failed(f"Plex Error: Playlist {title} not found")
 
     def get_collection(self, data):
+        if isinstance(data, Collection):
+            return data
         if isinstance(data, int):
             return self.fetchItem(data)
-        elif isinstance(data, Collection):
-            return data
-        else:
-            cols = self.search(title=str(data), libtype="collection")
-            for d in cols:
-                if d.title == data:
-                    return d
-            logger.debug("")
-            for d in cols:
-                logger.debug(f"Found: {d.title}")
-            logger.debug(f"Looking for: {data}")
+        self._load_collections()
+        for rating_key in list(self._collection_titles.get(str(data), [])):
+            try:
+                collection = self.fetchItem(rating_key)
+            except (BadRequest, NotFound):
+                self._unindex_collection(rating_key)
+                continue
+            if collection.title == str(data):
+                return collection
+            self._unindex_collection(rating_key)
+            self._index_collection(collection)
+        cols = self.search(title=str(data), libtype="collection")
+        for d in cols:
+            if d.title == data:
+                self._unindex_collection(d.ratingKey)
+                self._index_collection(d)
+                return d
+        logger.debug("")
+        for d in cols:
+            logger.debug(f"Found: {d.title}")
+        logger.debug(f"Looking for: {data}")
         raise Failed(f"Plex Error: Collection {data} not found")
 
     def validate_collections(self, collections):
@@ -842,7 +986,7 @@ class Plex(Library):
         if len(items) > 0:
             ids = [(item.ratingKey, "ratingKey") for item in items]
             logger.debug("")
-            logger.debug(f"{len(ids)} Keys Found: {ids}")
+            logger.debug("%s Keys Found: %s", len(ids), ids)
             return ids
         else:
             raise Failed("Plex Error: No Items found in Plex")
@@ -873,6 +1017,11 @@ class Plex(Library):
         return self.show_rating_key_map[item.ratingKey] if item.ratingKey in self.show_rating_key_map else None
 
     def search_item(self, data, year=None):
+        if self._all_items:
+            self._load_title_index()
+            if year is not None:
+                return self._title_year_index.get((str(data), year))
+            return self._title_index.get(str(data))
         kwargs = {}
         if year is not None:
             kwargs["year"] = year
@@ -914,6 +1063,8 @@ class Plex(Library):
             if _remove:
                 self.query_data(getattr(obj, f"remove{attr_call}"), _remove)
                 display += f"-{', -'.join(_remove)}"
+            if _add or _remove:
+                self.clear_tags(attr)
             final = f"{obj.title[:25]:<25} | {attr_display} | {display}" if display else display
             if do_print and final:
                 logger.info(final)
@@ -1089,6 +1240,7 @@ class Plex(Library):
             for file in util.glob_filter(os.path.join(item_asset_directory, "*.*")):
                 if file.lower().endswith((".jpg", ".png", ".jpeg")):
                     try:
+                        from PIL import Image
                         image = Image.open(file)
                         _w, _h = image.size
                         image.close()
@@ -0,0 +1,89 @@
+import os, sys, threading, time
+
+class Profiler:
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.enabled = False
+        self.log_dir = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._active = {}
+        self._starts = {}
+        self.samples = {}
+        self.durations = {}
+
+    def start(self, log_dir):
+        self.log_dir = log_dir
+        self._active = {}
+        self._starts = {}
+        self.samples = {}
+        self.durations = {}
+        self._stop.clear()
+        self.enabled = True
+        self._thread = threading.Thread(target=self._sample, name="PMM Profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.enabled:
+            return []
+        self.enabled = False
+        self._stop.set()
+        self._thread.join()
+        return self.save()
+
+    def begin(self, *key):
+        if not self.enabled:
+            return
+        thread_id = threading.get_ident()
+        with self._lock:
+            if thread_id not in self._active:
+                self._active[thread_id] = []
+            self._active[thread_id].append(key)
+            self._starts[(thread_id, key)] = time.perf_counter()
+
+    def end(self, *key):
+        if not self.enabled:
+            return
+        thread_id = threading.get_ident()
+        with self._lock:
+            if thread_id in self._active and key in self._active[thread_id]:
+                self._active[thread_id].remove(key)
+            if (thread_id, key) in self._starts:
+                self.durations[key] = self.durations.get(key, 0) + time.perf_counter() - self._starts.pop((thread_id, key))
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, frame in frames.items():
+                    if thread_id == own_id:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":"))
+                        frame = frame.f_back
+                    folded = ";".join(reversed(stack))
+                    for key in [("profile.folded",)] + self._active.get(thread_id, []):
+                        if key not in self.samples:
+                            self.samples[key] = {}
+                        self.samples[key][folded] = self.samples[key].get(folded, 0) + 1
+
+    def save(self):
+        saved = []
+        for key, stacks in self.samples.items():
+            path = os.path.join(self.log_dir, *key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as handle:
+                for folded, count in sorted(stacks.items(), key=lambda s: s[1], reverse=True):
+                    handle.write(f"{folded} {count}\n")
+            saved.append(path)
+        return saved
+
+    def slowest(self, top, kind="collections"):
+        timed = [(key, seconds) for key, seconds in self.durations.items() if len(key) > 2 and key[1] == kind]
+        return sorted(timed, key=lambda t: t[1], reverse=True)[:top]
+
+profiler = Profiler()
@@ -48,7 +48,7 @@ class Radarr:
         logger.info("")
         logger.separator(f"Adding {'Missing' if _ids else 'Existing'} to Radarr", space=False, border=False)
         logger.debug("")
-        logger.debug(f"Radarr Adds: {_ids if _ids else ''}")
+        logger.debug("Radarr Adds: %s", _ids if _ids else "")
         for tmdb_id in _paths:
             logger.debug(tmdb_id)
         upgrade_existing = options["upgrade_existing"] if "upgrade_existing" in options else self.upgrade_existing
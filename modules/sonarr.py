@@ -70,7 +70,7 @@ class Sonarr:
         logger.info("")
         logger.separator(f"Adding {'Missing' if _ids else 'Existing'} to Sonarr", space=False, border=False)
         logger.debug("")
-        logger.debug(f"Sonarr Adds: {_ids if _ids else ''}")
+        logger.debug("Sonarr Adds: %s", _ids if _ids else "")
         for tvdb_id in _paths:
             logger.debug(tvdb_id)
         upgrade_existing = options["upgrade_existing"] if "upgrade_existing" in options else self.upgrade_existing
@@ -105,7 +105,7 @@ class TMDbMovie(TMDBObj):
         expired = None
         data = None
         if self._tmdb.config.Cache and not ignore_cache:
-            data, expired = self._tmdb.config.Cache.query_tmdb_movie(tmdb_id, self._tmdb.expiration)
+            data, expired = self._tmdb.config.Cache.query_tmdb_movie(tmdb_id)
         if expired or not data:
             data = self.load_movie()
         super()._load(data)
@@ -133,7 +133,7 @@ class TMDbShow(TMDBObj):
         expired = None
         data = None
         if self._tmdb.config.Cache and not ignore_cache:
-            data, expired = self._tmdb.config.Cache.query_tmdb_show(tmdb_id, self._tmdb.expiration)
+            data, expired = self._tmdb.config.Cache.query_tmdb_show(tmdb_id)
         if expired or not data:
             data = self.load_show()
         super()._load(data)
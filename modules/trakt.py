@@ -1,4 +1,5 @@
-import requests, time, webbrowser
+import requests, threading, time, webbrowser
+from concurrent.futures import ThreadPoolExecutor
 from modules import util
 from modules.util import Failed, TimeoutExpired, YAML
 from retrying import retry
@@ -7,6 +8,8 @@ logger = util.logger
 
 redirect_uri = "urn:ietf:wg:oauth:2.0:oob"
 base_url = "https://api.trakt.tv"
+page_workers = 4
+post_interval = 1
 builders = [
     "trakt_list", "trakt_list_details", "trakt_chart", "trakt_userlist", "trakt_boxoffice", "trakt_recommendations",
     "trakt_collected_daily", "trakt_collected_weekly", "trakt_collected_monthly", "trakt_collected_yearly", "trakt_collected_all",
@@ -55,6 +58,8 @@ class Trakt:
         self._show_countries = None
         self._movie_certifications = None
         self._show_certifications = None
+        self._last_post = 0
+        self._post_lock = threading.Lock()
 
     @property
     def slugs(self):
@@ -189,46 +194,68 @@ class Trakt:
         return False
 
     @retry(stop_max_attempt_number=6, wait_fixed=10000, retry_on_exception=util.retry_if_not_failed)
-    def _request(self, url, params=None, json=None):
+    def _request(self, url, params=None, json=None, etag=False):
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.authorization['access_token']}",
             "trakt-api-version": "2",
             "trakt-api-key": self.client_id
         }
-        output_json = []
         if params is None:
             params = {}
-        pages = 1
-        current = 1
         if self.config.trace_mode:
             logger.debug(f"URL: {base_url}{url}")
             if params:
                 logger.debug(f"Params: {params}")
             if json:
                 logger.debug(f"JSON: {json}")
-        while current <= pages:
-            if pages > 1:
-                params["page"] = current
-            if json is not None:
+        if json is not None:
+            with self._post_lock:
+                wait = self._last_post + post_interval - time.time()
+                if wait > 0:
+                    time.sleep(wait)
                 response = self.config.post(f"{base_url}{url}", json=json, headers=headers)
-            else:
-                response = self.config.get(f"{base_url}{url}", headers=headers, params=params)
-            if pages == 1 and "X-Pagination-Page-Count" in response.headers and not params:
-                pages = int(response.headers["X-Pagination-Page-Count"])
-            if response.status_code >= 400:
-                raise Failed(f"({response.status_code}) {response.reason}")
-            json_data = response.json()
+                self._last_post = time.time()
+            return self._response_json(response)
+        cached_etag, cached_data = None, None
+        if etag and self.config.Cache:
+            cached_etag, cached_data = self.config.Cache.query_url_etag(f"{base_url}{url}")
+        response = self._get(url, dict(headers, **{"If-None-Match": cached_etag}) if cached_etag else headers, params)
+        if cached_etag and response.status_code == 304:
             if self.config.trace_mode:
-                logger.debug(f"Headers: {response.headers}")
-                logger.debug(f"Response: {json_data}")
-            if isinstance(json_data, dict):
-                return json_data
-            else:
-                output_json.extend(json_data)
-            current += 1
+                logger.debug(f"Not Modified: {base_url}{url}")
+            return cached_data
+        json_data = self._response_json(response)
+        pages = int(response.headers["X-Pagination-Page-Count"]) if "X-Pagination-Page-Count" in response.headers and not params else 1
+        if isinstance(json_data, dict) or pages == 1:
+            if etag and self.config.Cache and "ETag" in response.headers:
+                self.config.Cache.update_url_etag(f"{base_url}{url}", response.headers["ETag"], json_data)
+            return json_data
+        output_json = list(json_data)
+        with ThreadPoolExecutor(max_workers=min(page_workers, pages - 1)) as executor:
+            for page_data in executor.map(lambda page: self._response_json(self._get(url, headers, {"page": page})), range(2, pages + 1)):
+                output_json.extend(page_data)
         return output_json
 
+    def _get(self, url, headers, params):
+        response = None
+        for _ in range(6):
+            response = self.config.get(f"{base_url}{url}", headers=headers, params=params)
+            if response.status_code != 429:
+                break
+            retry_after = response.headers.get("Retry-After", "1")
+            time.sleep(int(retry_after) if str(retry_after).isdigit() else 1)
+        return response
+
+    def _response_json(self, response):
+        if response.status_code >= 400:
+            raise Failed(f"({response.status_code}) {response.reason}")
+        json_data = response.json()
+        if self.config.trace_mode:
+            logger.debug(f"Headers: {response.headers}")
+            logger.debug(f"Response: {json_data}")
+        return json_data
+
     def user_ratings(self, is_movie):
         media = "movie" if is_movie else "show"
         id_type = "tmdb" if is_movie else "tvdb"
@@ -304,7 +331,9 @@ class Trakt:
         return data
 
     def sync_list(self, slug, ids):
-        current_ids = self._list(slug, urlparse=False, fail=False)
+        current = self._list(slug, urlparse=False, trakt_ids=True, fail=False)
+        current_ids = {(i_id, ty) for _, i_id, ty in current}
+        sync_ids = set(ids)
 
         def read_result(data, obj_type, result_type, result_str=None):
             result_str = result_str if result_str else result_type.capitalize()
@@ -331,23 +360,26 @@ class Trakt:
             for object_type in ["movies", "shows", "seasons", "episodes"]:
                 read_result(results, object_type, "added")
             read_not_found(results, "Add")
-            time.sleep(1)
 
-        remove_ids = [id_set for id_set in current_ids if id_set not in ids]
+        remove_ids = [(i_id, ty) for _, i_id, ty in current if (i_id, ty) not in sync_ids]
         if remove_ids:
             logger.info("")
             results = self._request(f"/users/me/lists/{slug}/items/remove", json=self._build_item_json(remove_ids))
             for object_type in ["movies", "shows", "seasons", "episodes"]:
                 read_result(results, object_type, "deleted", "Removed")
             read_not_found(results, "Remove")
-            time.sleep(1)
 
-        trakt_ids = self._list(slug, urlparse=False, trakt_ids=True)
-        trakt_lookup = {f"{ty}_{i_id}": t_id for t_id, i_id, ty in trakt_ids}
+        if add_ids:
+            current = self._list(slug, urlparse=False, trakt_ids=True)
+        trakt_lookup = {f"{ty}_{i_id}": t_id for t_id, i_id, ty in current}
         rank_ids = [trakt_lookup[f"{ty}_{i_id}"] for i_id, ty in ids if f"{ty}_{i_id}" in trakt_lookup]
-        self._request(f"/users/me/lists/{slug}/items/reorder", json={"rank": rank_ids})
+        current_ranks = [t_id for t_id, i_id, ty in current if (i_id, ty) in sync_ids]
         logger.info("")
-        logger.info("Trakt List Ordered Successfully")
+        if rank_ids != current_ranks:
+            self._request(f"/users/me/lists/{slug}/items/reorder", json={"rank": rank_ids})
+            logger.info("Trakt List Ordered Successfully")
+        else:
+            logger.info("Trakt List Already Ordered")
 
     def all_user_lists(self, user="me"):
         try:
@@ -370,7 +402,7 @@ class Trakt:
     def _list(self, data, urlparse=True, trakt_ids=False, fail=True):
         try:
             url = requests.utils.urlparse(data).path if urlparse else f"/users/me/lists/{data}"
-            items = self._request(f"{url}/items")
+            items = self._request(f"{url}/items", etag=True)
         except Failed:
             raise Failed(f"Trakt Error: List {data} not found")
         if len(items) == 0:
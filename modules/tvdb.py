@@ -48,7 +48,7 @@ class TVDbObj:
         expired = None
         data = None
         if self._tvdb.config.Cache and not ignore_cache:
-            data, expired = self._tvdb.config.Cache.query_tvdb(tvdb_id, is_movie, self._tvdb.expiration)
+            data, expired = self._tvdb.config.Cache.query_tvdb(tvdb_id, is_movie)
         if expired or not data:
             data = self._tvdb.get_request(f"{urls['movie_id' if is_movie else 'series_id']}{tvdb_id}")
 
@@ -133,7 +133,7 @@ class TVDb:
         expired = None
         tvdb_id = None
         if self.config.Cache and not ignore_cache:
-            tvdb_id, expired = self.config.Cache.query_tvdb_map(tvdb_url, self.expiration)
+            tvdb_id, expired = self.config.Cache.query_tvdb_map(tvdb_url)
         if tvdb_id and not expired and not is_movie:
             return tvdb_id, None, None
         if self.config.trace_mode:
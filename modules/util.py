@@ -1,10 +1,10 @@
-import glob, logging, os, re, requests, ruamel.yaml, signal, sys, time
+import glob, hashlib, logging, os, pickle, re, requests, ruamel.yaml, signal, sys, time
 from datetime import datetime, timedelta
+from modules.metrics import metrics
 from pathvalidate import is_valid_filename, sanitize_filename
 from plexapi.audio import Album, Track
 from plexapi.exceptions import BadRequest, NotFound, Unauthorized
 from plexapi.video import Season, Episode, Movie
-from PIL import Image, ImageColor, ImageDraw, ImageFont
 
 try:
     import msvcrt
@@ -14,6 +14,9 @@ except ModuleNotFoundError:
 
 
 logger = logging.getLogger("Plex Meta Manager")
+yaml_cache_dir = None
+yaml_cache_days = 30
+parsed_yaml = {}
 
 class TimeoutExpired(Exception):
     pass
@@ -47,10 +50,16 @@ class ImageData:
         return str(self.__dict__)
 
 def retry_if_not_failed(exception):
-    return not isinstance(exception, Failed)
+    if isinstance(exception, Failed):
+        return False
+    metrics.add_retry(exception)
+    return True
 
 def retry_if_not_plex(exception):
-    return not isinstance(exception, (BadRequest, NotFound, Unauthorized))
+    if isinstance(exception, (BadRequest, NotFound, Unauthorized)):
+        return False
+    metrics.add_retry(exception)
+    return True
 
 days_alias = {
     "monday": 0, "mon": 0, "m": 0,
@@ -454,6 +463,15 @@ def load_files(files_to_load, method, schedule=None, lib_vars=None):
                 logger.error(f"Config Error: Path not found: {file}")
     return files
 
+def remote_files(files_to_load):
+    remote = []
+    for file in get_list(files_to_load, split=False):
+        if isinstance(file, dict):
+            for attr, file_type in [("url", "URL"), ("git", "Git"), ("repo", "Repo")]:
+                if attr in file and file[attr]:
+                    remote.append((file_type, file[attr]))
+    return remote
+
 def check_num(num, is_int=True):
     try:
         return int(str(num)) if is_int else float(str(num))
@@ -786,6 +804,9 @@ def replace_label(_label, _data):
 
     return final_data, replaced
 
+def epoch(date_time):
+    return int(date_time.timestamp()) if date_time else 0
+
 def check_time(message, end=False):
     global previous_time
     global start_time
@@ -820,14 +841,73 @@ def get_system_fonts():
         system_fonts = [n for d in dirs for _, _, ns in os.walk(d) for n in ns]
     return system_fonts
 
+def yaml_cache_path(key):
+    return os.path.join(yaml_cache_dir, f"{key}.pickle") if yaml_cache_dir else None
+
+def load_parsed_yaml(key):
+    if key not in parsed_yaml:
+        cache_path = yaml_cache_path(key)
+        if not cache_path or not os.path.exists(cache_path):
+            metrics.cache_result("yaml", False)
+            return None
+        try:
+            with open(cache_path, "rb") as fp:
+                parsed_yaml[key] = fp.read()
+            os.utime(cache_path)
+        except OSError:
+            metrics.cache_result("yaml", False)
+            return None
+    try:
+        data = pickle.loads(parsed_yaml[key])
+    except Exception as e:
+        logger.debug(f"YAML Cache Error: {e}")
+        parsed_yaml.pop(key, None)
+        cache_path = yaml_cache_path(key)
+        if cache_path and os.path.exists(cache_path):
+            try:
+                os.remove(cache_path)
+            except OSError:
+                pass
+        metrics.cache_result("yaml", False)
+        return None
+    metrics.cache_result("yaml", True)
+    return data
+
+def save_parsed_yaml(key, data):
+    parsed_yaml[key] = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+    cache_path = yaml_cache_path(key)
+    if cache_path:
+        try:
+            os.makedirs(yaml_cache_dir, exist_ok=True)
+            with open(f"{cache_path}.tmp", "wb") as fp:
+                fp.write(parsed_yaml[key])
+            os.replace(f"{cache_path}.tmp", cache_path)
+        except OSError as e:
+            logger.debug(f"YAML Cache Error: {e}")
+
+def prune_yaml_cache():
+    parsed_yaml.clear()
+    if not yaml_cache_dir or not os.path.exists(yaml_cache_dir):
+        return
+    expired = time.time() - yaml_cache_days * 86400
+    for cache_file in glob.glob(os.path.join(yaml_cache_dir, "*.pickle")):
+        try:
+            if os.path.getmtime(cache_file) < expired:
+                os.remove(cache_file)
+        except OSError:
+            pass
+
 class YAML:
-    def __init__(self, path=None, input_data=None, check_empty=False, create=False):
+    def __init__(self, path=None, input_data=None, check_empty=False, create=False, cached=False):
         self.path = path
         self.input_data = input_data
-        self.yaml = ruamel.yaml.YAML()
+        self.key = None
+        self.yaml = ruamel.yaml.YAML(typ="safe", pure=True) if cached else ruamel.yaml.YAML()
         self.yaml.indent(mapping=2, sequence=2)
         try:
-            if input_data:
+            if cached and not (create and not os.path.exists(self.path)):
+                self.data = self.load_cached(input_data)
+            elif input_data:
                 self.data = self.yaml.load(input_data)
             else:
                 if create and not os.path.exists(self.path):
@@ -847,6 +927,19 @@ class YAML:
                 raise Failed("YAML Error: File is empty")
             self.data = {}
 
+    def load_cached(self, input_data):
+        if not input_data:
+            with open(self.path, "rb") as fp:
+                input_data = fp.read()
+        if isinstance(input_data, str):
+            input_data = input_data.encode("utf-8")
+        self.key = hashlib.sha1(input_data).hexdigest()
+        data = load_parsed_yaml(self.key)
+        if data is None:
+            data = self.yaml.load(input_data)
+            save_parsed_yaml(self.key, data)
+        return data
+
     def save(self):
         if self.path:
             with open(self.path, 'w', encoding="utf-8") as fp:
@@ -856,6 +949,24 @@ class YAML:
 portrait_dim = (1000, 1500)
 landscape_dim = (1920, 1080)
 
+def load_poster(image_path, size, blur=0):
+    from PIL import Image, ImageFilter
+    poster = Image.open(image_path)
+    poster.draft("RGB", size)
+    poster = poster.convert("RGB")
+    factor = min(poster.width // size[0], poster.height // size[1])
+    if factor > 1:
+        poster = poster.reduce(factor)
+    poster = poster.resize(size, Image.ANTIALIAS)
+    if blur > 0:
+        scale = min(blur // 4, 4)
+        if scale > 1:
+            poster = poster.resize((size[0] // scale, size[1] // scale), Image.BOX) \
+                .filter(ImageFilter.GaussianBlur(blur / scale)).resize(size, Image.BICUBIC)
+        else:
+            poster = poster.filter(ImageFilter.GaussianBlur(blur))
+    return poster
+
 def parse_cords(data, parent, required=False):
     horizontal_align = parse("Overlay", "horizontal_align", data["horizontal_align"], parent=parent,
                              options=["left", "center", "right"]) if "horizontal_align" in data else "left"
@@ -913,6 +1024,7 @@ def parse_cords(data, parent, required=False):
 
 class Overlay:
     def __init__(self, config, library, original_mapping_name, overlay_data, suppress):
+        from PIL import Image, ImageColor, ImageFont
         self.config = config
         self.library = library
         self.original_mapping_name = original_mapping_name
@@ -1114,6 +1226,7 @@ class Overlay:
                 raise Failed(f"Overlay Error: overlay image {self.path} failed to load")
 
     def get_backdrop(self, canvas_box, box=None, text=None, new_cords=None):
+        from PIL import Image, ImageDraw
         overlay_image = None
         text_width = None
         text_height = None
@@ -1238,6 +1351,7 @@ class Overlay:
         return self.horizontal_offset is not None and self.vertical_offset is not None
 
     def get_text_size(self, text):
+        from PIL import Image, ImageDraw
         return ImageDraw.Draw(Image.new("RGBA", (0, 0))).textbbox((0, 0), text, font=self.font, anchor='lt')
 
     def get_coordinates(self, canvas_box, box, new_cords=None):
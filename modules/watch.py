@@ -0,0 +1,125 @@
+import json, threading, time
+from modules import util
+from modules.util import Failed
+
+logger = util.logger
+
+library_identifier = "com.plexapp.plugins.library"
+processed_state = 5
+max_wait_factor = 10
+
+class Watcher:
+    def __init__(self, config, delay=30, events_file=None):
+        self.config = config
+        self.delay = delay
+        self.events_file = events_file
+        self.sections = {}
+        self.listeners = []
+        self.pending = {}
+        self.first_event = None
+        self.last_event = None
+        self.replaying = False
+        self._lock = threading.Lock()
+        for library in self.config.libraries:
+            if library.skip_library:
+                continue
+            server_id = library.PlexServer.machineIdentifier
+            if server_id not in self.sections:
+                self.sections[server_id] = {}
+            self.sections[server_id][str(library.Plex.key)] = library
+
+    def start(self):
+        if self.events_file:
+            self.replaying = True
+            threading.Thread(target=self.replay, daemon=True).start()
+            return
+        started = []
+        for library in self.sections_libraries():
+            server_id = library.PlexServer.machineIdentifier
+            if server_id in started:
+                continue
+            started.append(server_id)
+            try:
+                self.listeners.append(library.PlexServer.startAlertListener(
+                    callback=lambda data, sid=server_id: self.alert(sid, data),
+                    callbackError=lambda error, name=library.PlexServer.friendlyName: logger.error(f"Watch Error: {name}: {error}")
+                ))
+                logger.info(f"Watching {library.PlexServer.friendlyName} for Changes")
+            except Exception as e:
+                logger.stacktrace()
+                raise Failed(f"Watch Error: Could not connect to the notifications of {library.PlexServer.friendlyName}: {e}")
+
+    def stop(self):
+        for listener in self.listeners:
+            listener.stop()
+        self.listeners = []
+
+    def sections_libraries(self):
+        return [library for libraries in self.sections.values() for library in libraries.values()]
+
+    def replay(self):
+        logger.info(f"Replaying Recorded Events from {self.events_file}")
+        with open(self.events_file, encoding="utf-8") as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.error(f"Watch Error: Invalid Event: {e}")
+                    continue
+                server_ids = [data["machineIdentifier"]] if "machineIdentifier" in data else list(self.sections)
+                for server_id in server_ids:
+                    self.alert(server_id, data)
+        self.replaying = False
+
+    def alert(self, server_id, data):
+        if server_id not in self.sections:
+            return
+        found = []
+        if data.get("type") == "timeline":
+            for entry in data.get("TimelineEntry", []):
+                if entry.get("identifier") == library_identifier and entry.get("state") == processed_state and entry.get("itemID"):
+                    found.append((str(entry.get("sectionID")), int(entry["itemID"])))
+        elif data.get("type") == "activity":
+            for entry in data.get("ActivityNotification", []):
+                activity = entry.get("Activity", {})
+                context = activity.get("Context", {})
+                key = str(context.get("key", ""))
+                if entry.get("event") == "ended" and key.startswith("/library/metadata/") and "librarySectionID" in context:
+                    rating_key = key[18:].split("/")[0]
+                    if rating_key.isdigit():
+                        found.append((str(context["librarySectionID"]), int(rating_key)))
+        with self._lock:
+            for section_id, rating_key in found:
+                if section_id in self.sections[server_id]:
+                    library = self.sections[server_id][section_id]
+                    if library not in self.pending:
+                        self.pending[library] = set()
+                    self.pending[library].add(rating_key)
+                    self.last_event = time.time()
+                    if self.first_event is None:
+                        self.first_event = self.last_event
+
+    def drain(self):
+        with self._lock:
+            now = time.time()
+            if not self.pending or (now - self.last_event < self.delay and now - self.first_event < self.delay * max_wait_factor):
+                return {}
+            pending = self.pending
+            self.pending = {}
+            self.first_event = None
+            return pending
+
+    def run(self, process):
+        self.start()
+        try:
+            while True:
+                for library, rating_keys in self.drain().items():
+                    process(library, rating_keys)
+                if self.events_file and not self.replaying and not self.pending:
+                    break
+                time.sleep(1)
+        finally:
+            self.stop()
@@ -5,14 +5,13 @@ from modules.util import Failed, YAML
 logger = util.logger
 
 class Webhooks:
-    def __init__(self, config, system_webhooks, library=None, notifiarr=None):
+    def __init__(self, config, system_webhooks, library=None):
         self.config = config
         self.error_webhooks = system_webhooks["error"] if "error" in system_webhooks else []
         self.version_webhooks = system_webhooks["version"] if "version" in system_webhooks else []
         self.run_start_webhooks = system_webhooks["run_start"] if "run_start" in system_webhooks else []
         self.run_end_webhooks = system_webhooks["run_end"] if "run_end" in system_webhooks else []
         self.library = library
-        self.notifiarr = notifiarr
 
     def _request(self, webhooks, json):
         if self.config.trace_mode:
@@ -24,8 +23,8 @@ class Webhooks:
             if self.config.trace_mode:
                 logger.debug(f"Webhook: {webhook}")
             if webhook == "notifiarr":
-                if self.notifiarr:
-                    url, params = self.notifiarr.get_url("notification/pmm/")
+                if self.config.NotifiarrFactory:
+                    url, params = self.config.NotifiarrFactory.get_url("notification/pmm/")
                     for x in range(6):
                         response = self.config.get(url, json=json, params=params)
                         if response.status_code < 500:
@@ -41,7 +40,7 @@ class Webhooks:
                     response_json = response.json()
                     if self.config.trace_mode:
                         logger.debug(f"Response: {response_json}")
-                    if webhook == "notifiarr" and self.notifiarr and response.status_code == 400:
+                    if webhook == "notifiarr" and self.config.NotifiarrFactory and response.status_code == 400:
                         def remove_from_config(text, hook_cat):
                             if response_json["details"]["response"] == text:
                                 yaml = YAML(self.config.config_path)
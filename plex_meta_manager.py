@@ -1,5 +1,5 @@
 import argparse, os, sys, time, uuid
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 
 try:
@@ -22,6 +22,10 @@ parser.add_argument("-c", "--config", dest="config", help="Run with desired *.ym
 parser.add_argument("-t", "--time", "--times", dest="times", help="Times to update each day use format HH:MM (Default: 05:00) (comma-separated list)", default="05:00", type=str)
 parser.add_argument("-re", "--resume", dest="resume", help="Resume collection run from a specific collection", type=str)
 parser.add_argument("-r", "--run", dest="run", help="Run without the scheduler", action="store_true", default=False)
+parser.add_argument("-dm", "--daemon", dest="daemon", help="Keep connections and services loaded between scheduled runs", action="store_true", default=False)
+parser.add_argument("-wa", "--watch", dest="watch", help="Run continuously on the items Plex reports as added or updated", action="store_true", default=False)
+parser.add_argument("-wd", "--watch-delay", dest="watch_delay", help="Seconds to wait for Plex to go quiet before processing watched changes (Default: 30)", default=30, type=int)
+parser.add_argument("-we", "--watch-events", dest="watch_events", help="Replay recorded Plex notifications from a JSON lines file instead of connecting to Plex", type=str)
 parser.add_argument("-is", "--ignore-schedules", dest="ignore_schedules", help="Run ignoring collection schedules", action="store_true", default=False)
 parser.add_argument("-ig", "--ignore-ghost", dest="ignore_ghost", help="Run ignoring ghost logging", action="store_true", default=False)
 parser.add_argument("-rt", "--test", "--tests", "--run-test", "--run-tests", dest="test", help="Run in debug mode with only collections that have test: true", action="store_true", default=False)
@@ -33,11 +37,14 @@ parser.add_argument("-lf", "--library-first", "--libraries-first", dest="library
 parser.add_argument("-rc", "-cl", "--collection", "--collections", "--run-collection", "--run-collections", dest="collections", help="Process only specified collections (comma-separated list)", type=str)
 parser.add_argument("-rl", "-l", "--library", "--libraries", "--run-library", "--run-libraries", dest="libraries", help="Process only specified libraries (comma-separated list)", type=str)
 parser.add_argument("-rm", "-m", "--metadata", "--metadata-files", "--run-metadata-files", dest="metadata", help="Process only specified Metadata files (comma-separated list)", type=str)
-parser.add_argument("-ca", "--cache-library", "--cache-libraries", dest="cache_libraries", help="Cache Library load for 1 day", action="store_true", default=False)
+parser.add_argument("-ca", "--cache-library", "--cache-libraries", dest="cache_libraries", help="Only load library changes since the last run", action="store_true", default=False)
 parser.add_argument("-dc", "--delete", "--delete-collections", dest="delete", help="Deletes all Collections in the Plex Library before running", action="store_true", default=False)
 parser.add_argument("-nc", "--no-countdown", dest="no_countdown", help="Run without displaying the countdown", action="store_true", default=False)
 parser.add_argument("-nm", "--no-missing", dest="no_missing", help="Run without running the missing section", action="store_true", default=False)
 parser.add_argument("-ro", "--read-only-config", dest="read_only_config", help="Run without writing to the config", action="store_true", default=False)
+parser.add_argument("-pr", "--profile", dest="profile", help="Profile the run and save the profiles to the logs folder", action="store_true", default=False)
+parser.add_argument("-pt", "--profile-top", dest="profile_top", help="Number of slowest collections listed after a profiled run (Default: 10)", default=10, type=int)
+parser.add_argument("-cs", "--cache-stats", dest="cache_stats", help="Print the row counts and sizes of the cache tables and exit", action="store_true", default=False)
 parser.add_argument("-d", "--divider", dest="divider", help="Character that divides the sections (Default: '=')", default="=", type=str)
 parser.add_argument("-w", "--width", dest="width", help="Screen Width (Default: 100)", default=100, type=int)
 args = parser.parse_args()
@@ -68,6 +75,10 @@ def get_arg(env_str, default, arg_bool=False, arg_int=False):
 config_file = get_arg("PMM_CONFIG", args.config)
 times = get_arg("PMM_TIME", args.times)
 run = get_arg("PMM_RUN", args.run, arg_bool=True)
+daemon = get_arg("PMM_DAEMON", args.daemon, arg_bool=True)
+watch = get_arg("PMM_WATCH", args.watch, arg_bool=True)
+watch_delay = get_arg("PMM_WATCH_DELAY", args.watch_delay, arg_int=True)
+watch_events = get_arg("PMM_WATCH_EVENTS", args.watch_events)
 test = get_arg("PMM_TEST", args.test, arg_bool=True)
 ignore_schedules = get_arg("PMM_IGNORE_SCHEDULES", args.ignore_schedules, arg_bool=True)
 ignore_ghost = get_arg("PMM_IGNORE_GHOST", args.ignore_ghost, arg_bool=True)
@@ -85,6 +96,9 @@ resume = get_arg("PMM_RESUME", args.resume)
 no_countdown = get_arg("PMM_NO_COUNTDOWN", args.no_countdown, arg_bool=True)
 no_missing = get_arg("PMM_NO_MISSING", args.no_missing, arg_bool=True)
 read_only_config = get_arg("PMM_READ_ONLY_CONFIG", args.read_only_config, arg_bool=True)
+profile = get_arg("PMM_PROFILE", args.profile, arg_bool=True)
+profile_top = get_arg("PMM_PROFILE_TOP", args.profile_top, arg_int=True)
+cache_stats = get_arg("PMM_CACHE_STATS", args.cache_stats, arg_bool=True)
 divider = get_arg("PMM_DIVIDER", args.divider)
 screen_width = get_arg("PMM_WIDTH", args.width, arg_int=True)
 debug = get_arg("PMM_DEBUG", args.debug, arg_bool=True)
@@ -111,9 +125,13 @@ logger = MyLogger("Plex Meta Manager", default_dir, screen_width, divider[0], ig
 
 from modules import util
 util.logger = logger
+util.yaml_cache_dir = os.path.join(default_dir, "yaml_cache")
 from modules.builder import CollectionBuilder
 from modules.config import ConfigFile
+from modules.metrics import metrics
+from modules.profiling import profiler
 from modules.util import Failed, NotScheduled, Deleted
+from modules.watch import Watcher
 
 def my_except_hook(exctype, value, tb):
     if issubclass(exctype, KeyboardInterrupt):
@@ -152,6 +170,12 @@ def process(attrs):
         executor.submit(start, *[attrs])
 
 def start(attrs):
+    try:
+        run_start(attrs)
+    finally:
+        logger.stop()
+
+def run_start(attrs):
     logger.add_main_handler()
     logger.separator()
     logger.info("")
@@ -166,12 +190,17 @@ def start(attrs):
     new_version = latest_version[0] if latest_version and (version[1] != latest_version[1] or (version[2] and version[2] < latest_version[2])) else None
     if new_version:
         logger.info(f"    Newest Version: {new_version}")
-    if "time" in attrs and attrs["time"]:                   start_type = f"{attrs['time']} "
+    if "watch" in attrs and attrs["watch"]:                 start_type = "Watch "
+    elif "time" in attrs and attrs["time"]:                 start_type = f"{attrs['time']} "
     elif "test" in attrs and attrs["test"]:                 start_type = "Test "
     elif "collections" in attrs and attrs["collections"]:   start_type = "Collections "
     elif "libraries" in attrs and attrs["libraries"]:       start_type = "Libraries "
     else:                                                   start_type = ""
     start_time = datetime.now()
+    metrics.reset()
+    util.prune_yaml_cache()
+    if profile:
+        profiler.start(logger.log_dir)
     if "time" not in attrs:
         attrs["time"] = start_time.strftime("%H:%M")
     attrs["time_obj"] = start_time
@@ -186,6 +215,10 @@ def start(attrs):
     logger.debug(f"--config (PMM_CONFIG): {config_file}")
     logger.debug(f"--time (PMM_TIME): {times}")
     logger.debug(f"--run (PMM_RUN): {run}")
+    logger.debug(f"--daemon (PMM_DAEMON): {daemon}")
+    logger.debug(f"--watch (PMM_WATCH): {watch}")
+    logger.debug(f"--watch-delay (PMM_WATCH_DELAY): {watch_delay}")
+    logger.debug(f"--watch-events (PMM_WATCH_EVENTS): {watch_events}")
     logger.debug(f"--run-tests (PMM_TEST): {test}")
     logger.debug(f"--collections-only (PMM_COLLECTIONS_ONLY): {collection_only}")
     logger.debug(f"--playlists-only (PMM_PLAYLISTS_ONLY): {playlist_only}")
@@ -203,6 +236,8 @@ def start(attrs):
     logger.debug(f"--no-countdown (PMM_NO_COUNTDOWN): {no_countdown}")
     logger.debug(f"--no-missing (PMM_NO_MISSING): {no_missing}")
     logger.debug(f"--read-only-config (PMM_READ_ONLY_CONFIG): {read_only_config}")
+    logger.debug(f"--profile (PMM_PROFILE): {profile}")
+    logger.debug(f"--profile-top (PMM_PROFILE_TOP): {profile_top}")
     logger.debug(f"--divider (PMM_DIVIDER): {divider}")
     logger.debug(f"--width (PMM_WIDTH): {screen_width}")
     logger.debug(f"--debug (PMM_DEBUG): {debug}")
@@ -218,7 +253,10 @@ def start(attrs):
         logger.critical(e)
     else:
         try:
-            stats = run_config(config, stats)
+            if "watch" in attrs and attrs["watch"]:
+                run_watch(config)
+            else:
+                stats = run_config(config, stats)
         except Exception as e:
             config.notify(e)
             logger.stacktrace()
@@ -226,6 +264,24 @@ def start(attrs):
     logger.info("")
     end_time = datetime.now()
     run_time = str(end_time - start_time).split(".")[0]
+    if profile:
+        try:
+            profiler.stop()
+        except OSError as e:
+            logger.error(f"Profile Error: {e}")
+        slowest = profiler.slowest(profile_top)
+        if slowest:
+            logger.info("")
+            logger.separator(f"{len(slowest)} Slowest Collections")
+            logger.info("")
+            for (library_key, _, collection_key, _), seconds in slowest:
+                logger.info(f"{seconds:>10.2f}s | {library_key} | {collection_key}")
+        logger.info("")
+        logger.info(f"Profiles saved to {logger.log_dir}")
+    try:
+        metrics.save(logger.log_dir)
+    except OSError as e:
+        logger.error(f"Metrics Error: {e}")
     if config:
         try:
             config.Webhooks.end_time_hooks(start_time, end_time, run_time, stats)
@@ -236,7 +292,10 @@ def start(attrs):
     if new_version:
         version_line = f"{version_line}        Newest Version: {new_version}"
     logger.separator(f"Finished {start_type}Run\n{version_line}\nFinished: {end_time.strftime('%H:%M:%S %Y-%m-%d')} Run Time: {run_time}")
-    logger.remove_main_handler()
+    if daemon:
+        logger.close_handlers()
+    else:
+        logger.remove_main_handler()
 
 def run_config(config, stats):
     library_status = run_libraries(config)
@@ -386,144 +445,276 @@ def run_config(config, stats):
 
 def run_libraries(config):
     library_status = {}
+    libraries = []
     for library in config.libraries:
         if library.skip_library:
             logger.info("")
             logger.separator(f"Skipping {library.name} Library")
             continue
-        library_status[library.name] = {}
+        libraries.append(library)
+    if config.general["library_workers"] > 1 and len(libraries) > 1:
+        with ThreadPoolExecutor(max_workers=config.general["library_workers"]) as executor:
+            futures = {library.name: executor.submit(run_library, config, library) for library in libraries}
+        for library in libraries:
+            library_status[library.name] = futures[library.name].result()
+    else:
+        for library in libraries:
+            library_status[library.name] = run_library(config, library)
+    return library_status
+
+def run_library(config, library):
+    library_status = {}
+    profiler.begin(library.mapping_name, "profile.folded")
+    try:
+        logger.add_library_handler(library.mapping_name)
+        logger.info("")
+        logger.separator(f"{library.name} Library")
+
+        logger.debug("")
+        logger.debug(f"Mapping Name: {library.original_mapping_name}")
+        logger.debug(f"Folder Name: {library.mapping_name}")
+        for ad in library.asset_directory:
+            logger.debug(f"Asset Directory: {ad}")
+        logger.debug(f"Asset Folders: {library.asset_folders}")
+        logger.debug(f"Create Asset Folders: {library.create_asset_folders}")
+        logger.debug(f"Download URL Assets: {library.download_url_assets}")
+        logger.debug(f"Sync Mode: {library.sync_mode}")
+        logger.debug(f"Minimum Items: {library.minimum_items}")
+        logger.debug(f"Delete Below Minimum: {library.delete_below_minimum}")
+        logger.debug(f"Delete Not Scheduled: {library.delete_not_scheduled}")
+        logger.debug(f"Default Collection Order: {library.default_collection_order}")
+        logger.debug(f"Missing Only Released: {library.missing_only_released}")
+        logger.debug(f"Only Filter Missing: {library.only_filter_missing}")
+        logger.debug(f"Show Unmanaged: {library.show_unmanaged}")
+        logger.debug(f"Show Filtered: {library.show_filtered}")
+        logger.debug(f"Show Missing: {library.show_missing}")
+        logger.debug(f"Show Missing Assets: {library.show_missing_assets}")
+        logger.debug(f"Save Report: {library.save_report}")
+        logger.debug(f"Report Path: {library.report_path}")
+        logger.debug(f"Clean Bundles: {library.clean_bundles}")
+        logger.debug(f"Empty Trash: {library.empty_trash}")
+        logger.debug(f"Optimize: {library.optimize}")
+        logger.debug(f"Timeout: {library.timeout}")
+
+        if config.delete_collections and not playlist_only:
+            time_start = datetime.now()
+            logger.info("")
+            logger.separator(f"Deleting all Collections from the {library.name} Library", space=False, border=False)
+            logger.info("")
+            for collection in library.get_all_collections():
+                logger.info(f"Collection {collection.title} Deleted")
+                library.delete(collection)
+            library_status["All Collections Deleted"] = str(datetime.now() - time_start).split('.')[0]
+            metrics.add_phase(library.name, "All Collections Deleted", time_start)
+
+        time_start = datetime.now()
+        load_library(config, library)
+        library_status["Library Loading and Mapping"] = str(datetime.now() - time_start).split('.')[0]
+        metrics.add_phase(library.name, "Library Loading and Mapping", time_start)
+
+        if config.library_first and not config.test_mode and not collection_only and not playlist_only:
+            if not overlays_only and library.library_operation:
+                library_status["Library Operations"] = library.Operations.run_operations()
+            if not operations_only and (library.overlay_files or library.remove_overlays):
+                library_status["Library Overlays"] = library.Overlays.run_overlays()
+
+        if not operations_only and not overlays_only and not playlist_only:
+            time_start = datetime.now()
+            for metadata in library.metadata_files:
+                metadata_name = metadata.get_file_name()
+                if config.requested_metadata_files and metadata_name not in config.requested_metadata_files:
+                    logger.info("")
+                    logger.separator(f"Skipping {metadata_name} Metadata File")
+                    continue
+                logger.info("")
+                logger.separator(f"Running {metadata_name} Metadata File\n{metadata.path}")
+                if not config.test_mode and not config.resume_from and not collection_only:
+                    try:
+                        metadata.update_metadata()
+                    except Failed as e:
+                        library.notify(e)
+                        logger.error(e)
+                collections_to_run = metadata.get_collections(config.requested_collections)
+                if config.resume_from and config.resume_from not in collections_to_run:
+                    logger.info("")
+                    logger.warning(f"Collection: {config.resume_from} not in Metadata File: {metadata.path}")
+                    continue
+                if collections_to_run:
+                    logger.info("")
+                    logger.separator(f"{'Test ' if config.test_mode else ''}Collections")
+                    logger.remove_library_handler(library.mapping_name)
+                    run_collection(config, library, metadata, collections_to_run)
+                    logger.re_add_library_handler(library.mapping_name)
+            library_status["Library Metadata Files"] = str(datetime.now() - time_start).split('.')[0]
+            metrics.add_phase(library.name, "Library Metadata Files", time_start)
+
+        if not config.library_first and not config.test_mode and not collection_only and not playlist_only:
+            if not overlays_only and library.library_operation:
+                library_status["Library Operations"] = library.Operations.run_operations()
+            if not operations_only and (library.overlay_files or library.remove_overlays):
+                library_status["Library Overlays"] = library.Overlays.run_overlays()
+
+        logger.remove_library_handler(library.mapping_name)
+    except Exception as e:
+        library.notify(e)
+        logger.stacktrace()
+        logger.critical(e)
+    profiler.end(library.mapping_name, "profile.folded")
+    return library_status
+
+def load_library(config, library):
+    if config.Cache and cache_libraries:
+        temp_items = library.load_snapshot_items()
+    else:
+        temp_items = library.cache_items()
+        if config.Cache:
+            library.save_snapshot(temp_items)
+    if not library.is_music:
+        logger.info("")
+        logger.separator(f"Mapping {library.name} Library", space=False, border=False)
+        logger.info("")
+        library.map_guids(temp_items)
+
+def run_watch(config):
+    for library in config.libraries:
+        if library.skip_library:
+            continue
         try:
             logger.add_library_handler(library.mapping_name)
-            plexapi.server.TIMEOUT = library.timeout
             logger.info("")
             logger.separator(f"{library.name} Library")
+            load_library(config, library)
+        except Exception as e:
+            library.notify(e)
+            logger.stacktrace()
+            logger.critical(e)
+            library.skip_library = True
+        logger.remove_library_handler(library.mapping_name)
+    watcher = Watcher(config, delay=watch_delay, events_file=watch_events)
+    logger.info("")
+    logger.separator("Watching for Changes")
+    watcher.run(lambda library, rating_keys: run_watch_library(config, library, rating_keys))
 
-            logger.debug("")
-            logger.debug(f"Mapping Name: {library.original_mapping_name}")
-            logger.debug(f"Folder Name: {library.mapping_name}")
-            for ad in library.asset_directory:
-                logger.debug(f"Asset Directory: {ad}")
-            logger.debug(f"Asset Folders: {library.asset_folders}")
-            logger.debug(f"Create Asset Folders: {library.create_asset_folders}")
-            logger.debug(f"Download URL Assets: {library.download_url_assets}")
-            logger.debug(f"Sync Mode: {library.sync_mode}")
-            logger.debug(f"Minimum Items: {library.minimum_items}")
-            logger.debug(f"Delete Below Minimum: {library.delete_below_minimum}")
-            logger.debug(f"Delete Not Scheduled: {library.delete_not_scheduled}")
-            logger.debug(f"Default Collection Order: {library.default_collection_order}")
-            logger.debug(f"Missing Only Released: {library.missing_only_released}")
-            logger.debug(f"Only Filter Missing: {library.only_filter_missing}")
-            logger.debug(f"Show Unmanaged: {library.show_unmanaged}")
-            logger.debug(f"Show Filtered: {library.show_filtered}")
-            logger.debug(f"Show Missing: {library.show_missing}")
-            logger.debug(f"Show Missing Assets: {library.show_missing_assets}")
-            logger.debug(f"Save Report: {library.save_report}")
-            logger.debug(f"Report Path: {library.report_path}")
-            logger.debug(f"Clean Bundles: {library.clean_bundles}")
-            logger.debug(f"Empty Trash: {library.empty_trash}")
-            logger.debug(f"Optimize: {library.optimize}")
-            logger.debug(f"Timeout: {library.timeout}")
-
-            if config.delete_collections and not playlist_only:
-                time_start = datetime.now()
-                logger.info("")
-                logger.separator(f"Deleting all Collections from the {library.name} Library", space=False, border=False)
-                logger.info("")
-                for collection in library.get_all_collections():
-                    logger.info(f"Collection {collection.title} Deleted")
-                    library.query(collection.delete)
-                library_status[library.name]["All Collections Deleted"] = str(datetime.now() - time_start).split('.')[0]
-
-            time_start = datetime.now()
-            temp_items = None
-            list_key = None
-            expired = None
-            if config.Cache and cache_libraries:
-                list_key, expired = config.Cache.query_list_cache("library", library.mapping_name, 1)
-                if list_key and expired is False:
-                    logger.info(f"Library: {library.mapping_name} loaded from Cache")
-                    temp_items = config.Cache.query_list_ids(list_key)
-
-            if not temp_items:
-                temp_items = library.cache_items()
-                if config.Cache:
-                    if list_key:
-                        config.Cache.delete_list_ids(list_key)
-                    list_key = config.Cache.update_list_cache("library", library.mapping_name, expired, 1)
-                    config.Cache.update_list_ids(list_key, [(i.ratingKey, i.guid) for i in temp_items])
+def run_watch_library(config, library, rating_keys):
+    watch_start = datetime.now()
+    try:
+        logger.re_add_library_handler(library.mapping_name)
+        logger.info("")
+        logger.separator(f"{library.name} Library Changes")
+        logger.info("")
+        with config.builder_lock:
+            config.builder_ids = {}
+        library.clear_caches()
+        items = library.load_watch_items(rating_keys)
+        logger.info(f"{len(items)} Changed {library.type}{'s' if len(items) != 1 else ''}: {', '.join([i.title for i in items])}")
+        if items:
             if not library.is_music:
-                logger.info("")
-                logger.separator(f"Mapping {library.name} Library", space=False, border=False)
-                logger.info("")
-                library.map_guids(temp_items)
-            library_status[library.name]["Library Loading and Mapping"] = str(datetime.now() - time_start).split('.')[0]
-
-            if config.library_first and not config.test_mode and not collection_only and not playlist_only:
-                if not overlays_only and library.library_operation:
-                    library_status[library.name]["Library Operations"] = library.Operations.run_operations()
-                if not operations_only and (library.overlay_files or library.remove_overlays):
-                    library_status[library.name]["Library Overlays"] = library.Overlays.run_overlays()
-
+                library.map_guids(items)
             if not operations_only and not overlays_only and not playlist_only:
-                time_start = datetime.now()
                 for metadata in library.metadata_files:
-                    metadata_name = metadata.get_file_name()
-                    if config.requested_metadata_files and metadata_name not in config.requested_metadata_files:
-                        logger.info("")
-                        logger.separator(f"Skipping {metadata_name} Metadata File")
+                    if config.requested_metadata_files and metadata.get_file_name() not in config.requested_metadata_files:
                         continue
-                    logger.info("")
-                    logger.separator(f"Running {metadata_name} Metadata File\n{metadata.path}")
-                    if not config.test_mode and not config.resume_from and not collection_only:
-                        try:
-                            metadata.update_metadata()
-                        except Failed as e:
-                            library.notify(e)
-                            logger.error(e)
                     collections_to_run = metadata.get_collections(config.requested_collections)
-                    if config.resume_from and config.resume_from not in collections_to_run:
-                        logger.info("")
-                        logger.warning(f"Collection: {config.resume_from} not in Metadata File: {metadata.path}")
-                        continue
                     if collections_to_run:
-                        logger.info("")
-                        logger.separator(f"{'Test ' if config.test_mode else ''}Collections")
                         logger.remove_library_handler(library.mapping_name)
-                        run_collection(config, library, metadata, collections_to_run)
+                        run_watch_collections(config, library, metadata, collections_to_run)
                         logger.re_add_library_handler(library.mapping_name)
-                library_status[library.name]["Library Metadata Files"] = str(datetime.now() - time_start).split('.')[0]
-
-            if not config.library_first and not config.test_mode and not collection_only and not playlist_only:
-                if not overlays_only and library.library_operation:
-                    library_status[library.name]["Library Operations"] = library.Operations.run_operations()
-                if not operations_only and (library.overlay_files or library.remove_overlays):
-                    library_status[library.name]["Library Overlays"] = library.Overlays.run_overlays()
+            if not collection_only and not playlist_only:
+                if not overlays_only and library.items_library_operation:
+                    library.Operations.run_operations()
+                if not operations_only and library.overlay_files:
+                    library.Overlays.run_overlays()
+    except Exception as e:
+        library.notify(e)
+        logger.stacktrace()
+        logger.critical(e)
+    library.clear_watch_items()
+    logger.info("")
+    logger.separator(f"Finished {library.name} Library Changes\nRun Time: {str(datetime.now() - watch_start).split('.')[0]}")
+    logger.remove_library_handler(library.mapping_name)
 
-            logger.remove_library_handler(library.mapping_name)
+def run_watch_collections(config, library, metadata, requested_collections):
+    for mapping_name, collection_attrs in requested_collections.items():
+        if skip_test_collection(config, metadata, collection_attrs):
+            continue
+        log_name, output_str = collection_log_name(mapping_name, collection_attrs)
+        logger.add_collection_handler(library.mapping_name, log_name)
+        try:
+            builder = CollectionBuilder(config, metadata, mapping_name, collection_attrs, library=library, extra=output_str)
+            if builder.obj and builder.builders and builder.build_collection and not builder.smart_url and not builder.blank_collection and not builder.limit:
+                logger.info("")
+                logger.separator(f"Checking {mapping_name} Collection", space=False, border=False)
+                for method, value in builder.builders:
+                    logger.debug("")
+                    logger.debug(f"Builder: {method}: {value}")
+                    logger.info("")
+                    builder.filter_and_save_items(builder.gather_ids(method, value))
+                if builder.added_items:
+                    builder.add_to_collection()
+        except NotScheduled as e:
+            logger.info(e)
+        except Failed as e:
+            library.notify(e, collection=mapping_name)
+            logger.stacktrace()
+            logger.error(e)
         except Exception as e:
-            library.notify(e)
+            library.notify(f"Unknown Error: {e}", collection=mapping_name)
             logger.stacktrace()
-            logger.critical(e)
-    return library_status
+            logger.error(f"Unknown Error: {e}")
+        logger.remove_collection_handler(library.mapping_name, log_name)
+
+def skip_test_collection(config, metadata, collection_attrs):
+    if config.test_mode and ("test" not in collection_attrs or collection_attrs["test"] is not True):
+        if "template" in collection_attrs and collection_attrs["template"]:
+            for data_template in util.get_list(collection_attrs["template"], split=False):
+                if "name" in data_template \
+                        and data_template["name"] \
+                        and metadata.templates \
+                        and data_template["name"] in metadata.templates \
+                        and metadata.templates[data_template["name"]][0] \
+                        and "test" in metadata.templates[data_template["name"]][0] \
+                        and metadata.templates[data_template["name"]][0]["test"] is True:
+                    return False
+        return True
+    return False
+
+def collection_log_name(mapping_name, collection_attrs):
+    if "name_mapping" in collection_attrs and collection_attrs["name_mapping"]:
+        return util.validate_filename(collection_attrs["name_mapping"])
+    else:
+        return util.validate_filename(mapping_name)
+
+def prefetch_collections(config, library, metadata, requested_collections, executor):
+    prefetched = {}
+    resume_from = config.resume_from
+    for mapping_name, collection_attrs in requested_collections.items():
+        if skip_test_collection(config, metadata, collection_attrs) or (resume_from and resume_from != mapping_name):
+            continue
+        resume_from = None
+        logger.start_capture([])
+        try:
+            builder = CollectionBuilder(config, metadata, mapping_name, collection_attrs, library=library, prefetch_only=True)
+            builder.prefetch_ids(executor)
+            prefetched[mapping_name] = builder.prefetched_ids
+        except Exception:
+            pass
+        finally:
+            logger.stop_capture()
+    return prefetched
 
 def run_collection(config, library, metadata, requested_collections):
+    if config.general["builder_workers"] > 1:
+        with ThreadPoolExecutor(max_workers=config.general["builder_workers"]) as executor:
+            prefetched = prefetch_collections(config, library, metadata, requested_collections, executor)
+            return run_collections(config, library, metadata, requested_collections, executor=executor, prefetched=prefetched)
+    return run_collections(config, library, metadata, requested_collections)
+
+def run_collections(config, library, metadata, requested_collections, executor=None, prefetched=None):
     logger.info("")
     for mapping_name, collection_attrs in requested_collections.items():
         collection_start = datetime.now()
-        if config.test_mode and ("test" not in collection_attrs or collection_attrs["test"] is not True):
-            no_template_test = True
-            if "template" in collection_attrs and collection_attrs["template"]:
-                for data_template in util.get_list(collection_attrs["template"], split=False):
-                    if "name" in data_template \
-                            and data_template["name"] \
-                            and metadata.templates \
-                            and data_template["name"] in metadata.templates \
-                            and metadata.templates[data_template["name"]][0] \
-                            and "test" in metadata.templates[data_template["name"]][0] \
-                            and metadata.templates[data_template["name"]][0]["test"] is True:
-                        no_template_test = False
-            if no_template_test:
-                continue
+        if skip_test_collection(config, metadata, collection_attrs):
+            continue
 
         if config.resume_from and config.resume_from != mapping_name:
             continue
@@ -532,15 +723,16 @@ def run_collection(config, library, metadata, requested_collections):
             logger.info("")
             logger.separator(f"Resuming Collections")
 
-        if "name_mapping" in collection_attrs and collection_attrs["name_mapping"]:
-            collection_log_name, output_str = util.validate_filename(collection_attrs["name_mapping"])
-        else:
-            collection_log_name, output_str = util.validate_filename(mapping_name)
-        logger.add_collection_handler(library.mapping_name, collection_log_name)
+        log_name, output_str = collection_log_name(mapping_name, collection_attrs)
+        logger.add_collection_handler(library.mapping_name, log_name)
+        profiler.begin(library.mapping_name, "collections", log_name, "profile.folded")
         library.status[str(mapping_name)] = {"status": "Unchanged", "errors": [], "added": 0, "unchanged": 0, "removed": 0, "radarr": 0, "sonarr": 0}
 
         try:
             builder = CollectionBuilder(config, metadata, mapping_name, collection_attrs, library=library, extra=output_str)
+            if executor:
+                builder.prefetched_ids = prefetched.pop(mapping_name, {})
+                builder.prefetch_ids(executor)
             library.stats["names"].append(builder.name)
             logger.info("")
 
@@ -677,9 +869,11 @@ def run_collection(config, library, metadata, requested_collections):
             library.status[str(mapping_name)]["errors"].append(e)
         collection_run_time = str(datetime.now() - collection_start).split('.')[0]
         library.status[str(mapping_name)]["run_time"] = collection_run_time
+        metrics.add_collection(library.name, mapping_name, collection_start)
+        profiler.end(library.mapping_name, "collections", log_name, "profile.folded")
         logger.info("")
         logger.separator(f"Finished {mapping_name} Collection\nCollection Run Time: {collection_run_time}")
-        logger.remove_collection_handler(library.mapping_name, collection_log_name)
+        logger.remove_collection_handler(library.mapping_name, log_name)
 
 def run_playlists(config):
     stats = {"created": 0, "modified": 0, "deleted": 0, "added": 0, "unchanged": 0, "removed": 0, "radarr": 0, "sonarr": 0, "names": []}
@@ -853,9 +1047,36 @@ def run_playlists(config):
             logger.remove_playlist_handler(playlist_log_name)
     return status, stats
 
+def print_cache_stats():
+    from modules.cache import cache_stats as get_cache_stats
+    logger.separator("Cache Stats")
+    logger.info("")
+    total_rows = 0
+    total_size = 0
+    for table, rows, size in get_cache_stats(config_file if config_file else os.path.join(default_dir, "config.yml")):
+        total_rows += rows
+        total_size += size if size else 0
+        logger.info(f"{table:<40} | {rows:>10} Rows | {f'{size / 1048576:.2f} MB' if size is not None else 'Unknown':>12}")
+    logger.info("")
+    logger.info(f"{'Total':<40} | {total_rows:>10} Rows | {f'{total_size / 1048576:.2f} MB':>12}")
+    logger.separator()
+
 if __name__ == "__main__":
     try:
-        if run or test or collections or libraries or metadata_files or resume:
+        if cache_stats:
+            print_cache_stats()
+        elif watch:
+            process({
+                "config_file": config_file,
+                "test": test,
+                "watch": True,
+                "ignore_schedules": True,
+                "collections": collections,
+                "libraries": libraries,
+                "metadata_files": metadata_files,
+                "trace": trace
+            })
+        elif run or test or collections or libraries or metadata_files or resume:
             process({
                 "config_file": config_file,
                 "test": test,
@@ -880,7 +1101,7 @@ if __name__ == "__main__":
                     else:
                         raise Failed(f"Argument Error: blank time argument")
             for time_to_run in valid_times:
-                schedule.every().day.at(time_to_run).do(process, {"config_file": config_file, "time": time_to_run, "delete": delete, "library_first": library_first, "trace": trace})
+                schedule.every().day.at(time_to_run).do(start if daemon else process, {"config_file": config_file, "time": time_to_run, "delete": delete, "library_first": library_first, "trace": trace, "daemon": daemon})
             while True:
                 schedule.run_pending()
                 if not no_countdown: